@@ -3,6 +3,7 @@ from company.models import (Event, Product, Package, PackageLinkProduct,
 from django import forms
 from django.core.exceptions import ObjectDoesNotExist
 
+from tripod.reference_data import ReferenceChoicesMixin
 from tripod.utils import add_basic_html_tags
 
 
@@ -115,7 +116,7 @@ class ProductForm(forms.ModelForm):
         return productObj
 
 
-class PackageForm(forms.ModelForm):
+class PackageForm(ReferenceChoicesMixin, forms.ModelForm):
     """
     Package form that handles the adding new product and
     updating event info that object that available in the database
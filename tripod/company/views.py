@@ -76,7 +76,7 @@ def staffCompanyHomePage(request):
     Company homepage which is only visible to admin logins,
     Where the main application content will be available
     """
-    company = Company.objects.filter(active=True).first()
+    company = get_company()
     context = {'company': company}
     return render(request, 'admin/company.html', context)
 
@@ -1,8 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils.timezone import now
 
 from core.forms import CustomUserCreationForm, CustomUserChangeFormAdminView
-from core.models import CustomUser, Company
+from core.models import CustomUser, Company, OutboxEmail
 
 
 class CustomUserAdmin(UserAdmin):
@@ -50,5 +51,19 @@ class CustomUserAdmin(UserAdmin):
     ordering = ('email', )
 
 
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts',
+                    'next_attempt_at', 'sent_at')
+    list_filter = ('status', )
+    search_fields = ('to_email', 'idempotency_key')
+    actions = ['retry']
+
+    @admin.action(description='Retry the selected emails')
+    def retry(self, request, queryset):
+        queryset.exclude(status=OutboxEmail.SENT).update(
+            status=OutboxEmail.PENDING, attempts=0, next_attempt_at=now())
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Company)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
@@ -3,6 +3,7 @@ from django import forms
 from django.contrib.auth.forms import (UserChangeForm, UserCreationForm)
 
 from tripod.settings import temp_password
+from tripod.reference_data import ReferenceChoicesMixin
 from tripod.utils import random_char
 
 from core.utils import send_code
@@ -90,7 +91,7 @@ class AccountCreationForm(forms.ModelForm):
         return account
 
 
-class JobUserUpdateForm(forms.ModelForm):
+class JobUserUpdateForm(ReferenceChoicesMixin, forms.ModelForm):
     """
     User updating the job details
     """
@@ -113,7 +114,7 @@ class JobUserUpdateForm(forms.ModelForm):
         return jobObj
 
 
-class JobPackageUpdate(forms.ModelForm):
+class JobPackageUpdate(ReferenceChoicesMixin, forms.ModelForm):
 
     class Meta:
         model = Job
@@ -141,7 +142,7 @@ class QuestionnaireUpdate(forms.ModelForm):
         self.helper.form_show_labels = False
 
 
-class JobReqCreatedForm(forms.ModelForm):
+class JobReqCreatedForm(ReferenceChoicesMixin, forms.ModelForm):
     """
     User creating a job request
     """
@@ -157,8 +158,6 @@ class JobReqCreatedForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('userObj')
         super().__init__(*args, **kwargs)
-        self.fields['photographer'].queryset = CustomUser.objects.filter(
-            is_staff=True).filter(is_photographer=True)
 
     def save(self, *args, **kwargs):
         self.instance.create_by = self.user
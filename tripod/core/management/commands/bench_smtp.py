@@ -0,0 +1,86 @@
+import json
+import smtplib
+import time
+from email.message import EmailMessage
+
+from django.core.management.base import BaseCommand
+
+from tripod.tasks_lib.smtp_pool import SMTPConnectionPool
+from tripod.tasks_lib.smtp_standin import SMTPStandIn
+
+
+class Command(BaseCommand):
+    """
+    Benchmarking the sending of emails against a local SMTP stand-in, a new
+    connection and login for each message (as emails were sent before the
+    pool) compared with the pooled connections. The handshake delay of the
+    stand-in accounts for the TLS handshake and the login of a remote server
+    """
+    help = 'Benchmark sending emails with and without the SMTP pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--handshake-delay',
+                            type=float,
+                            default=0.02,
+                            help='seconds added to connecting and login')
+        parser.add_argument('--json',
+                            action='store_true',
+                            help='printing the results as json')
+
+    def build_message(self, index):
+        msg = EmailMessage()
+        msg['Subject'] = f'Benchmark message {index}'
+        msg['From'] = 'bench@tripod.local'
+        msg['To'] = 'client@tripod.local'
+        msg.set_content('Dear client,\n\n' + 'Lorem ipsum dolor sit amet. ' *
+                        40)
+        return msg
+
+    def send_unpooled(self, server, messages):
+        for index in range(messages):
+            with smtplib.SMTP(server.host, server.port) as smtp:
+                smtp.login('bench', 'bench')
+                smtp.send_message(self.build_message(index))
+        return messages
+
+    def send_pooled(self, server, messages):
+        pool = SMTPConnectionPool(server.host,
+                                  server.port,
+                                  username='bench',
+                                  password='bench',
+                                  use_ssl=False)
+        for index in range(messages):
+            pool.send_message(self.build_message(index))
+        pool.close()
+        return pool.opened
+
+    def measure(self, send, messages, handshake_delay):
+        with SMTPStandIn(handshake_delay=handshake_delay) as server:
+            start = time.perf_counter()
+            connections = send(server, messages)
+            seconds = time.perf_counter() - start
+            received = server.received
+        return {
+            'messages': received,
+            'connections': connections,
+            'seconds': seconds,
+            'messages_per_second': received / seconds,
+        }
+
+    def handle(self, *args, **options):
+        results = {
+            name: self.measure(send, options['messages'],
+                               options['handshake_delay'])
+            for name, send in (('unpooled', self.send_unpooled),
+                               ('pooled', self.send_pooled))
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}\t{result['messages']} messages over "
+                f"{result['connections']} connections in "
+                f"{result['seconds']:.2f}s "
+                f"({result['messages_per_second']:.1f} messages/s)")
@@ -0,0 +1,116 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# modules that are expected to be loaded only when they are used
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'reportlab')
+
+# measuring `manage.py check` in a fresh interpreter
+CHECK_PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.core.management import call_command
+call_command('check', verbosity=0)
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy': [m for m in %(heavy)r if m in sys.modules],
+}))
+'''
+
+# measuring the start of a wsgi worker and its first request
+WSGI_PROBE = '''
+import json, resource, sys, time
+from wsgiref.util import setup_testing_defaults
+start = time.perf_counter()
+from tripod.wsgi import application
+loaded = time.perf_counter() - start
+environ = {'PATH_INFO': %(path)r}
+setup_testing_defaults(environ)
+statuses = []
+response = application(environ, lambda status, headers: statuses.append(status))
+b''.join(response)
+response.close()
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'load_seconds': loaded,
+    'status': statuses[0] if statuses else None,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy': [m for m in %(heavy)r if m in sys.modules],
+}))
+'''
+
+
+class Command(BaseCommand):
+    """
+    Benchmarking the start of the processes, time and peak memory of
+    `manage.py check` and of a wsgi worker until its first request is
+    served. Each run is a fresh interpreter, and heavy modules that got
+    loaded are listed so the lazy imports can be verified
+    """
+    help = 'Benchmark process startup time and memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--path',
+                            default='/tripod-admin/dashboard/',
+                            help='path of the first wsgi request')
+        parser.add_argument('--json',
+                            action='store_true',
+                            help='printing the results as json')
+
+    def run_probe(self, probe):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        output = subprocess.run([sys.executable, '-c', probe],
+                                cwd=settings.BASE_DIR,
+                                env=env,
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def measure(self, probe, repeat):
+        runs = [self.run_probe(probe) for i in range(repeat)]
+        result = {
+            'seconds': statistics.median(run['seconds'] for run in runs),
+            'rss_mb': statistics.median(run['rss_kb'] for run in runs) / 1024,
+            'heavy': runs[-1]['heavy'],
+        }
+        if 'status' in runs[-1]:
+            result['load_seconds'] = statistics.median(run['load_seconds']
+                                                       for run in runs)
+            result['status'] = runs[-1]['status']
+        return result
+
+    def handle(self, *args, **options):
+        results = {
+            'check':
+            self.measure(CHECK_PROBE % {'heavy': HEAVY_MODULES},
+                         options['repeat']),
+            'wsgi_first_request':
+            self.measure(
+                WSGI_PROBE % {
+                    'heavy': HEAVY_MODULES,
+                    'path': options['path']
+                }, options['repeat']),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            line = (f"{name:<20} {result['seconds'] * 1000:8.1f} ms  "
+                    f"{result['rss_mb']:7.1f} MB RSS  heavy modules: "
+                    f"{', '.join(result['heavy']) or 'none'}")
+            if 'status' in result:
+                line += (f"  (app loaded in "
+                         f"{result['load_seconds'] * 1000:.1f} ms, "
+                         f"status {result['status']})")
+            self.stdout.write(line)
@@ -0,0 +1,116 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Company
+from job.models import Appointment, Job, Task, Work
+from settings.models import TemplateField
+from tripod.tasks_lib.template_prepration import (TemplateDatabaseObjects,
+                                                  get_resolver)
+
+OBJECT_FIELDS = {
+    'clientName': 'user.first_name',
+    'clientEmail': 'user.email',
+    'jobName': 'job.job_name',
+    'venue': 'job.venue',
+    'taskName': 'task.task_name',
+    'companyName': 'company.name',
+    'appointment': 'appointment.description',
+}
+
+
+class Command(BaseCommand):
+    """
+    Benchmarking the values of the placeholders of a message, taken with the
+    compiled resolvers compared with eval of the object fields as it was
+    done before. eval is measured on its own and along with the query of
+    the template field for each placeholder, which it was done with; the
+    template fields are rolled back afterwards
+    """
+    help = 'Benchmark the placeholder resolvers against eval'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=20000)
+        parser.add_argument('--query-messages',
+                            type=int,
+                            default=500,
+                            help='messages of eval along with the queries')
+        parser.add_argument('--json',
+                            action='store_true',
+                            help='printing the results as json')
+
+    def build_objects(self):
+        """database objects of a message, they are not saved"""
+        client = get_user_model()(email='client@tripod.local',
+                                  first_name='Client')
+        job = Job(job_name='Wedding', venue='Garden', primary_client=client)
+        task = Task(task_name='Follow up',
+                    work=Work(work_name='Pre shoot', job=job),
+                    appointment=Appointment(description='Meeting'))
+        return TemplateDatabaseObjects(Company(name='Studio'), task)
+
+    def resolve_with_eval(self, database_objects, template_objects=None):
+        for field, object_field in OBJECT_FIELDS.items():
+            if template_objects is not None:
+                object_field = template_objects.get(field=field).object_field
+            database_objects.replace_dict[field] = eval('database_objects.' +
+                                                        object_field)
+        return database_objects.replace_dict
+
+    def resolve_with_resolvers(self, database_objects, resolvers):
+        roots = database_objects.get_roots()
+        return {field: resolver(roots) for field, resolver in resolvers}
+
+    def check_values(self, values, expected):
+        if values != expected:
+            raise CommandError(f'Values {values} differ from {expected}')
+
+    def measure(self, resolve, messages):
+        start = time.perf_counter()
+        for _ in range(messages):
+            values = resolve()
+        seconds = time.perf_counter() - start
+        return values, {
+            'messages': messages,
+            'seconds': seconds,
+            'messages_per_second': messages / seconds,
+            'microseconds_per_message': seconds / messages * 1e6,
+        }
+
+    def handle(self, *args, **options):
+        database_objects = self.build_objects()
+        resolvers = [(field, get_resolver(object_field))
+                     for field, object_field in OBJECT_FIELDS.items()]
+        messages = options['messages']
+
+        results = {}
+        expected, results['resolvers'] = self.measure(
+            lambda: self.resolve_with_resolvers(database_objects, resolvers),
+            messages)
+        values, results['eval'] = self.measure(
+            lambda: self.resolve_with_eval(database_objects), messages)
+        self.check_values(values, expected)
+
+        with transaction.atomic():
+            for field, object_field in OBJECT_FIELDS.items():
+                TemplateField.objects.update_or_create(
+                    field=field, defaults={'object_field': object_field})
+            template_objects = TemplateField.objects.all()
+            values, results['eval_with_queries'] = self.measure(
+                lambda: self.resolve_with_eval(database_objects,
+                                               template_objects),
+                options['query_messages'])
+            transaction.set_rollback(True)
+        self.check_values(values, expected)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}\t{result['messages']} messages in "
+                f"{result['seconds']:.3f}s "
+                f"({result['microseconds_per_message']:.1f} us/message)")
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.outbox import BATCH_SIZE, deliver_pending
+
+
+class Command(BaseCommand):
+    """
+    Worker delivering the emails of the outbox (refer core.outbox), the
+    outbox is polled until the worker is stopped unless --once is passed.
+    Several workers can be run side by side
+    """
+    help = 'Deliver the emails of the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval',
+                            type=float,
+                            default=5,
+                            help='seconds to wait when the outbox is empty')
+        parser.add_argument('--once',
+                            action='store_true',
+                            help='stopping once no email is due')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                # dropping the connection if it is broken or too old, so
+                # the worker reconnects instead of failing for good
+                close_old_connections()
+                sent, failed = deliver_pending(options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f'{sent} sent, {failed} failed')
+                if not sent and not failed:
+                    if options['once']:
+                        return
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Outbox worker stopped')
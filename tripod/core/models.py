@@ -69,3 +69,42 @@ class Company(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class OutboxEmail(models.Model):
+    """
+    Email waiting to be delivered, stored in the same transaction as the
+    change that sends it and delivered by the send_outbox worker (refer
+    core.outbox)
+
+    * idempotency_key -> unique key of the email, the same email is stored
+    and delivered only once
+    * status -> delivery status, dead emails are not retried anymore
+    * attempts -> number of failed deliveries
+    * next_attempt_at -> when the email is delivered (again)
+    * last_error -> error of the last failed delivery
+    """
+    PENDING = 'pe'
+    SENDING = 'se'
+    SENT = 'sn'
+    DEAD = 'dd'
+    STATUSES = [(PENDING, 'Pending'), (SENDING, 'Sending'), (SENT, 'Sent'),
+                (DEAD, 'Dead')]
+
+    idempotency_key = models.CharField(max_length=200, unique=True)
+    subject = models.CharField(max_length=500)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, null=True, blank=True)
+    to_email = models.CharField(max_length=254)
+    status = models.CharField(max_length=2, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} - {self.status}"
@@ -0,0 +1,131 @@
+"""
+Representation of the email outbox. Emails are not sent within the request,
+they are stored in OutboxEmail in the same transaction as the change that
+sends them, so an email is only sent if the change is committed and a
+failing mail server never fails or rolls back the change.
+
+Stored emails are delivered by the send_outbox worker. Failed deliveries are
+retried with exponential backoff and the email is marked as dead once the
+attempts are exhausted. Emails are delivered at least once, an email that
+was being sent by a worker that died is delivered again once its lease is
+expired.
+"""
+import random
+import uuid
+from datetime import timedelta
+from email.message import EmailMessage
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import OutboxEmail
+from tripod.tasks_lib.transports import get_transport
+
+# seconds to wait before the first retry, doubled for each failed delivery
+RETRY_DELAY = 30
+# maximum seconds to wait before a retry
+MAX_RETRY_DELAY = 60 * 60 * 6
+# failed deliveries after which the email is dead
+MAX_ATTEMPTS = 8
+# seconds that an email is reserved for the worker which is sending it
+LEASE = 300
+# number of emails claimed by the worker at once
+BATCH_SIZE = 50
+
+
+def enqueue_email(subject, body, to_email, from_email=None, key=None):
+    """
+    storing the email to be delivered, an email with the same key is stored
+    only once. returns (OutboxEmail, created)
+    """
+    if key is None:
+        key = uuid.uuid4().hex
+    return OutboxEmail.objects.get_or_create(idempotency_key=key,
+                                             defaults={
+                                                 'subject': subject,
+                                                 'body': body,
+                                                 'to_email': to_email,
+                                                 'from_email': from_email
+                                             })
+
+
+def enqueue_message(msg, key=None):
+    """storing the EmailMessage to be delivered"""
+    return enqueue_email(msg['Subject'],
+                         msg.get_content(),
+                         msg['To'],
+                         from_email=msg['From'],
+                         key=key)
+
+
+def to_message(email):
+    """building the EmailMessage of the stored email"""
+    msg = EmailMessage()
+    msg['Subject'] = email.subject
+    if email.from_email:
+        msg['From'] = email.from_email
+    msg['To'] = email.to_email
+    msg.set_content(email.body)
+    return msg
+
+
+def get_retry_delay(attempts):
+    """seconds to wait before the next attempt, with a random jitter"""
+    delay = min(RETRY_DELAY * 2**(attempts - 1), MAX_RETRY_DELAY)
+    return delay * random.uniform(0.5, 1)
+
+
+def claim_emails(limit=BATCH_SIZE):
+    """
+    reserving the emails that are due for the worker, emails locked by
+    the other workers are skipped
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                Q(status=OutboxEmail.PENDING) | Q(status=OutboxEmail.SENDING),
+                next_attempt_at__lte=now).order_by('next_attempt_at')[:limit])
+        OutboxEmail.objects.filter(
+            id__in=[email.id for email in emails]).update(
+                status=OutboxEmail.SENDING,
+                next_attempt_at=now + timedelta(seconds=LEASE))
+    return emails
+
+
+def deliver_email(email, transport=None):
+    """
+    sending the email and recording the result, returns True if sent. the
+    transport of EMAIL_TRANSPORT setting is used unless it is passed
+    """
+    try:
+        (transport or get_transport()).send_message(to_message(email))
+    except Exception as error:
+        email.attempts += 1
+        email.last_error = f'{type(error).__name__}: {error}'
+        if email.attempts >= MAX_ATTEMPTS:
+            email.status = OutboxEmail.DEAD
+        else:
+            email.status = OutboxEmail.PENDING
+            email.next_attempt_at = timezone.now() + timedelta(
+                seconds=get_retry_delay(email.attempts))
+        email.save(update_fields=[
+            'attempts', 'last_error', 'status', 'next_attempt_at'
+        ])
+        return False
+    email.status = OutboxEmail.SENT
+    email.sent_at = timezone.now()
+    email.save(update_fields=['status', 'sent_at'])
+    return True
+
+
+def deliver_pending(limit=BATCH_SIZE, transport=None):
+    """delivering the emails that are due, returns (sent, failed)"""
+    sent = failed = 0
+    for email in claim_emails(limit):
+        if deliver_email(email, transport):
+            sent += 1
+        else:
+            failed += 1
+    return sent, failed
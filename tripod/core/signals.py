@@ -0,0 +1,75 @@
+"""
+Signals of the core app, which keep the cached active company (refer
+tripod.utils.get_company) and the cached reference data of the forms (refer
+tripod.reference_data) in sync with their tables, and the table of the
+database cache which is created with the migrations.
+"""
+from django.core.management import call_command
+from django.db.models.signals import post_migrate, post_save, post_delete
+from django.dispatch import receiver
+
+from company.models import Event, Package
+from core.models import Company, CustomUser
+from settings.models import Source, Workflow, WorkType
+from tripod.reference_data import bump_reference_version
+from tripod.utils import bump_company_version
+
+# reference data of the models
+REFERENCE_MODELS = {
+    Event: 'events',
+    Package: 'packages',
+    Workflow: 'workflows',
+    Source: 'sources',
+    WorkType: 'work_types',
+}
+
+# user fields that the photographers list is built from
+PHOTOGRAPHER_FIELDS = {'email', 'is_staff', 'is_photographer'}
+
+
+@receiver([post_save, post_delete], sender=Company)
+def company_changed(sender, instance, **kwargs):
+    """bumping the company version, so all the workers load it again"""
+    bump_company_version()
+
+
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete], sender=Package)
+@receiver([post_save, post_delete], sender=Workflow)
+@receiver([post_save, post_delete], sender=Source)
+@receiver([post_save, post_delete], sender=WorkType)
+def reference_data_changed(sender, instance, **kwargs):
+    """bumping the version of the changed reference data"""
+    bump_reference_version(REFERENCE_MODELS[sender])
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    bumping the photographers version, unless the saved user cannot change
+    the list, e.g. a new client or a login which updates last_login only
+    """
+    if update_fields is not None and not PHOTOGRAPHER_FIELDS & set(
+            update_fields):
+        return
+    if created and not (instance.is_staff and instance.is_photographer):
+        return
+    bump_reference_version('photographers')
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    bump_reference_version('photographers')
+
+
+def create_cache_table(sender, using, verbosity=1, **kwargs):
+    """
+    creating the table of the database cache (refer CACHES setting) after
+    the migrations, cached pages fail without it. nothing is done if the
+    table exists or another cache backend is used
+    """
+    # one level quieter than the migrations, so the table is not reported
+    # on every migrate
+    call_command('createcachetable',
+                 database=using,
+                 verbosity=max(verbosity - 1, 0))
@@ -0,0 +1,58 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.models import Company
+from core.tests.utils import LOCMEM_CACHES
+from tripod.utils import COMPANY_VERSION_KEY, bump_company_version, get_company
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompanyCacheTest(TestCase):
+
+    def setUp(self):
+        bump_company_version()
+        self.addCleanup(bump_company_version)
+        self.company = Company.objects.create(name='Studio', active=True)
+
+    def test_company_cached_in_process(self):
+        """company should be loaded once"""
+        with self.assertNumQueries(1):
+            get_company()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_company(), self.company)
+
+    def test_saved_company_loaded_again(self):
+        """saved company should be seen right away"""
+        get_company()
+        self.company.name = 'New Studio'
+        self.company.save()
+
+        self.assertEqual(get_company().name, 'New Studio')
+
+    def test_company_changed_by_other_worker(self):
+        """change of the other worker should be seen once the TTL is passed"""
+        get_company()
+        # change of the other worker, which bumps the shared version
+        Company.objects.filter(pk=self.company.pk).update(name='New Studio')
+        cache.set(COMPANY_VERSION_KEY, 'other')
+
+        self.assertEqual(get_company().name, 'Studio')
+        later = time.monotonic() + 61
+        with mock.patch('tripod.utils.time.monotonic', return_value=later):
+            self.assertEqual(get_company().name, 'New Studio')
+        later += 61
+        with mock.patch('tripod.utils.time.monotonic', return_value=later):
+            # version is not changed again
+            with self.assertNumQueries(0):
+                get_company()
+
+    @override_settings(COMPANY_CACHE_TTL=0, COMPANY_CACHE_MAX_AGE=0)
+    def test_company_loaded_after_max_age(self):
+        """company should be loaded again even if the version is the same"""
+        get_company()
+        Company.objects.filter(pk=self.company.pk).update(name='New Studio')
+
+        self.assertEqual(get_company().name, 'New Studio')
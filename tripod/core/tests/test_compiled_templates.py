@@ -0,0 +1,134 @@
+import json
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import CustomUser
+from job.models import Job
+from settings.forms import EmailTemplateForm
+from settings.models import ContractTemplate, EmailTemplate, TemplateField
+from tripod.tasks_lib.compiled_templates import (get_compiled_template,
+                                                 invalidate_compiled_templates)
+from tripod.tasks_lib.template_prepration import get_resolver
+
+
+class CompiledTemplateTest(TestCase):
+
+    def setUp(self):
+        invalidate_compiled_templates()
+        self.addCleanup(invalidate_compiled_templates)
+        TemplateField.objects.create(field='clientName',
+                                     object_field='user.first_name')
+        TemplateField.objects.create(field='jobName',
+                                     object_field='job.job_name')
+        self.template = EmailTemplate.objects.create(
+            template_name='Reminder',
+            subject='{jobName} reminder',
+            body='Dear {clientName}, { braces } are kept {1}',
+            thank_you=' Thanks')
+
+    def test_compiled_once_per_version(self):
+        """template should be compiled again only when it is changed"""
+        compiled = get_compiled_template(self.template)
+        with self.assertNumQueries(0):
+            self.assertIs(get_compiled_template(self.template), compiled)
+
+        self.template.subject = 'New {jobName}'
+        self.template.save()
+        recompiled = get_compiled_template(self.template)
+        self.assertIsNot(recompiled, compiled)
+        self.assertEqual(
+            recompiled.render({
+                'jobName': 'Wedding',
+                'clientName': 'Ann'
+            }).subject, 'New Wedding')
+
+    def test_template_field_change_drops_compiled(self):
+        """changed template fields should bump the template versions"""
+        compiled = get_compiled_template(self.template)
+        TemplateField.objects.filter(field='jobName').update(
+            object_field='job.venue')
+        TemplateField.objects.get(field='jobName').save()
+
+        self.template.refresh_from_db()
+        self.assertGreater(self.template.changed_at, compiled.version)
+        self.assertEqual(
+            get_compiled_template(self.template).object_fields['jobName'],
+            'job.venue')
+
+    def test_render_does_not_change_template(self):
+        """rendering should not change the template object"""
+        compiled = get_compiled_template(self.template)
+        content = compiled.render({'jobName': 'Wedding', 'clientName': 'Ann'})
+
+        self.assertEqual(content.subject, 'Wedding reminder')
+        self.assertEqual(content.body, 'Dear Ann, { braces } are kept {1}')
+        self.assertEqual(content.thank_you, ' Thanks')
+        self.assertEqual(self.template.subject, '{jobName} reminder')
+        self.assertEqual(sorted(compiled.fields), ['clientName', 'jobName'])
+        with self.assertRaises(AttributeError):
+            compiled.subject = 'changed'
+
+    def test_invalid_placeholder_rejected_on_save(self):
+        """template with an unknown placeholder should not be saved"""
+        with self.assertRaisesMessage(ValidationError,
+                                      'Passes field (unknownField) not valid'):
+            ContractTemplate.objects.create(template_name='Contract',
+                                            subject='Contract',
+                                            body='Dear {unknownField}',
+                                            thank_you='Thanks')
+
+        form = EmailTemplateForm(data={
+            'template_name': 'Reminder',
+            'subject': '{unknownField}',
+            'body': 'Dear {clientName}',
+            'thank_you': 'Thanks'
+        },
+                                 userObj=None,
+                                 operation='creating')
+        self.assertFalse(form.is_valid())
+        self.assertIn('subject', form.errors)
+
+
+class ResolverTest(TestCase):
+
+    def test_object_field_resolved(self):
+        """object field should be resolved from its root"""
+        objects = {
+            'user': CustomUser(email='client@mail.com', first_name='Ann'),
+            'job': Job(job_name='Wedding')
+        }
+
+        self.assertEqual(get_resolver('user.first_name')(objects), 'Ann')
+        self.assertEqual(get_resolver('job')(objects).job_name, 'Wedding')
+        self.assertIs(get_resolver('user.email'),
+                      get_resolver('user.email'))
+
+    def test_unsafe_object_field_rejected(self):
+        """object fields out of the roots or to private values should fail"""
+        for object_field in ('self.user.email', 'user.__class__',
+                             'user._state', 'user.password',
+                             'job.job_name()', '__import__'):
+            with self.assertRaisesMessage(
+                    Exception, f'Object field ({object_field}) not valid'):
+                get_resolver(object_field)
+
+        with self.assertRaises(ValidationError):
+            TemplateField.objects.create(field='password',
+                                         object_field='user.password')
+
+    def test_bench_template_resolvers(self):
+        """benchmark should compare resolvers with eval"""
+        stdout = StringIO()
+        call_command('bench_template_resolvers',
+                     messages=10,
+                     query_messages=2,
+                     json=True,
+                     stdout=stdout)
+        results = json.loads(stdout.getvalue())
+
+        self.assertEqual(set(results),
+                         {'resolvers', 'eval', 'eval_with_queries'})
+        self.assertFalse(TemplateField.objects.exists())
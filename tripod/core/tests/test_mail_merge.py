@@ -0,0 +1,116 @@
+from django.test import TestCase, override_settings
+
+from core.models import Company, CustomUser, OutboxEmail
+from core.tests.utils import LOCMEM_CACHES
+from job.models import Job, Task, Work
+from settings.models import EmailTemplate, TemplateField
+from tripod.tasks_lib.mail_merge import mail_merge
+from tripod.tasks_lib.transports import MemoryTransport
+
+
+class RefusingTransport(MemoryTransport):
+    """memory transport refusing the messages to the refused address"""
+
+    def send_message(self, msg):
+        if msg['To'] == 'refused@mail.com':
+            raise Exception('recipient refused')
+        super().send_message(msg)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MailMergeTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(MemoryTransport.outbox.clear)
+        Company.objects.create(name='Studio', active=True)
+        TemplateField.objects.create(field='clientName',
+                                     object_field='user.first_name')
+        TemplateField.objects.create(field='jobName',
+                                     object_field='job.job_name')
+        TemplateField.objects.create(field='companyName',
+                                     object_field='company.name')
+        TemplateField.objects.create(field='taskName',
+                                     object_field='task.task_name')
+        self.template = EmailTemplate.objects.create(
+            template_name='Reminder',
+            subject='{jobName} reminder',
+            body='Dear {clientName}, {companyName} is ready.',
+            thank_you=' Thanks')
+        self.jobs = [
+            self.create_job(f'Job {index}', f'client{index}@mail.com')
+            for index in range(5)
+        ]
+
+    def create_job(self, name, email):
+        client = CustomUser.objects.create_user(email,
+                                                'abcd@123',
+                                                first_name=name + ' client')
+        return Job.objects.create(job_name=name,
+                                  primary_client=client,
+                                  status='job')
+
+    def test_merge_renders_without_queries_per_job(self):
+        """jobs should be loaded and the template compiled once"""
+        with self.assertNumQueries(3):
+            report = mail_merge(self.template,
+                                Job.objects.order_by('id'),
+                                transport=MemoryTransport(),
+                                batch_size=2)
+
+        self.assertEqual(len(report.succeeded()), 5)
+        msg = MemoryTransport.outbox[0]
+        self.assertEqual(msg['To'], 'client0@mail.com')
+        self.assertEqual(msg['Subject'], 'Job 0 reminder')
+        self.assertEqual(msg.get_content().strip(),
+                         'Dear Job 0 client, Studio is ready. Thanks')
+        # template is not changed by rendering
+        self.template.refresh_from_db()
+        self.assertEqual(self.template.subject, '{jobName} reminder')
+
+    def test_merge_to_tasks(self):
+        """tasks should be rendered with their task and job"""
+        work = Work.objects.create(work_name='Pre', work_order=1,
+                                   job=self.jobs[0])
+        Task.objects.create(task_name='Reminder',
+                            task_order=1,
+                            work=work,
+                            description='Reminder',
+                            task_type=Task.EMAIL)
+        self.template.subject = '{taskName} of {jobName}'
+        self.template.save()
+        report = mail_merge(self.template,
+                            Task.objects.all(),
+                            transport=MemoryTransport())
+
+        self.assertEqual(len(report.succeeded()), 1)
+        self.assertEqual(MemoryTransport.outbox[0]['Subject'],
+                         'Reminder of Job 0')
+
+    def test_failed_recipient_recorded(self):
+        """failed recipients should not stop the merge and be enqueued"""
+        refused = self.create_job('Refused job', 'refused@mail.com')
+        report = mail_merge(self.template,
+                            Job.objects.order_by('id'),
+                            transport=RefusingTransport(),
+                            batch_size=4)
+
+        self.assertEqual(len(report.succeeded()), 5)
+        failed = report.failed()
+        self.assertEqual([result.object_id for result in failed],
+                         [refused.pk])
+        self.assertIn('recipient refused', failed[0].message)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to_email, 'refused@mail.com')
+        self.assertEqual(email.subject, 'Refused job reminder')
+
+    def test_render_failure_recorded(self):
+        """jobs which cannot be rendered should be recorded as failed"""
+        self.template.body = '{taskName}'
+        self.template.save()
+        report = mail_merge(self.template,
+                            Job.objects.all(),
+                            transport=MemoryTransport())
+
+        self.assertEqual(len(report.failed()), 5)
+        self.assertIn('AttributeError', report.failed()[0].message)
+        self.assertEqual(MemoryTransport.outbox, [])
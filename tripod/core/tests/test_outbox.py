@@ -0,0 +1,99 @@
+import socket
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import CustomUser, OutboxEmail
+from core.outbox import MAX_ATTEMPTS, deliver_pending, enqueue_email
+from core.utils import send_code
+from tripod.tasks_lib.smtp_pool import reset_smtp_pool
+from tripod.tasks_lib.smtp_standin import SMTPStandIn
+
+
+def free_port():
+    """port that nothing is listening on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class OutboxTest(TestCase):
+
+    def setUp(self):
+        reset_smtp_pool()
+        self.addCleanup(reset_smtp_pool)
+
+    def test_email_enqueued_once_per_key(self):
+        """emails with the same key should be stored only once"""
+        _, created = enqueue_email('Subject', 'Body', 'to@mail.com', key='a')
+        _, created_again = enqueue_email('Subject', 'Body', 'to@mail.com',
+                                         key='a')
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_email_rolled_back_with_change(self):
+        """email should not be stored if the change is rolled back"""
+        with self.assertRaises(Exception):
+            with transaction.atomic():
+                enqueue_email('Subject', 'Body', 'to@mail.com')
+                raise Exception('change failed')
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_send_code_is_enqueued(self):
+        """password code should be stored in the outbox, not sent"""
+        user = CustomUser.objects.create_user('client@mail.com',
+                                              'abcd@123',
+                                              password_change_code='1234')
+        send_code(user)
+        send_code(user)
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to_email, 'client@mail.com')
+        self.assertIn('1234', email.body)
+
+    def test_pending_emails_delivered(self):
+        """due emails should be delivered by the worker"""
+        enqueue_email('Subject', 'Body', 'to@mail.com')
+        enqueue_email('Subject', 'Body', 'other@mail.com')
+        with SMTPStandIn(keep_messages=True) as server:
+            with override_settings(EMAIL_HOST=server.host,
+                                   EMAIL_PORT=server.port,
+                                   EMAIL_USE_SSL=False):
+                # the connection is held by the test transaction, the way the
+                # test client keeps it from being closed between requests
+                with mock.patch('core.management.commands.send_outbox.'
+                                'close_old_connections'):
+                    call_command('send_outbox', once=True, stdout=StringIO())
+                reset_smtp_pool()
+
+        self.assertEqual(server.received, 2)
+        self.assertIn(b'To: to@mail.com', server.messages[0])
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.SENT).count(), 2)
+
+    @override_settings(EMAIL_HOST='127.0.0.1', EMAIL_USE_SSL=False)
+    def test_failed_email_retried_with_backoff(self):
+        """failed email should be retried later, and dead once exhausted"""
+        email, _ = enqueue_email('Subject', 'Body', 'to@mail.com')
+        with self.settings(EMAIL_PORT=free_port()):
+            self.assertEqual(deliver_pending(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+            self.assertIn('ConnectionRefusedError', email.last_error)
+            # not due yet
+            self.assertEqual(deliver_pending(), (0, 0))
+
+            for _ in range(MAX_ATTEMPTS - 1):
+                OutboxEmail.objects.update(next_attempt_at=timezone.now())
+                deliver_pending()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.DEAD)
+        self.assertEqual(email.attempts, MAX_ATTEMPTS)
@@ -0,0 +1,78 @@
+import time
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.signals import create_cache_table
+from tripod.process_cache import (clear_process_cache, get_cached,
+                                  set_cached)
+
+
+class ProcessCacheTest(TestCase):
+    """process cache in front of the configured cache, the database cache"""
+
+    def setUp(self):
+        clear_process_cache()
+        self.addCleanup(clear_process_cache)
+
+    def test_value_read_from_shared_cache_once(self):
+        """value should be read from the shared cache once per TTL"""
+        cache.set('key', 'value')
+        with self.assertNumQueries(1):
+            self.assertEqual(get_cached('key'), 'value')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached('key'), 'value')
+
+        # change of another worker
+        cache.set('key', 'other')
+        self.assertEqual(get_cached('key'), 'value')
+        later = time.monotonic() + 11
+        with mock.patch('tripod.process_cache.time.monotonic',
+                        return_value=later):
+            self.assertEqual(get_cached('key'), 'other')
+
+    def test_set_value_kept_in_process(self):
+        """set value should be read without queries, up to its timeout"""
+        set_cached('key', 'value', 60)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached('key'), 'value')
+        self.assertEqual(cache.get('key'), 'value')
+
+        # expired right away, so it is not kept either
+        set_cached('key', 'other', 0)
+        self.assertIsNone(get_cached('key'))
+
+    def test_missing_value_not_kept(self):
+        """missing value should be read again from the shared cache"""
+        self.assertIsNone(get_cached('key'))
+        cache.set('key', 'value')
+        self.assertEqual(get_cached('key'), 'value')
+
+    @override_settings(PROCESS_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_dropped(self):
+        """process should keep only the most recently used values"""
+        for key in ('a', 'b'):
+            set_cached(key, key, 60)
+        get_cached('a')
+        set_cached('c', 'c', 60)
+
+        with self.assertNumQueries(0):
+            get_cached('a')
+            get_cached('c')
+        with self.assertNumQueries(1):
+            get_cached('b')
+
+    def test_cache_table_created_after_migrations(self):
+        """missing table of the database cache should be created"""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE %s' %
+                           connection.ops.quote_name('tripod_cache'))
+        create_cache_table(apps.get_app_config('core'),
+                           using='default',
+                           verbosity=0)
+
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
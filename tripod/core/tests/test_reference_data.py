@@ -0,0 +1,139 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from company.models import Event, Package
+from core.forms import JobPackageUpdate, JobReqCreatedForm
+from core.models import CustomUser
+from core.tests.utils import LOCMEM_CACHES
+from tripod.process_cache import clear_process_cache, remember
+from tripod.reference_data import (get_reference_choices,
+                                   get_reference_version, get_version_key)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReferenceDataTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_process_cache()
+        self.addCleanup(clear_process_cache)
+        self.user = CustomUser.objects.create_user('client@mail.com',
+                                                   'abcd@123')
+        self.event = Event.objects.create(event_name='Wedding',
+                                          description='Wedding')
+        self.package = Package.objects.create(package_name='Gold',
+                                              description='Gold')
+
+    def test_choices_built_from_cache(self):
+        """form choices should be rendered without queries once cached"""
+        str(JobReqCreatedForm(userObj=self.user)['event'])
+        with self.assertNumQueries(0):
+            html = str(JobReqCreatedForm(userObj=self.user)['event'])
+        self.assertIn('Wedding', html)
+
+    def test_submitted_value_loaded_from_db(self):
+        """selected object should be loaded once with all its fields"""
+        JobPackageUpdate()
+        form = JobPackageUpdate(data={'package': self.package.pk})
+        self.assertTrue(form.is_valid())
+        package = form.cleaned_data['package']
+        with self.assertNumQueries(0):
+            self.assertEqual(package.package_name, 'Gold')
+            self.assertEqual(package.description, 'Gold')
+
+        form = JobPackageUpdate(data={'package': self.package.pk + 1})
+        self.assertFalse(form.is_valid())
+        self.assertIn('package', form.errors)
+
+    def test_submitted_value_not_taken_from_stale_choices(self):
+        """
+        choices changed by another worker should be validated in the db,
+        e.g. while the cached choices are not refreshed yet
+        """
+        JobPackageUpdate()
+        version = get_reference_version('packages')
+        silver = Package.objects.create(package_name='Silver',
+                                        description='Silver')
+        Package.objects.filter(pk=self.package.pk).delete()
+        # version bumped by the changes is not seen by this worker yet
+        remember(get_version_key('packages'), version)
+        self.assertNotIn(silver.pk,
+                         dict(get_reference_choices('packages')))
+
+        form = JobPackageUpdate(data={'package': silver.pk})
+        self.assertTrue(form.is_valid())
+        form = JobPackageUpdate(data={'package': self.package.pk})
+        self.assertFalse(form.is_valid())
+        self.assertIn('package', form.errors)
+
+    def test_changed_reference_data_seen(self):
+        """saved objects should bump the version and be in the choices"""
+        JobReqCreatedForm(userObj=self.user)
+        Event.objects.create(event_name='Birthday', description='Birthday')
+
+        html = str(JobReqCreatedForm(userObj=self.user)['event'])
+        self.assertIn('Birthday', html)
+
+    def test_photographers_version(self):
+        """photographers should be bumped only by the changes of the list"""
+        version = get_reference_version('photographers')
+        CustomUser.objects.create_user('other@mail.com', 'abcd@123')
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(get_reference_version('photographers'), version)
+
+        photographer = CustomUser.objects.create_user('photo@mail.com',
+                                                      'abcd@123',
+                                                      is_staff=True,
+                                                      is_photographer=True)
+        self.assertNotEqual(get_reference_version('photographers'), version)
+        html = str(JobReqCreatedForm(userObj=self.user)['photographer'])
+        self.assertIn(photographer.email, html)
+        self.assertNotIn('other@mail.com', html)
+
+
+class ReferenceDataDatabaseCacheTest(TestCase):
+    """choices cached in the configured cache, the database cache"""
+
+    def setUp(self):
+        clear_process_cache()
+        self.addCleanup(clear_process_cache)
+        self.user = CustomUser.objects.create_user('client@mail.com',
+                                                   'abcd@123')
+        Event.objects.create(event_name='Wedding', description='Wedding')
+
+    def test_choices_rendered_without_queries(self):
+        """forms should be rendered without queries once cached"""
+        str(JobReqCreatedForm(userObj=self.user))
+        with self.assertNumQueries(0):
+            html = str(JobReqCreatedForm(userObj=self.user)['event'])
+            str(JobReqCreatedForm(userObj=self.user))
+        self.assertIn('Wedding', html)
+
+        # versions are checked in the shared cache once the TTL is passed
+        later = time.monotonic() + 11
+        with mock.patch('tripod.process_cache.time.monotonic',
+                        return_value=later):
+            # versions of the events and the photographers of the form
+            with self.assertNumQueries(2):
+                str(JobReqCreatedForm(userObj=self.user)['event'])
+            with self.assertNumQueries(0):
+                str(JobReqCreatedForm(userObj=self.user)['event'])
+
+    def test_version_changed_by_other_worker(self):
+        """choices of the other worker should be seen once the TTL is passed"""
+        str(JobReqCreatedForm(userObj=self.user)['event'])
+        version = get_reference_version('events')
+        Event.objects.create(event_name='Birthday', description='Birthday')
+        # this worker has not seen the change of the other worker yet
+        remember(get_version_key('events'), version)
+        html = str(JobReqCreatedForm(userObj=self.user)['event'])
+        self.assertNotIn('Birthday', html)
+
+        later = time.monotonic() + 11
+        with mock.patch('tripod.process_cache.time.monotonic',
+                        return_value=later):
+            html = str(JobReqCreatedForm(userObj=self.user)['event'])
+        self.assertIn('Birthday', html)
@@ -0,0 +1,66 @@
+from email.message import EmailMessage
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from tripod.tasks_lib.smtp_pool import SMTPConnectionPool
+from tripod.tasks_lib.smtp_standin import SMTPStandIn
+
+
+class SMTPConnectionPoolTest(SimpleTestCase):
+
+    def setUp(self):
+        self.server = SMTPStandIn().start()
+        self.addCleanup(self.server.stop)
+
+    def get_pool(self, **kwargs):
+        pool = SMTPConnectionPool(self.server.host,
+                                  self.server.port,
+                                  username='test',
+                                  password='test',
+                                  use_ssl=False,
+                                  **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def message(self):
+        msg = EmailMessage()
+        msg['Subject'] = 'Test'
+        msg['From'] = 'from@mail.com'
+        msg['To'] = 'to@mail.com'
+        msg.set_content('Test message')
+        return msg
+
+    def test_connection_reused_for_messages(self):
+        """messages should be sent over a single logged in connection"""
+        pool = self.get_pool()
+        for _ in range(5):
+            pool.send_message(self.message())
+
+        self.assertEqual(pool.opened, 1)
+        self.assertEqual(self.server.received, 5)
+
+    def test_reconnect_after_dropped_connection(self):
+        """message should be sent over a new connection if it is dropped"""
+        pool = self.get_pool()
+        pool.send_message(self.message())
+        # connection is dropped while it is idle
+        pool._idle[0][0].close()
+        pool.send_message(self.message())
+
+        self.assertEqual(pool.opened, 2)
+        self.assertEqual(self.server.received, 2)
+
+    def test_idle_connections_checked_and_expired(self):
+        """idle connections should be checked, and closed once expired"""
+        pool = self.get_pool(check_after=0)
+        pool.send_message(self.message())
+        with mock.patch('smtplib.SMTP.noop', return_value=(421, b'')) as noop:
+            pool.send_message(self.message())
+        noop.assert_called_once()
+        self.assertEqual(pool.opened, 2)
+
+        pool = self.get_pool(idle_timeout=0)
+        pool.send_message(self.message())
+        pool.send_message(self.message())
+        self.assertEqual(pool.opened, 2)
@@ -0,0 +1,31 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.management.commands.bench_startup import HEAVY_MODULES
+
+# loading django and all the urls (and their views) in a fresh interpreter
+PROBE = '''
+import json, sys
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps([m for m in %r if m in sys.modules]))
+''' % (HEAVY_MODULES, )
+
+
+class StartupTest(SimpleTestCase):
+
+    def test_heavy_modules_not_loaded_at_startup(self):
+        """analytics and pdf libraries should be loaded on first use only"""
+        output = subprocess.run([sys.executable, '-c', PROBE],
+                                cwd=settings.BASE_DIR,
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout
+
+        self.assertEqual(json.loads(output.strip().splitlines()[-1]), [])
@@ -0,0 +1,101 @@
+import json
+import os
+import smtplib
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import OutboxEmail
+from core.outbox import deliver_pending, enqueue_email, to_message
+from job.models import Job, Task
+from tripod.tasks_lib.transports import (BaseTransport, FileTransport,
+                                         LocalSMTPTransport, MemoryTransport,
+                                         get_transport, reset_transport)
+
+
+class TransportTest(TestCase):
+
+    def setUp(self):
+        reset_transport()
+        self.addCleanup(reset_transport)
+        self.addCleanup(MemoryTransport.outbox.clear)
+
+    @override_settings(
+        EMAIL_TRANSPORT='tripod.tasks_lib.transports.MemoryTransport')
+    def test_transport_selected_by_settings(self):
+        """outbox should be delivered through the transport of the settings"""
+        enqueue_email('Subject', 'Body', 'to@mail.com')
+
+        self.assertIsInstance(get_transport(), MemoryTransport)
+        self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual(MemoryTransport.outbox[0]['To'], 'to@mail.com')
+
+    def test_incomplete_transport_not_created(self):
+        """transport without send_message should fail when it is created"""
+
+        class IncompleteTransport(BaseTransport):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteTransport()
+
+    def test_file_transport_spools_messages(self):
+        """messages should be written into the spool directory"""
+        enqueue_email('Subject', 'Body', 'to@mail.com')
+        enqueue_email('Subject', 'Body', 'other@mail.com')
+        with tempfile.TemporaryDirectory() as path:
+            self.assertEqual(deliver_pending(transport=FileTransport(path)),
+                             (2, 0))
+            names = os.listdir(path)
+            with open(os.path.join(path, names[0]), 'rb') as spool_file:
+                content = spool_file.read()
+
+        self.assertEqual(len(names), 2)
+        self.assertIn(b'Subject: Subject', content)
+
+    def test_local_smtp_transport(self):
+        """messages should be sent over a single connection to the stand-in"""
+        transport = LocalSMTPTransport()
+        self.addCleanup(transport.close)
+        for index in range(3):
+            enqueue_email('Subject', 'Body', f'to{index}@mail.com')
+
+        self.assertEqual(deliver_pending(transport=transport), (3, 0))
+        self.assertEqual(transport.server.received, 3)
+        self.assertEqual(transport.pool.opened, 1)
+
+    def test_refused_message_keeps_connection(self):
+        """refused message should fail alone, over the same connection"""
+        transport = LocalSMTPTransport()
+        self.addCleanup(transport.close)
+        messages = [
+            to_message(OutboxEmail(subject='Subject',
+                                   body='Body',
+                                   to_email=to_email))
+            for to_email in ('to@mail.com', 'refused@mail.com',
+                             'other@mail.com')
+        ]
+        failures = transport.send_messages(messages)
+
+        self.assertEqual(list(failures), [1])
+        self.assertIsInstance(failures[1], smtplib.SMTPRecipientsRefused)
+        self.assertEqual(transport.server.received, 2)
+        self.assertEqual(transport.pool.opened, 1)
+
+    def test_bench_email_tasks(self):
+        """benchmark should process the email tasks and roll them back"""
+        stdout = StringIO()
+        call_command('bench_email_tasks',
+                     tasks=3,
+                     backends=['memory', 'file'],
+                     json=True,
+                     stdout=stdout)
+        results = json.loads(stdout.getvalue())
+
+        self.assertEqual(results['memory']['sent'], 3)
+        self.assertEqual(results['file']['failed'], 0)
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(OutboxEmail.objects.exists())
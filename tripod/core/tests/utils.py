@@ -0,0 +1,8 @@
+# cache of the test process, for the tests that count the queries (queries
+# of the db cache are not counted then) or that render in threads, which do
+# not see the cache table written in the transaction of the test
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
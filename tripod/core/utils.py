@@ -8,4 +8,5 @@ def send_code(user):
     body = f"Please use the this reset code \n {user.password_change_code} \n\n *DON'T SHARE WITH ANYONE*"
     ec = EmailClient()
     ec.new_content(body, subject, user.email)
-    ec.send_email(is_task=False)
+    ec.send_email(is_task=False,
+                  key=f'password-code-{user.pk}-{user.password_change_code}')
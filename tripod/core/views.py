@@ -8,7 +8,8 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 
-from tripod.utils import superuser_check, force_password_change_check
+from tripod.utils import (superuser_check, force_password_change_check,
+                          get_company)
 
 from job.models import Job, JobContract, JobQuestionnaire, Task, Work
 from job.utils import get_job_completed_percentage
@@ -21,7 +22,6 @@ from blog.forms import CustomerCreationForm as BlogCustomerCreationForm
 from core.forms import (CustomUserCreationForm, JobUserUpdateForm,
                         CustomUserChangeForm, QuestionnaireUpdate,
                         JobReqCreatedForm, JobPackageUpdate)
-from core.models import Company
 
 from company.models import PackageLinkProduct
 
@@ -283,7 +283,7 @@ def contractPage(request, pk):
 @user_passes_test(force_password_change_check, login_url='core:changePassword')
 def invoicePage(request, pk):
     """showing contract for user"""
-    company = Company.objects.filter(active=True).first()
+    company = get_company()
     invoice = Invoice.objects.get(pk=pk)
     pkgLink = PackageLinkProduct.objects.filter(package=invoice.job.package)
     context = {'invoice': invoice, 'pkgLink': pkgLink, 'company': company}
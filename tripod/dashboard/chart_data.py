@@ -0,0 +1,161 @@
+"""
+Representation of the chart data of the dashboard. Values are aggregated in
+the db into day, week or month buckets, picked by the span of the date
+range, so the size of the data is bounded however long the history is.
+Empty buckets are filled with numpy.
+
+Chart data is shared as json (refer views.dashboardChartData) and used by
+the chart images (refer charts).
+"""
+from datetime import timedelta
+from functools import partial
+
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+
+from job.models import Job
+
+from finance.models import PaymentHistory
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+# (maximum span in days, bucket), the first bucket the span fits in is used
+BUCKETS = [(62, DAY), (366, WEEK), (None, MONTH)]
+TRUNCS = {DAY: TruncDay, WEEK: TruncWeek, MONTH: TruncMonth}
+# days of the range when the start date is not available
+DEFAULT_SPAN = 30
+
+
+def get_bucket(start_date, end_date):
+    """returning the bucket for the span of the range"""
+    span = (end_date - start_date).days + 1
+    for max_span, bucket in BUCKETS:
+        if max_span is None or span <= max_span:
+            return bucket
+
+
+def get_bucket_starts(start_date, end_date, bucket):
+    """returning numpy array of the start dates of all the buckets"""
+    import numpy as np
+
+    if bucket == MONTH:
+        months = np.arange(np.datetime64(start_date, 'M'),
+                           np.datetime64(end_date, 'M') + 1)
+        return months.astype('datetime64[D]')
+    step = 7 if bucket == WEEK else 1
+    if bucket == WEEK:
+        # weeks start on monday
+        start_date = start_date - timedelta(days=start_date.weekday())
+    return np.arange(np.datetime64(start_date, 'D'),
+                     np.datetime64(end_date, 'D') + 1, step)
+
+
+def fill_buckets(starts, keys, values):
+    """
+    placing the values into their buckets, buckets without values are 0.
+    keys are the bucket start dates of the values
+    """
+    import numpy as np
+
+    filled = np.zeros(len(starts))
+    if len(keys):
+        keys = np.array(keys, dtype='datetime64[D]')
+        np.add.at(filled, np.searchsorted(starts, keys),
+                  np.array(values, dtype=float))
+    return filled
+
+
+def get_date_range(qs, field, start_date=None, end_date=None):
+    """
+    returning (start_date, end_date) of the chart, end date is today and
+    start date is the first date of the field if they are not given
+    """
+    if end_date is None:
+        end_date = timezone.localdate()
+    if start_date is None:
+        first = qs.aggregate(first=Min(field))['first']
+        if first is None:
+            start_date = end_date - timedelta(days=DEFAULT_SPAN)
+        else:
+            start_date = timezone.localdate(first)
+    return min(start_date, end_date), end_date
+
+
+def bucketed_values(qs, field, value, start_date, end_date, group=None):
+    """
+    aggregating the value of the queryset into the buckets of the date
+    field, returns (bucket, bucket starts, {group: values}).
+    """
+    bucket = get_bucket(start_date, end_date)
+    fields = ['period'] + ([group] if group else [])
+    rows = qs.filter(**{
+        f'{field}__date__gte': start_date,
+        f'{field}__date__lte': end_date
+    }).annotate(period=TRUNCS[bucket](field)).values(*fields).annotate(
+        value=value).order_by(*fields)
+
+    grouped = {}
+    for row in rows:
+        keys, values = grouped.setdefault(row[group] if group else None,
+                                          ([], []))
+        keys.append(row['period'].date())
+        values.append(row['value'] or 0)
+
+    starts = get_bucket_starts(start_date, end_date, bucket)
+    return bucket, starts, {
+        name: fill_buckets(starts, keys, values)
+        for name, (keys, values) in grouped.items()
+    }
+
+
+def chart_data(bucket, starts, series, empty='No Name'):
+    """
+    preparing the chart data to be shared as json, series without name are
+    named as empty
+    """
+    return {
+        'bucket': bucket,
+        'labels': [str(start) for start in starts],
+        'series': [{
+            'name': empty if name is None else name,
+            'data': values.tolist(),
+            'total': float(values.sum())
+        } for name, values in series.items()],
+    }
+
+
+def payments_chart_data(start_date=None, end_date=None):
+    """payments summed up into the buckets of the payment date"""
+    qs = PaymentHistory.objects.all()
+    start_date, end_date = get_date_range(qs, 'payment_date', start_date,
+                                          end_date)
+    bucket, starts, series = bucketed_values(qs, 'payment_date',
+                                             Sum('payment_amount'),
+                                             start_date, end_date)
+    payments = series.get(None)
+    if payments is None:
+        payments = fill_buckets(starts, [], [])
+    return chart_data(bucket, starts, {'Payments': payments})
+
+
+def jobs_chart_data(group, empty, start_date=None, end_date=None):
+    """number of created jobs for each value of the group in the buckets"""
+    qs = Job.objects.all()
+    start_date, end_date = get_date_range(qs, 'created_at', start_date,
+                                          end_date)
+    return chart_data(*bucketed_values(qs, 'created_at', Count('id'),
+                                       start_date, end_date, group),
+                      empty=empty)
+
+
+# {name: function returning the chart data for (start_date, end_date)}
+CHART_DATA = {
+    'payments':
+    payments_chart_data,
+    'jobs_by_source':
+    partial(jobs_chart_data, 'source__source', 'No Source'),
+    'jobs_by_package':
+    partial(jobs_chart_data, 'package__package_name', 'No Package'),
+}
@@ -0,0 +1,37 @@
+"""
+Rendering of the dashboard charts into PNG images. This module only depends
+on matplotlib, so it can be imported by the worker processes that render the
+charts without setting up django.
+"""
+from io import BytesIO
+
+
+def render_chart(chart):
+    """
+    rendering the chart into PNG bytes, chart is a dict of
+
+    * x -> labels of the x axis
+    * y -> values of the y axis
+    * xlabel -> title of the x axis
+    * ylabel -> title of the y axis
+    * plt_type -> line or bar
+    """
+    # figure is used instead of pyplot, so no global state is shared
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(8, 4))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    if chart['plt_type'] == 'line':
+        axes.plot(chart['x'], chart['y'])
+    else:
+        axes.bar(chart['x'], chart['y'])
+    axes.tick_params(axis='x', labelrotation=45)
+    axes.set_xlabel(chart['xlabel'])
+    axes.set_ylabel(chart['ylabel'])
+    figure.tight_layout()
+
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
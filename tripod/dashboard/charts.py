@@ -0,0 +1,91 @@
+"""
+Representation of the dashboard charts. Each chart is built from a series
+that is queried from the db, and the rendered image is cached with a key of
+the hash of the series, so an unchanged chart is never rendered again. The
+image is kept in the process too (refer tripod.process_cache), so it is
+read from the shared cache once per process.
+
+Charts are rendered in a pool of worker processes (refer chart_render), and
+served from their own URL, so the images can be cached by the browser.
+"""
+import hashlib
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from tripod.process_cache import get_cached, set_cached
+
+from dashboard.chart_render import render_chart
+from dashboard.dash_utils import payment_series, jobs_by_source_series
+
+# {name: function returning the chart series}
+CHARTS = {
+    'payments': payment_series,
+    'jobs_by_source': jobs_by_source_series,
+}
+# seconds that a rendered chart is kept in the cache
+CHART_CACHE_TIMEOUT = 60 * 60 * 24
+# seconds to wait for a chart to be rendered
+RENDER_TIMEOUT = 30
+
+_pool = None
+
+
+def get_chart_series(name):
+    """returning the series of the chart"""
+    if name not in CHARTS:
+        raise Exception(f'Chart ({name}) is not available')
+    return CHARTS[name]()
+
+
+def get_chart_version(series):
+    """returning the hash of the series, which changes with the series"""
+    data = json.dumps(series, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+def get_render_pool():
+    """
+    returning the pool of the processes that render the charts, processes
+    are spawned so they do not inherit the threads and connections of the
+    web server process
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'DASHBOARD_CHART_PROCESSES', 2),
+            mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def reset_render_pool():
+    """dropping the pool, e.g. when one of its processes died"""
+    global _pool
+    _pool = None
+
+
+def render_chart_png(name, series, version=None):
+    """returning the PNG of the chart, rendered only if it is not cached"""
+    if version is None:
+        version = get_chart_version(series)
+    key = f'dashboard-chart-{name}-{version}'
+    # version is part of the key and the PNG of a key never changes, so it
+    # is kept in the process for as long as in the shared cache
+    png = get_cached(key, CHART_CACHE_TIMEOUT)
+    if png is None:
+        if getattr(settings, 'DASHBOARD_CHART_PROCESSES', 2):
+            try:
+                png = get_render_pool().submit(render_chart, series).result(
+                    timeout=RENDER_TIMEOUT)
+            except BrokenProcessPool:
+                # a new pool is started for the next chart
+                reset_render_pool()
+                raise
+        else:
+            png = render_chart(series)
+        set_cached(key, png, CHART_CACHE_TIMEOUT, CHART_CACHE_TIMEOUT)
+    return png
@@ -0,0 +1,79 @@
+"""
+Representation of the cohorts, groups of the records by how many days ago a
+date of them is (e.g. users by the days since they joined). Cohorts are
+counted with conditional aggregates, so any number of cohorts is counted
+with a single query without loading the records.
+
+Cohorts are (minimum days, maximum days) ranges, the maximum is None for
+the last open ended one. Defaults can be changed with the
+DASHBOARD_COHORTS setting.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+# (minimum days, maximum days) of the cohorts
+DEFAULT_COHORTS = [(0, 10), (10, 30), (30, 90), (90, None)]
+
+
+def get_cohorts():
+    """returning the configured cohorts"""
+    return getattr(settings, 'DASHBOARD_COHORTS', DEFAULT_COHORTS)
+
+
+def cohort_key(cohort):
+    """key of the cohort in the aggregates, e.g. cohort_10_30"""
+    min_days, max_days = cohort
+    return f'cohort_{min_days}_{"plus" if max_days is None else max_days}'
+
+
+def cohort_label(cohort):
+    """label of the cohort, e.g. 10-30 days"""
+    min_days, max_days = cohort
+    if max_days is None:
+        return f'{min_days}+ days'
+    return f'{min_days}-{max_days} days'
+
+
+def cohort_aggregates(field, cohorts=None, now=None):
+    """
+    returning {cohort key: conditional count} of the records whose field
+    is in the range of the cohort, to be used in aggregate or annotate
+    """
+    if cohorts is None:
+        cohorts = get_cohorts()
+    if now is None:
+        now = timezone.now()
+    aggregates = {}
+    for cohort in cohorts:
+        min_days, max_days = cohort
+        lookup = Q(**{f'{field}__lte': now - timedelta(days=min_days)})
+        if max_days is not None:
+            lookup &= Q(**{f'{field}__gt': now - timedelta(days=max_days)})
+        aggregates[cohort_key(cohort)] = Count('pk', filter=lookup)
+    return aggregates
+
+
+def cohort_rows(counts, cohorts):
+    """
+    returning [{'key', 'label', 'count'}] of the cohorts from the result of
+    the aggregates
+    """
+    return [{
+        'key': cohort_key(cohort),
+        'label': cohort_label(cohort),
+        'count': counts[cohort_key(cohort)]
+    } for cohort in cohorts]
+
+
+def cohort_counts(qs, field, cohorts=None, now=None):
+    """
+    counting the records of the queryset in each cohort with a single
+    query, returns [{'key', 'label', 'count'}] in the order of the cohorts
+    """
+    if cohorts is None:
+        cohorts = get_cohorts()
+    return cohort_rows(qs.aggregate(**cohort_aggregates(field, cohorts, now)),
+                       cohorts)
@@ -1,7 +1,10 @@
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 from django.db.models import Q
-from django.db.models import Avg, Count, Min, Sum
-from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import (Avg, Count, Min, Sum, Max, Value, DecimalField,
+                              OuterRef, Subquery)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from company.models import (Event, Product, Package, Equipment,
                             EquipmentMaintanence, PackageLinkProduct)
@@ -10,47 +13,59 @@ from job.models import Job
 
 from finance.models import Invoice, PaymentHistory
 
-from settings.models import Source
-
-import pandas as pd
-import matplotlib.pyplot as plt
-import base64
-from io import BytesIO
-
-
-def user_kpis(obj):
+from dashboard.chart_data import payments_chart_data
+from dashboard.cohorts import get_cohorts, cohort_aggregates, cohort_rows
+
+
+# db values that the invoice report is built from
+INVOICE_REPORT_VALUES = [
+    'id', 'issue_date', 'price', 'discount', 'total_price', 'paid_amount',
+    'last_paid', 'job__id', 'job__job_name', 'job__task_status',
+    'job__primary_client__email', 'job__package__package_name',
+    'job__event__event_name', 'job__source__source'
+]
+# columns of the invoice report
+INVOICE_REPORT_COLUMNS = [
+    'Job Name', 'Job Status', 'Client Email', 'Package', 'Event', 'Source',
+    'Invoice Number', 'Invoice Date', 'Sub Total', 'Discount', 'Net Amount',
+    'Paid', 'To be Paid', 'Last Paid Date'
+]
+# {sort key of the invoice table: db value that the invoices are sorted by}
+INVOICE_TABLE_SORTS = {
+    'issue_date': 'issue_date',
+    'job': 'job__job_name',
+    'client': 'job__primary_client__email',
+    'net_amount': 'total_price',
+    'paid': 'paid_amount',
+}
+# detail job status for the db value
+JOB_STATUSES = dict(Job.TASKCHOICES)
+
+
+def user_kpis(obj, cohorts=None):
     """
-    user KPIs
-    """
-    total_users = len(obj)
-    total_active_users = len(obj.filter(is_active=True))
-    """Preparing joined bucket"""
-
-    # getting dates that were before 10, 20, 30 days
-    date_thirty_days_before = datetime.now().date() - timedelta(days=30)
-    date_ten_days_before = datetime.now().date() - timedelta(days=10)
+    user KPIs with a single query, users are grouped into cohorts by the
+    days since they joined (refer cohorts)
 
-    # creating lookups to filter various logics
-    lookup_thirty_above = Q(date_joined__gte=date_thirty_days_before)
-    lookup_ten_to_thirty = Q(date_joined__gte=date_ten_days_before) & Q(
-        date_joined__lte=date_thirty_days_before)
-    lookup_below_ten = Q(date_joined__lte=date_ten_days_before)
-
-    # querying to get objects
-    joined_thirty_plus_users = len(obj.filter(lookup_thirty_above))
-    joined_ten_to_thirty_users = len(obj.filter(lookup_ten_to_thirty))
-    joined_below_ten_users = len(obj.filter(lookup_below_ten))
-
-    data = {
-        'total_users': total_users,
-        'total_active_users': total_active_users,
-        'joined_thirty_plus_users': joined_thirty_plus_users,
-        'joined_ten_to_thirty_users': joined_ten_to_thirty_users,
-        'joined_below_ten_users': joined_below_ten_users
+    * total_users -> number of the users
+    * total_active_users -> number of the active users
+    * cohorts -> [{'key', 'label', 'count'}] of the join cohorts
+    """
+    if cohorts is None:
+        cohorts = get_cohorts()
+    counts = obj.aggregate(total_users=Count('pk'),
+                           total_active_users=Count(
+                               'pk', filter=Q(is_active=True)),
+                           **cohort_aggregates('date_joined', cohorts))
+    return {
+        'total_users':
+        counts['total_users'],
+        'total_active_users':
+        counts['total_active_users'],
+        'cohorts':
+        cohort_rows(counts, cohorts)
     }
 
-    return data
-
 
 def company_kpis():
     """company KPIs"""
@@ -81,10 +96,58 @@ def company_kpis():
     return data
 
 
+def job_task_kpis(jobs=None):
+    """
+    task KPIs of the jobs with a single grouped query, returns a queryset of
+    named rows (one per job) which can be paged through
+
+    * task_total -> number of tasks
+    * task_completed -> completed tasks
+    * user_tasks -> tasks that need user responds
+    * user_pending_task -> tasks that wait for the user
+    * user_completed_task -> user completed but not processed tasks
+    * invoice_pending_task -> invoice and contract waiting for the user
+    * app_pending_task -> appointments waiting for the user
+    * quest_pending_task -> questionnaires waiting for the user
+    """
+    if jobs is None:
+        jobs = Job.objects.all()
+
+    def count_tasks(lookup=None):
+        if lookup is None:
+            return Count('work__task')
+        return Count('work__task', filter=lookup)
+
+    def pending(task_type):
+        return Q(work__task__task_type=task_type) & Q(
+            work__task__user_completed='su')
+
+    return jobs.order_by('id').annotate(
+        task_total=count_tasks(),
+        task_completed=count_tasks(Q(work__task__completed=True)),
+        user_tasks=count_tasks(Q(work__task__user_task=True)),
+        user_pending_task=count_tasks(Q(work__task__user_completed='su')),
+        user_completed_task=count_tasks(
+            Q(work__task__user_completed='uc')
+            & Q(work__task__completed=False)),
+        invoice_pending_task=count_tasks(pending('cn')),
+        app_pending_task=count_tasks(pending('ap')),
+        quest_pending_task=count_tasks(pending('qn')),
+    ).values_list('id',
+                  'job_name',
+                  'task_total',
+                  'task_completed',
+                  'user_tasks',
+                  'user_pending_task',
+                  'user_completed_task',
+                  'invoice_pending_task',
+                  'app_pending_task',
+                  'quest_pending_task',
+                  named=True)
+
+
 def job_kpis():
     """Job KPIs"""
-    jobs_task_data = {}
-
     # querying db values
     job_by_sources = Job.objects.values('source').annotate(jobs=Count('id'))
     job_by_events = Job.objects.values('event__event_name').annotate(
@@ -94,58 +157,8 @@ def job_kpis():
     job_by_clients = Job.objects.values('primary_client__email').annotate(
         jobs=Count('id'))
 
-    # getting tasks info
-    jobs = Job.objects.all()
-    for job in jobs:
-        # total number of tasks
-        total_tasks = len(job.get_tasks())
-
-        # completed tasks
-        completed_task_lookup = Q(completed=True)
-        completed_tasks = len(job.get_tasks(lookup=completed_task_lookup))
-
-        # user tasks
-        user_task_lookup = Q(user_task=True)
-        user_tasks = len(job.get_tasks(lookup=user_task_lookup))
-
-        # user inputs needed tasks
-        user_input_need_task_lookup = Q(user_completed='su')
-        user_pending_task = len(
-            job.get_tasks(lookup=user_input_need_task_lookup))
-
-        # user completed tasks
-        user_completed_task_lookup = Q(user_completed='uc') & Q(
-            completed=False)
-        user_completed_task = len(
-            job.get_tasks(lookup=user_completed_task_lookup))
-
-        # invoice and contract pending task_set
-        invoice_pending_lookup = Q(task_type='cn') & Q(user_completed='su')
-        invoice_pending_task = len(
-            job.get_tasks(lookup=invoice_pending_lookup))
-
-        # appointment pending task_set
-        app_pending_lookup = Q(task_type='ap') & Q(user_completed='su')
-        app_pending_task = len(job.get_tasks(lookup=app_pending_lookup))
-
-        # questionnaire pending task_set
-        quest_pending_lookup = Q(task_type='qn') & Q(user_completed='su')
-        quest_pending_task = len(job.get_tasks(lookup=quest_pending_lookup))
-
-        task_data = {
-            'total_tasks': total_tasks,
-            'completed_tasks': completed_tasks,
-            'user_tasks': user_tasks,
-            'user_pending_task': user_pending_task,
-            'user_completed_task': user_completed_task,
-            'invoice_pending_task': invoice_pending_task,
-            'app_pending_task': app_pending_task,
-            'quest_pending_task': quest_pending_task
-        }
-        jobs_task_data[job] = task_data
-
     data = {
-        'jobs_task_data': jobs_task_data,
+        'jobs_task_data': job_task_kpis(),
         'job_by_sources': job_by_sources,
         'job_by_events': job_by_events,
         'job_by_package': job_by_package,
@@ -154,139 +167,146 @@ def job_kpis():
     return data
 
 
-def invoice_kpis():
-    """Invoice based summary report with all important data points"""
-    invoice_data = {
-        'Job Name': [],
-        'Job Status': [],
-        'Client Email': [],
-        'Package': [],
-        'Event': [],
-        'Source': [],
-        'Invoice Number': [],
-        'Invoice Date': [],
-        'Sub Total': [],
-        'Discount': [],
-        'Net Amount': [],
-        'Paid': [],
-        'To be Paid': [],
-        'Last Paid Date': []
+def invoice_report_values(invoices=None):
+    """
+    values of the invoice report with a single query, one row per invoice
+    with the job details and the payments summed up
+    """
+    if invoices is None:
+        invoices = Invoice.objects.all()
+    return invoices.annotate(
+        paid_amount=Coalesce(Sum('paymenthistory__payment_amount'),
+                             Value(Decimal(0)),
+                             output_field=DecimalField()),
+        last_paid=Max('paymenthistory__payment_date')).order_by('id').values(
+            *INVOICE_REPORT_VALUES)
+
+
+def start_of_day(date):
+    """start of the day in the current timezone"""
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+def filter_invoices(invoices,
+                    start_date=None,
+                    end_date=None,
+                    status=None,
+                    client=None):
+    """
+    filtering the invoices by the issue date range, the job status and the
+    email of the client, jobs without status are taken as the first status.
+    dates are compared with the bounds of the days, so the index of the
+    issue date is used
+    """
+    if start_date is not None:
+        invoices = invoices.filter(issue_date__gte=start_of_day(start_date))
+    if end_date is not None:
+        invoices = invoices.filter(
+            issue_date__lt=start_of_day(end_date + timedelta(days=1)))
+    if status:
+        lookup = Q(job__task_status=status)
+        if status == Job.TASKCHOICES[0][0]:
+            lookup |= Q(job__isnull=False, job__task_status__isnull=True)
+        invoices = invoices.filter(lookup)
+    if client:
+        invoices = invoices.filter(job__primary_client__email=client)
+    return invoices
+
+
+def invoice_table_ids(invoices, sort='-issue_date'):
+    """
+    ids of the invoices of the table (the ones that have a job), sorted by
+    the sort key (prefixed with - for descending order). invoices are
+    counted and paged without the payments, which are only summed up (with
+    a subquery for each invoice) when the table is sorted by the paid amount
+    """
+    key = sort.lstrip('-')
+    invoices = invoices.filter(job__isnull=False)
+    if key == 'paid':
+        paid = PaymentHistory.objects.filter(
+            invoice=OuterRef('pk')).values('invoice').annotate(
+                paid=Sum('payment_amount')).values('paid')
+        invoices = invoices.annotate(
+            paid_amount=Coalesce(Subquery(paid),
+                                 Value(Decimal(0)),
+                                 output_field=DecimalField()))
+    field = INVOICE_TABLE_SORTS[key]
+    if sort.startswith('-'):
+        field = f'-{field}'
+    return invoices.order_by(field, '-id' if sort.startswith('-') else
+                             'id').values_list('id', flat=True)
+
+
+def invoice_table_values(invoice_ids):
+    """
+    values of the invoice table (refer invoice_report_values) of a page of
+    the invoice ids, in the order of the ids
+    """
+    values = {
+        row['id']: row
+        for row in invoice_report_values(
+            Invoice.objects.filter(pk__in=invoice_ids))
     }
+    return [values[pk] for pk in invoice_ids if pk in values]
 
-    invoices = Invoice.objects.all()
-    for invoice in invoices:
-        invoice_job = None
-        try:
-            if invoice.job:
-                invoice_job = invoice.job
-                invoice_job_status = invoice.job.get_detail_task_status()
-                user = invoice.job.primary_client
-                package = invoice.job.package
-                event = invoice.job.event
-                source = invoice.job.source
-        except ObjectDoesNotExist:
-            invoice_job = 'Job Deleted'
-            invoice_job_status = 'No Status'
-            user = 'No User'
-            package = 'No Package'
-            event = 'No Event'
-            source = 'No Source'
-
-        invoice_data['Job Name'].append(invoice_job)
-        invoice_data['Job Status'].append(invoice_job_status)
-        invoice_data['Client Email'].append(user)
-        invoice_data['Package'].append(package)
-        invoice_data['Event'].append(event)
-        invoice_data['Source'].append(source)
-        invoice_data['Invoice Number'].append(invoice.get_issue_number())
-        invoice_data['Invoice Date'].append(invoice.issue_date.date())
-        invoice_data['Sub Total'].append(invoice.price)
-        invoice_data['Discount'].append(
-            str(int(invoice.discount * 100)) + " %")
-        invoice_data['Net Amount'].append(invoice.total_price)
-        invoice_data['Paid'].append(invoice.paid())
-        invoice_data['To be Paid'].append(invoice.to_be_paid())
-        invoice_data['Last Paid Date'].append(invoice.last_paid_date())
-
-    df = pd.DataFrame(data=invoice_data)
-    return df
-
-
-def paid_data():
-    """Paid data by buckets"""
-    seven_days_before = datetime.now().date() - timedelta(days=7)
-    thirty_days_before = datetime.now().date() - timedelta(days=30)
-
-    last_seven_days_deposits = PaymentHistory.objects.filter(
-        payment_date__lte=seven_days_before).annotate(
-            deposits=Sum('payment_amount')).last()
-    last_thirty_days_deposits = PaymentHistory.objects.filter(
-        payment_date__lte=thirty_days_before).annotate(
-            deposits=Sum('payment_amount')).last()
 
-    data = {
-        'last_seven_days_deposits': last_seven_days_deposits,
-        'last_thirty_days_deposits': last_thirty_days_deposits
+def invoice_report_row(values):
+    """
+    formatting the values of an invoice (refer invoice_report_values) into
+    a row of the report (refer INVOICE_REPORT_COLUMNS)
+    """
+    if values['job__id'] is None:
+        job = [
+            'Job Deleted', 'No Status', 'No User', 'No Package', 'No Event',
+            'No Source'
+        ]
+    else:
+        job = [
+            values['job__job_name'],
+            JOB_STATUSES.get(values['job__task_status'],
+                             Job.TASKCHOICES[0][1]),
+            values['job__primary_client__email'],
+            values['job__package__package_name'],
+            values['job__event__event_name'],
+            values['job__source__source']
+        ]
+    issue_date = values['issue_date']
+    discount = values['discount'] or 0
+    total_price = values['total_price'] or 0
+    return job + [
+        issue_date.strftime('%Y%m%d') + str(values['id']),
+        issue_date.date(), values['price'], f'{int(discount * 100)} %',
+        values['total_price'], values['paid_amount'],
+        total_price - values['paid_amount'], values['last_paid']
+    ]
+
+
+def payment_series():
+    """
+    series of the payment chart, payments summed up by days, weeks or
+    months depending on the span of the payments (refer chart_data)
+    """
+    data = payments_chart_data()
+    return {
+        'x': data['labels'],
+        'y': data['series'][0]['data'],
+        'xlabel': f"Payment {data['bucket'].title()}",
+        'ylabel': 'Payment',
+        'plt_type': 'line'
     }
 
-    return data
-
 
-def get_graph():
-    """function to get graph into buffer so that it can viewed in html"""
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    graph = base64.b64encode(image_png)
-    graph = graph.decode('utf-8')
-    buffer.close()
-    return graph
-
-
-def get_plot(x, y, data, plt_type="line"):
-    """Creating either line or bar chart based on argument"""
-    plt.switch_backend('AGG')
-    plt.figure(figsize=(8, 4))
-    # plt.title('Payment History')
-    if plt_type == "line":
-        plt.plot(x, y)
-    else:
-        plt.bar(x, y)
-    plt.xticks(rotation=45)
-    plt.xlabel(data['xlabel'])
-    plt.ylabel(data['ylabel'])
-    plt.tight_layout()
-    graph = get_graph()
-    return graph
-
-
-def payment_graph():
-    """Creating payment graph based on paid days"""
-    qs = PaymentHistory.objects.values('payment_date').annotate(
-        payment_amount=Sum('payment_amount')).order_by('payment_date')
-    x = [x['payment_date'].strftime("%Y-%m-%d") for x in qs]
-    y = [x['payment_amount'] for x in qs]
-    data = {'xlabel': 'Payment Date', 'ylabel': 'Payment'}
-    chart = get_plot(x, y, data)
-    return chart
-
-
-def jobs_by_source_graph():
-    """creating a bar chart that shows number of jobs for each source"""
-    qs = Job.objects.values('source').annotate(
+def jobs_by_source_series():
+    """series of the bar chart that shows number of jobs for each source"""
+    qs = Job.objects.values('source', 'source__source').annotate(
         jobs=Count('id')).order_by('source')
-    x = []
-    y = []
-    for item in qs:
-        if item['source'] is None:
-            x.append('No Source')
-        else:
-            x.append(Source.objects.get(pk=item['source']).source)
-        y.append(item['jobs'])
-
-    #  x = [Source.objects.get(pk=x['source']).source for x in qs if x is not None else "NIL"]
-    #  y = [y['jobs'] for y in qs]
-    data = {'xlabel': 'Sources', 'ylabel': 'Jobs'}
-    chart = get_plot(x, y, data, plt_type="bar")
-    return chart
+    return {
+        'x': [
+            'No Source' if x['source'] is None else x['source__source']
+            for x in qs
+        ],
+        'y': [x['jobs'] for x in qs],
+        'xlabel': 'Sources',
+        'ylabel': 'Jobs',
+        'plt_type': 'bar'
+    }
@@ -0,0 +1,44 @@
+from django import forms
+
+from job.models import Job
+
+from dashboard.dash_utils import INVOICE_TABLE_SORTS
+
+
+class DateInput(forms.DateInput):
+    input_type = 'date'
+
+
+class DateRangeForm(forms.Form):
+    """optional date range, e.g. of the chart data"""
+    start_date = forms.DateField(required=False, widget=DateInput())
+    end_date = forms.DateField(required=False, widget=DateInput())
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise forms.ValidationError(
+                'Start date should be before the end date')
+        return cleaned_data
+
+
+class SummaryReportForm(DateRangeForm):
+    """filters of the invoice summary report"""
+    status = forms.ChoiceField(choices=[('', 'All statuses')] +
+                               Job.TASKCHOICES,
+                               required=False)
+    client = forms.EmailField(
+        required=False,
+        widget=forms.EmailInput(attrs={'placeholder': 'Client email'}))
+
+
+class InvoiceTableForm(SummaryReportForm):
+    """filters, sorting and page of the invoice table"""
+    # sort keys, prefixed with - for descending order
+    SORTS = [(f'{order}{key}', f'{order}{key}')
+             for key in INVOICE_TABLE_SORTS for order in ('', '-')]
+
+    sort = forms.ChoiceField(choices=SORTS, required=False)
+    page = forms.IntegerField(required=False, min_value=1)
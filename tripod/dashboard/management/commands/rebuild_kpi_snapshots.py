@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.snapshots import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    """
+    Rebuilding all the KPI snapshots of the dashboard, meant to be run
+    periodically (e.g. by cron) so the sections that are not refreshed by
+    the signals (customers, employees and company) are kept fresh too
+    """
+    help = 'Rebuild KPI snapshots of the dashboard'
+
+    def handle(self, *args, **options):
+        rebuild_snapshots()
+        self.stdout.write('KPI snapshots rebuilt')
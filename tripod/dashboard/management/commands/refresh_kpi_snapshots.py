@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dashboard.snapshots import refresh_stale_sections
+
+
+class Command(BaseCommand):
+    """
+    Worker refreshing the KPI snapshots that are marked stale by the changes
+    (refer dashboard.signals). Snapshots are checked once in each interval,
+    so the changes made meanwhile are computed together. Runs until it is
+    stopped, unless --once is passed
+    """
+    help = 'Refresh the stale KPI snapshots of the dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once',
+                            action='store_true',
+                            help='refresh the stale snapshots once and exit')
+        parser.add_argument('--interval',
+                            type=float,
+                            default=30,
+                            help='seconds to wait between the refreshes')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            sections = refresh_stale_sections()
+            if sections:
+                self.stdout.write(f"{', '.join(sections)} refreshed")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,59 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from job.models import Job
+
+
+class KpiSnapshot(models.Model):
+    """
+    Precomputed KPIs of a dashboard section, refreshed when the data
+    behind the section is changed (refer dashboard.signals) and rebuilt
+    periodically (refer rebuild_kpi_snapshots management command)
+
+    * section -> dashboard section that the KPIs are for
+    * data -> KPI values of the section
+    * computed_at -> when the KPIs were computed
+    * stale -> data behind the section is changed since it was computed,
+      the section is refreshed by the refresh_kpi_snapshots worker
+    """
+    CLIENTS = 'clients'
+    EMPLOYEES = 'employees'
+    COMPANY = 'company'
+    JOBS = 'jobs'
+    INVOICES = 'invoices'
+    SECTIONS = [(CLIENTS, 'Customers'), (EMPLOYEES, 'Employees'),
+                (COMPANY, 'Company'), (JOBS, 'Jobs'), (INVOICES, 'Invoices')]
+
+    section = models.CharField(max_length=20, choices=SECTIONS, unique=True)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField()
+    stale = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.section} - {self.computed_at}"
+
+
+class JobTaskSnapshot(models.Model):
+    """
+    Precomputed task KPIs of a job (refer dash_utils.job_task_kpis),
+    refreshed whenever the job or one of its tasks is changed
+    """
+    job = models.OneToOneField(Job,
+                               on_delete=models.CASCADE,
+                               related_name='task_snapshot')
+    job_name = models.CharField(max_length=200)
+    task_total = models.IntegerField(default=0)
+    task_completed = models.IntegerField(default=0)
+    user_tasks = models.IntegerField(default=0)
+    user_pending_task = models.IntegerField(default=0)
+    user_completed_task = models.IntegerField(default=0)
+    invoice_pending_task = models.IntegerField(default=0)
+    app_pending_task = models.IntegerField(default=0)
+    quest_pending_task = models.IntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ('job_id', )
+
+    def __str__(self):
+        return f"{self.job_name} - {self.computed_at}"
@@ -0,0 +1,197 @@
+"""
+Representation of the dashboard sections. Each section is rendered on its
+own and loaded by the dashboard page from its own URL, so the page is not
+blocked by the slowest section and the sections are loaded side by side.
+
+Sections are rendered on a bounded pool of threads, each thread with its own
+db connection, and the rendered HTML is cached for the section, in the
+shared cache and in the process (refer tripod.process_cache). If a
+section takes longer than its timeout, the last rendered copy is served
+while the rendering is completed in the background.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.template.loader import render_to_string
+
+from finance.utils import rolling_deposits
+from tripod.process_cache import get_cached, set_cached
+
+from dashboard.charts import get_chart_series, get_chart_version
+from dashboard.forms import SummaryReportForm
+from dashboard.models import KpiSnapshot, JobTaskSnapshot
+from dashboard.snapshots import get_kpi_snapshots
+
+# number of jobs in a page of the job tasks table
+JOBS_PER_PAGE = 25
+
+_pool = None
+
+
+class Section:
+    """
+    Independently rendered part of the dashboard
+
+    * name -> name of the section, also the name of its template
+    * context -> function returning the context of the template for the
+    request parameters of the section
+    * params -> request parameters that the section depends on
+    * cache_timeout -> seconds that the rendered section is cached
+    * timeout -> seconds to wait for the section to be rendered
+    """
+    __slots__ = ('name', 'context', 'params', 'cache_timeout', 'timeout')
+
+    def __init__(self,
+                 name,
+                 context,
+                 params=(),
+                 cache_timeout=300,
+                 timeout=10):
+        self.name = name
+        self.context = context
+        self.params = params
+        self.cache_timeout = cache_timeout
+        self.timeout = timeout
+
+    @property
+    def template(self):
+        return f'dashboard/sections/{self.name}.html'
+
+
+def kpis_context(params):
+    """customers, employees and company KPIs from the snapshots"""
+    snapshots = get_kpi_snapshots()
+    return {
+        'client_kpis':
+        snapshots[KpiSnapshot.CLIENTS].data,
+        'employee_kpis_data':
+        snapshots[KpiSnapshot.EMPLOYEES].data,
+        'company_kpis_data':
+        snapshots[KpiSnapshot.COMPANY].data,
+        'job_kpis_data':
+        snapshots[KpiSnapshot.JOBS].data,
+        'kpis_computed_at':
+        min(snapshot.computed_at for snapshot in snapshots.values()),
+    }
+
+
+def payments_context(params):
+    """
+    paid KPIs and the version of the payment chart. deposits are read from
+    the daily payments rollup for the current date, instead of a snapshot,
+    so the rolling windows move with the date
+    """
+    return {
+        'paid_kpi_data':
+        rolling_deposits(),
+        'chart_version':
+        get_chart_version(get_chart_series('payments')),
+    }
+
+
+def sources_context(params):
+    """version of the jobs by source chart"""
+    return {
+        'chart_version': get_chart_version(get_chart_series('jobs_by_source'))
+    }
+
+
+def job_tasks_context(params):
+    """page of the job tasks table"""
+    # building the snapshots if they were never built before
+    get_kpi_snapshots()
+    return {
+        'jobs_task_page':
+        Paginator(JobTaskSnapshot.objects.all(),
+                  JOBS_PER_PAGE).get_page(params.get('jobs_page'))
+    }
+
+
+def invoices_context(params):
+    """invoice totals and the filters of the invoice table and report"""
+    return {
+        'invoice_totals': get_kpi_snapshots()[KpiSnapshot.INVOICES].data,
+        'report_form': SummaryReportForm(),
+    }
+
+
+# {name: Section}, in the order of the dashboard
+SECTIONS = {
+    section.name: section
+    for section in [
+        Section('kpis', kpis_context),
+        Section('payments', payments_context),
+        Section('sources', sources_context),
+        Section('job_tasks',
+                job_tasks_context,
+                params=('jobs_page', ),
+                cache_timeout=60),
+        Section('invoices', invoices_context, cache_timeout=60),
+    ]
+}
+
+
+def get_section_pool():
+    """returning the pool of the threads that render the sections"""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'DASHBOARD_SECTION_THREADS', 4),
+            thread_name_prefix='dashboard-section')
+    return _pool
+
+
+def get_section_key(section, params):
+    """cache key of the section for the values of its parameters"""
+    values = '&'.join(f'{param}={params.get(param, "")}'
+                      for param in section.params)
+    digest = hashlib.sha256(values.encode()).hexdigest()[:16]
+    return f'dashboard-section-{section.name}-{digest}'
+
+
+def render_section(section, params, key):
+    """rendering the section and caching it, with a copy kept until replaced"""
+    html = render_to_string(section.template, section.context(params))
+    set_cached(key, html, section.cache_timeout)
+    cache.set(f'{key}-last', html, None)
+    return html
+
+
+def render_section_in_thread(section, params, key):
+    """rendering the section, closing the connections of the thread after"""
+    try:
+        return render_section(section, params, key)
+    finally:
+        connections.close_all()
+
+
+def get_section_html(name, params):
+    """
+    returning the rendered section, from the cache if available. raises
+    TimeoutError if the section takes longer than its timeout and it was
+    never rendered before
+    """
+    if name not in SECTIONS:
+        raise Exception(f'Section ({name}) is not available')
+    section = SECTIONS[name]
+    key = get_section_key(section, params)
+    html = get_cached(key)
+    if html is not None:
+        return html
+    if not getattr(settings, 'DASHBOARD_SECTION_THREADS', 4):
+        return render_section(section, params, key)
+
+    future = get_section_pool().submit(render_section_in_thread, section,
+                                       params, key)
+    try:
+        return future.result(timeout=section.timeout)
+    except TimeoutError:
+        # rendering is continued and cached in the background
+        html = cache.get(f'{key}-last')
+        if html is None:
+            raise
+        return html
@@ -0,0 +1,48 @@
+"""
+Signals of the dashboard app, which mark the KPI snapshots of the sections
+that depend on the changed data stale (refer dashboard.snapshots).
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from job.models import Job, Task
+
+from finance.models import Invoice, PaymentHistory
+
+from dashboard.models import KpiSnapshot
+from dashboard.snapshots import schedule_refresh
+
+# job fields that the job KPIs (and the jobs by package of the company KPIs)
+# are grouped by
+JOB_KPI_FIELDS = {'source', 'event', 'package', 'primary_client'}
+
+
+@receiver([post_save, post_delete], sender=Job)
+def job_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    job KPIs, the jobs by package of the company KPIs and the task KPIs of
+    the job, unless the saved fields do not change them (e.g. the task
+    status saved while a task is processed)
+    """
+    fields = None if update_fields is None else set(update_fields)
+    sections = []
+    if fields is None or fields & JOB_KPI_FIELDS:
+        sections = [KpiSnapshot.JOBS, KpiSnapshot.COMPANY]
+    jobs = None
+    if fields is None or 'job_name' in fields:
+        jobs = Job.objects.filter(pk=instance.pk)
+    if sections or jobs is not None:
+        schedule_refresh(*sections, jobs=jobs)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def task_changed(sender, instance, **kwargs):
+    """task KPIs of the job of the task"""
+    schedule_refresh(jobs=Job.objects.filter(work__id=instance.work_id))
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=PaymentHistory)
+def payment_changed(sender, instance, **kwargs):
+    """invoice KPIs, deposits are read from the daily payments rollup"""
+    schedule_refresh(KpiSnapshot.INVOICES)
@@ -0,0 +1,179 @@
+"""
+Representation of the KPI snapshots of the dashboard. Each section of the
+dashboard is computed on its own and stored in KpiSnapshot, and task KPIs
+of each job are stored in JobTaskSnapshot, so the dashboard reads the
+stored values instead of computing them for each visit.
+
+Sections are marked stale after the changes are committed (refer
+dashboard.signals) and refreshed by the refresh_kpi_snapshots worker, so
+the changes of many writes are computed once and never by the request that
+made them. Task KPIs of the changed job are refreshed right away, since
+they are computed for that job only. The whole set is rebuilt periodically
+by the rebuild_kpi_snapshots management command.
+"""
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.query import QuerySet
+from django.utils import timezone
+
+from job.models import Job
+
+from finance.models import Invoice, PaymentHistory
+
+from dashboard.dash_utils import (user_kpis, company_kpis, job_kpis,
+                                  job_task_kpis)
+from dashboard.models import KpiSnapshot, JobTaskSnapshot
+
+# task KPIs that are stored for each job
+JOB_TASK_KPIS = ('task_total', 'task_completed', 'user_tasks',
+                 'user_pending_task', 'user_completed_task',
+                 'invoice_pending_task', 'app_pending_task',
+                 'quest_pending_task')
+
+logger = logging.getLogger(__name__)
+
+
+def invoice_totals():
+    """totals of the invoices of the available jobs"""
+    data = Invoice.objects.filter(job__isnull=False).aggregate(
+        invoices=Count('id'), net_amount=Sum('total_price'))
+    data['paid'] = PaymentHistory.objects.filter(
+        invoice__job__isnull=False).aggregate(
+            paid=Sum('payment_amount'))['paid']
+    data['to_be_paid'] = (data['net_amount'] or 0) - (data['paid'] or 0)
+    return data
+
+
+def section_kpis(section):
+    """computing the KPIs of the section"""
+    users = get_user_model().objects.all()
+    if section == KpiSnapshot.CLIENTS:
+        return user_kpis(users.filter(is_client=True))
+    elif section == KpiSnapshot.EMPLOYEES:
+        return user_kpis(users.filter(is_staff=True))
+    elif section == KpiSnapshot.COMPANY:
+        return company_kpis()
+    elif section == KpiSnapshot.JOBS:
+        data = job_kpis()
+        # task KPIs are stored for each job in JobTaskSnapshot
+        data.pop('jobs_task_data')
+        return data
+    elif section == KpiSnapshot.INVOICES:
+        return invoice_totals()
+    raise Exception(f'Section ({section}) is not available')
+
+
+def to_snapshot_data(data):
+    """evaluating the querysets of the KPIs, so they can be stored"""
+    return {
+        key: list(value) if isinstance(value, QuerySet) else value
+        for key, value in data.items()
+    }
+
+
+def refresh_sections(*sections):
+    """computing and storing the KPIs of the sections"""
+    for section in sections:
+        KpiSnapshot.objects.update_or_create(
+            section=section,
+            defaults={
+                'data': to_snapshot_data(section_kpis(section)),
+                'computed_at': timezone.now()
+            })
+
+
+def refresh_job_task_snapshots(jobs):
+    """computing and storing the task KPIs of the jobs"""
+    computed_at = timezone.now()
+    snapshots = [
+        JobTaskSnapshot(job_id=row.id,
+                        job_name=row.job_name,
+                        computed_at=computed_at,
+                        **{kpi: getattr(row, kpi)
+                           for kpi in JOB_TASK_KPIS})
+        for row in job_task_kpis(jobs)
+    ]
+    with transaction.atomic():
+        JobTaskSnapshot.objects.filter(
+            job_id__in=[snapshot.job_id for snapshot in snapshots]).delete()
+        JobTaskSnapshot.objects.bulk_create(snapshots)
+
+
+def rebuild_snapshots():
+    """rebuilding all the sections and the task KPIs of all jobs"""
+    sections = [section[0] for section in KpiSnapshot.SECTIONS]
+    with transaction.atomic():
+        # dropping the sections that are not stored anymore
+        KpiSnapshot.objects.exclude(section__in=sections).delete()
+        refresh_sections(*sections)
+        JobTaskSnapshot.objects.all().delete()
+        refresh_job_task_snapshots(Job.objects.all())
+
+
+def get_kpi_snapshots():
+    """
+    returning {section: KpiSnapshot}, missing sections (e.g. before the
+    first rebuild) are computed and stored
+    """
+    snapshots = {
+        snapshot.section: snapshot
+        for snapshot in KpiSnapshot.objects.all()
+    }
+    missing = [
+        section[0] for section in KpiSnapshot.SECTIONS
+        if section[0] not in snapshots
+    ]
+    if missing:
+        if not snapshots:
+            rebuild_snapshots()
+        else:
+            refresh_sections(*missing)
+        return get_kpi_snapshots()
+    return snapshots
+
+
+def mark_sections_stale(*sections):
+    """
+    marking the sections to be refreshed by the worker, sections that are
+    already marked are not written again
+    """
+    KpiSnapshot.objects.filter(section__in=sections,
+                               stale=False).update(stale=True)
+
+
+def refresh_stale_sections():
+    """
+    refreshing the sections that are marked stale and returning them. marks
+    are cleared before the KPIs are computed, so a change that is committed
+    meanwhile marks the section again
+    """
+    sections = list(
+        KpiSnapshot.objects.filter(stale=True).values_list('section',
+                                                           flat=True))
+    if sections:
+        KpiSnapshot.objects.filter(section__in=sections).update(stale=False)
+        refresh_sections(*sections)
+    return sections
+
+
+def schedule_refresh(*sections, jobs=None):
+    """
+    marking the sections stale and refreshing the task KPIs of the jobs once
+    the current transaction is committed, so the writes are never blocked or
+    rolled back by the refresh. failures are only logged, since the changes
+    are already committed by then
+    """
+
+    def refresh():
+        try:
+            if sections:
+                mark_sections_stale(*sections)
+            if jobs is not None:
+                refresh_job_task_snapshots(jobs)
+        except Exception:
+            logger.exception('Refreshing the KPI snapshots failed')
+
+    transaction.on_commit(refresh)
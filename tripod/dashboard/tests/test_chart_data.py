@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from job.models import Job
+
+from finance.models import Invoice, PaymentHistory
+
+from dashboard.chart_data import (DAY, WEEK, MONTH, get_bucket,
+                                  get_bucket_starts, fill_buckets,
+                                  payments_chart_data, jobs_chart_data)
+from dashboard.tests.test_kpis import KpiTestBase
+
+
+class ChartDataTest(KpiTestBase):
+
+    def add_payment(self, amount, days_before):
+        invoice = Invoice.objects.create(price=1000,
+                                         discount=0,
+                                         total_price=1000)
+        PaymentHistory.objects.create(
+            invoice=invoice,
+            payment_date=timezone.now() - timedelta(days=days_before),
+            payment_amount=amount,
+            payment_method='c')
+
+    def test_bucket_depends_on_span(self):
+        """longer ranges should be bucketed by weeks and then by months"""
+        start_date = date(2022, 1, 1)
+        self.assertEqual(get_bucket(start_date, date(2022, 2, 1)), DAY)
+        self.assertEqual(get_bucket(start_date, date(2022, 6, 1)), WEEK)
+        self.assertEqual(get_bucket(start_date, date(2024, 1, 1)), MONTH)
+
+    def test_empty_buckets_are_filled(self):
+        """buckets without values should be 0"""
+        starts = get_bucket_starts(date(2022, 1, 5), date(2022, 3, 20), WEEK)
+        self.assertEqual(str(starts[0]), '2022-01-03')
+        filled = fill_buckets(starts, [date(2022, 1, 3),
+                                       date(2022, 1, 17)], [2, 3])
+        self.assertEqual(len(filled), len(starts))
+        self.assertEqual(filled[:4].tolist(), [2, 0, 3, 0])
+        self.assertEqual(filled.sum(), 5)
+
+    def test_payments_chart_data(self):
+        """payments should be summed up by days of the range"""
+        self.add_payment(100, 0)
+        self.add_payment(50, 0)
+        self.add_payment(25, 3)
+        self.add_payment(500, 90)
+        today = timezone.localdate()
+        data = payments_chart_data(today - timedelta(days=6), today)
+
+        self.assertEqual(data['bucket'], DAY)
+        self.assertEqual(len(data['labels']), 7)
+        self.assertEqual(data['labels'][-1], str(today))
+        self.assertEqual(data['series'][0]['data'],
+                         [0, 0, 0, 25, 0, 0, 150])
+        self.assertEqual(data['series'][0]['total'], 175)
+
+    def test_jobs_chart_data_grouped(self):
+        """jobs should be counted for each package in the buckets"""
+        self.create_jobs(2)
+        Job.objects.filter(job_name='Job 0').update(created_at=timezone.now() -
+                                                    timedelta(days=400))
+        data = jobs_chart_data('package__package_name', 'No Package')
+
+        self.assertEqual(data['bucket'], MONTH)
+        self.assertEqual(len(data['series']), 1)
+        self.assertEqual(data['series'][0]['name'], 'No Package')
+        self.assertEqual(data['series'][0]['data'][0], 1)
+        self.assertEqual(data['series'][0]['data'][-1], 1)
+        self.assertEqual(data['series'][0]['total'], 2)
+
+    def test_chart_data_view(self):
+        """chart data should be served as json for the date range"""
+        self.client_user.is_staff = True
+        self.client_user.save()
+        self.client.force_login(self.client_user)
+        self.create_jobs(1)
+        today = timezone.localdate()
+        url = reverse('dashboard:chartData', args=['jobs_by_source'])
+
+        response = self.client.get(url, {
+            'start_date': today - timedelta(days=1),
+            'end_date': today
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['labels'],
+                         [str(today - timedelta(days=1)),
+                          str(today)])
+        self.assertEqual(data['series'][0]['data'], [0, 1])
+
+        response = self.client.get(url, {
+            'start_date': today,
+            'end_date': today - timedelta(days=1)
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            reverse('dashboard:chartData', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from finance.models import Invoice, PaymentHistory
+
+from dashboard.charts import (get_chart_series, get_chart_version,
+                              render_chart_png)
+from dashboard.tests.test_kpis import KpiTestBase
+
+PNG_SIGNATURE = b'\x89PNG'
+
+
+class ChartTest(KpiTestBase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def add_payment(self, amount):
+        invoice = Invoice.objects.create(price=1000,
+                                         discount=0,
+                                         total_price=1000)
+        PaymentHistory.objects.create(invoice=invoice,
+                                      payment_date=timezone.now(),
+                                      payment_amount=amount,
+                                      payment_method='c')
+
+    def test_chart_version_changes_with_series(self):
+        """version should only change when the series is changed"""
+        self.add_payment(100)
+        version = get_chart_version(get_chart_series('payments'))
+
+        self.assertEqual(version,
+                         get_chart_version(get_chart_series('payments')))
+        self.add_payment(200)
+        self.assertNotEqual(version,
+                            get_chart_version(get_chart_series('payments')))
+
+    def test_chart_rendered_in_process_pool_and_cached(self):
+        """chart should be rendered by the pool once and then cached"""
+        self.create_jobs(2)
+        series = get_chart_series('jobs_by_source')
+        png = render_chart_png('jobs_by_source', series)
+
+        self.assertTrue(png.startswith(PNG_SIGNATURE))
+        with self.settings(DASHBOARD_CHART_PROCESSES=0):
+            with mock.patch('dashboard.charts.render_chart') as render:
+                cached = render_chart_png('jobs_by_source', series)
+        render.assert_not_called()
+        self.assertEqual(png, cached)
+
+    @override_settings(DASHBOARD_CHART_PROCESSES=0)
+    def test_chart_view_is_cacheable(self):
+        """chart url should serve the image with its version as ETag"""
+        self.add_payment(100)
+        version = get_chart_version(get_chart_series('payments'))
+        staff = self.client_user
+        staff.is_staff = True
+        staff.save()
+        self.client.force_login(staff)
+        url = reverse('dashboard:chart', args=['payments'])
+        response = self.client.get(url, {'v': version})
+
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(PNG_SIGNATURE))
+        self.assertIn('max-age', response['Cache-Control'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{version}"')
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(
+            reverse('dashboard:chart', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,429 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.tests.utils import LOCMEM_CACHES
+from job.models import Job, Work, Task
+from tripod.process_cache import clear_process_cache
+
+from finance.models import Invoice, PaymentHistory
+
+from dashboard.cohorts import cohort_counts
+from dashboard.dash_utils import (job_task_kpis, invoice_report_row,
+                                  invoice_report_values, user_kpis,
+                                  INVOICE_REPORT_COLUMNS)
+from dashboard.models import KpiSnapshot, JobTaskSnapshot
+from dashboard.sections import payments_context
+from dashboard.snapshots import (get_kpi_snapshots, rebuild_snapshots,
+                                 refresh_stale_sections)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KpiTestBase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_process_cache()
+        self.client_user = get_user_model().objects.create_user(
+            'test_client@mail.com', 'abcd@123')
+
+    def create_jobs(self, count):
+        """creating jobs with a set of tasks in different states"""
+        tasks = [
+            ('td', False, None, True),
+            ('cn', True, 'su', False),
+            ('ap', True, 'su', False),
+            ('qn', True, 'uc', False),
+        ]
+        for i in range(count):
+            job = Job.objects.create(job_name=f'Job {i}',
+                                     primary_client=self.client_user,
+                                     status='job')
+            work = Work.objects.create(work_name='Job request',
+                                       work_order=1,
+                                       job=job)
+            for order, (task_type, user_task, user_completed,
+                        completed) in enumerate(tasks):
+                Task.objects.create(task_name=f'Task {order}',
+                                    task_order=order,
+                                    work=work,
+                                    description='task',
+                                    task_type=task_type,
+                                    user_task=user_task,
+                                    user_completed=user_completed,
+                                    completed=completed)
+
+    def create_invoices(self, count):
+        """creating invoices with payments, the last one without a job"""
+        for i in range(count):
+            invoice = Invoice.objects.create(price=1000,
+                                             discount=Decimal('0.25'),
+                                             total_price=750)
+            if i < count - 1:
+                Job.objects.create(job_name=f'Invoiced job {i}',
+                                   primary_client=self.client_user,
+                                   status='job',
+                                   task_status='cnb',
+                                   invoice=invoice)
+            for day in range(2):
+                PaymentHistory.objects.create(
+                    invoice=invoice,
+                    payment_date=timezone.now() - timedelta(days=day),
+                    payment_amount=100,
+                    payment_method='c')
+
+
+class UserKpisTest(KpiTestBase):
+
+    def create_users(self):
+        """creating users that joined 0, 5, 15, 45 and 120 days ago"""
+        now = timezone.now()
+        for days in (5, 15, 45, 120):
+            get_user_model().objects.create_user(
+                f'user_{days}@mail.com',
+                'abcd@123',
+                is_active=days < 100,
+                date_joined=now - timedelta(days=days))
+
+    def test_user_kpis_in_single_query(self):
+        """users should be counted in their join cohorts with one query"""
+        self.create_users()
+        with CaptureQueriesContext(connection) as queries:
+            kpis = user_kpis(get_user_model().objects.all())
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(kpis['total_users'], 5)
+        self.assertEqual(kpis['total_active_users'], 4)
+        self.assertEqual([cohort['count'] for cohort in kpis['cohorts']],
+                         [2, 1, 1, 1])
+        self.assertEqual(kpis['cohorts'][-1]['label'], '90+ days')
+
+    def test_configurable_cohorts(self):
+        """cohorts should follow the setting or the given ranges"""
+        self.create_users()
+        users = get_user_model().objects.all()
+        with self.settings(DASHBOARD_COHORTS=[(0, 30), (30, None)]):
+            kpis = user_kpis(users)
+        self.assertEqual([(cohort['label'], cohort['count'])
+                          for cohort in kpis['cohorts']],
+                         [('0-30 days', 3), ('30+ days', 2)])
+        self.assertEqual(
+            cohort_counts(users, 'date_joined', [(10, 50)])[0]['count'], 2)
+
+
+class JobTaskKpisTest(KpiTestBase):
+
+    def test_job_task_kpis_values(self):
+        """task KPIs should be counted for each job"""
+        self.create_jobs(1)
+        Job.objects.create(job_name='Job without tasks',
+                           primary_client=self.client_user,
+                           status='req')
+        kpis = list(job_task_kpis())
+
+        self.assertEqual(len(kpis), 2)
+        self.assertEqual(kpis[0].task_total, 4)
+        self.assertEqual(kpis[0].task_completed, 1)
+        self.assertEqual(kpis[0].user_tasks, 3)
+        self.assertEqual(kpis[0].user_pending_task, 2)
+        self.assertEqual(kpis[0].user_completed_task, 1)
+        self.assertEqual(kpis[0].invoice_pending_task, 1)
+        self.assertEqual(kpis[0].app_pending_task, 1)
+        self.assertEqual(kpis[0].quest_pending_task, 0)
+        self.assertEqual(kpis[1].task_total, 0)
+
+    def test_job_task_kpis_query_count_is_constant(self):
+        """number of queries should not depend on the number of jobs"""
+        self.create_jobs(2)
+        with CaptureQueriesContext(connection) as few_jobs:
+            list(job_task_kpis())
+        self.create_jobs(20)
+        with CaptureQueriesContext(connection) as many_jobs:
+            kpis = list(job_task_kpis())
+
+        self.assertEqual(len(kpis), 22)
+        self.assertEqual(len(few_jobs), 1)
+        self.assertEqual(len(many_jobs), len(few_jobs))
+
+
+class InvoiceKpisTest(KpiTestBase):
+
+    def test_invoice_report_values(self):
+        """report should have the job details and payment summary"""
+        self.create_invoices(2)
+        rows = [
+            dict(zip(INVOICE_REPORT_COLUMNS, invoice_report_row(values)))
+            for values in invoice_report_values()
+        ]
+
+        self.assertEqual(len(rows), 2)
+        row = rows[0]
+        self.assertEqual(row['Job Name'], 'Invoiced job 0')
+        self.assertEqual(row['Job Status'], 'Contract book done')
+        self.assertEqual(row['Client Email'], self.client_user.email)
+        self.assertEqual(row['Discount'], '25 %')
+        self.assertEqual(row['Paid'], 200)
+        self.assertEqual(row['To be Paid'], 550)
+        self.assertEqual(rows[1]['Job Name'], 'Job Deleted')
+        self.assertEqual(rows[1]['Source'], 'No Source')
+
+    def test_invoice_report_query_count_is_constant(self):
+        """report should be built with a single query"""
+        self.create_invoices(10)
+        with CaptureQueriesContext(connection) as queries:
+            list(invoice_report_values())
+
+        self.assertEqual(len(queries), 1)
+
+
+class SummaryReportTest(KpiTestBase):
+
+    def setUp(self):
+        super().setUp()
+        staff = get_user_model().objects.create_user('test_staff@mail.com',
+                                                     'abcd@123',
+                                                     is_staff=True)
+        self.client.force_login(staff)
+
+    def get_report_lines(self, **filters):
+        response = self.client.get(reverse('dashboard:download_summary'),
+                                   filters)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        return content.splitlines()
+
+    def test_summary_report_streams_all_invoices(self):
+        """report should have a line for each invoice and the header"""
+        self.create_invoices(3)
+        lines = self.get_report_lines()
+
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('Index,Job Name'))
+        self.assertIn('Invoiced job 0,Contract book done', lines[1])
+        self.assertIn('Job Deleted', lines[3])
+
+    def test_summary_report_filters(self):
+        """invoices should be filtered by the status and the dates"""
+        self.create_invoices(3)
+        Job.objects.filter(job_name='Invoiced job 0').update(task_status='jbd')
+        today = timezone.now().date()
+
+        self.assertEqual(len(self.get_report_lines(status='jbd')), 2)
+        self.assertEqual(
+            len(self.get_report_lines(start_date=today + timedelta(days=1))),
+            1)
+        self.assertEqual(
+            len(
+                self.get_report_lines(start_date=today - timedelta(days=1),
+                                      end_date=today)), 4)
+
+
+class InvoiceTableTest(KpiTestBase):
+
+    def setUp(self):
+        super().setUp()
+        staff = get_user_model().objects.create_user('test_staff@mail.com',
+                                                     'abcd@123',
+                                                     is_staff=True)
+        self.client.force_login(staff)
+
+    def get_table(self, **params):
+        return self.client.get(reverse('dashboard:invoices'), params)
+
+    def test_invoice_table_is_paginated_and_sorted(self):
+        """table should have a page of the invoices with jobs, sorted"""
+        self.create_invoices(4)
+        response = self.get_table(sort='job', page=1)
+        page = response.context['page']
+
+        self.assertEqual(page.paginator.count, 3)
+        self.assertEqual([row[0] for row in response.context['rows']],
+                         [f'Invoiced job {i}' for i in range(3)])
+        response = self.get_table(sort='-job')
+        self.assertEqual(response.context['rows'][0][0], 'Invoiced job 2')
+        self.assertContains(response, 'sort=job')
+
+    def test_invoice_table_filters(self):
+        """invoices should be filtered by the client, status and dates"""
+        self.create_invoices(3)
+        other = get_user_model().objects.create_user('other@mail.com',
+                                                     'abcd@123')
+        Job.objects.filter(job_name='Invoiced job 0').update(
+            primary_client=other, task_status='jbd')
+
+        response = self.get_table(client='other@mail.com')
+        self.assertEqual(response.context['page'].paginator.count, 1)
+        response = self.get_table(status='cnb')
+        self.assertEqual(response.context['page'].paginator.count, 1)
+        response = self.get_table(start_date=timezone.now().date() +
+                                  timedelta(days=1))
+        self.assertContains(response, 'No invoices')
+        response = self.get_table(sort='unknown')
+        self.assertEqual(response.status_code, 400)
+        today = timezone.localdate()
+        response = self.get_table(start_date=today, end_date=today)
+        self.assertEqual(response.context['page'].paginator.count, 2)
+
+    def test_invoice_table_counted_without_payments(self):
+        """payments should only be summed up for the rows of the page"""
+        self.create_invoices(3)
+        PaymentHistory.objects.create(
+            invoice=Job.objects.get(job_name='Invoiced job 1').invoice,
+            payment_date=timezone.now(),
+            payment_amount=100,
+            payment_method='c')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_table(start_date=timezone.localdate())
+        self.assertEqual(response.context['page'].paginator.count, 2)
+        invoice_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "finance_invoice"' in query['sql']
+        ]
+        self.assertEqual(len(invoice_queries), 3)
+        self.assertNotIn('finance_paymenthistory', invoice_queries[0])
+        self.assertNotIn('finance_paymenthistory', invoice_queries[1])
+        # issue date is not cast to a date, so its index can be used
+        for cast in ('::date', 'cast_date'):
+            self.assertNotIn(cast, invoice_queries[0])
+
+        response = self.get_table(sort='-paid')
+        self.assertEqual([row[0] for row in response.context['rows']],
+                         ['Invoiced job 1', 'Invoiced job 0'])
+        self.assertEqual(response.context['rows'][0][11], 300)
+
+
+class KpiSnapshotTest(KpiTestBase):
+
+    def test_snapshots_built_for_the_first_visit(self):
+        """all sections should be available before the first rebuild"""
+        self.create_jobs(2)
+        snapshots = get_kpi_snapshots()
+
+        self.assertEqual(len(snapshots), len(KpiSnapshot.SECTIONS))
+        self.assertEqual(snapshots[KpiSnapshot.CLIENTS].data['total_users'],
+                         1)
+        self.assertEqual(JobTaskSnapshot.objects.count(), 2)
+
+    def test_snapshots_read_in_constant_queries(self):
+        """stored snapshots should be read with a single query"""
+        self.create_jobs(2)
+        rebuild_snapshots()
+        with CaptureQueriesContext(connection) as queries:
+            get_kpi_snapshots()
+
+        self.assertEqual(len(queries), 1)
+
+    def test_job_task_snapshot_refreshed_after_task_changed(self):
+        """task KPIs of the job should be refreshed once committed"""
+        self.create_jobs(1)
+        rebuild_snapshots()
+        task = Task.objects.filter(completed=False).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            task.completed = True
+            task.save()
+        snapshot = JobTaskSnapshot.objects.get(job=task.work.job)
+
+        self.assertEqual(snapshot.task_completed, 2)
+
+    def test_payment_snapshots_refreshed_after_payment(self):
+        """invoice KPIs should be refreshed by the worker"""
+        rebuild_snapshots()
+        job = Job.objects.create(job_name='Paid job',
+                                 primary_client=self.client_user,
+                                 status='job')
+        with self.captureOnCommitCallbacks(execute=True):
+            job.invoice = Invoice.objects.create(price=1000,
+                                                 discount=0,
+                                                 total_price=1000)
+            job.save()
+            PaymentHistory.objects.create(invoice=job.invoice,
+                                          payment_date=timezone.now(),
+                                          payment_amount=400,
+                                          payment_method='c')
+        self.assertEqual(
+            sorted(refresh_stale_sections()),
+            sorted([KpiSnapshot.JOBS, KpiSnapshot.COMPANY,
+                    KpiSnapshot.INVOICES]))
+        snapshots = get_kpi_snapshots()
+
+        self.assertEqual(
+            Decimal(snapshots[KpiSnapshot.INVOICES].data['to_be_paid']), 600)
+
+    def test_paid_kpis_follow_the_current_date(self):
+        """rolling deposits should move with the date without a refresh"""
+        self.create_invoices(1)
+        rebuild_snapshots()
+        data = payments_context({})['paid_kpi_data']
+        self.assertEqual(data['last_seven_days_deposits'], 200)
+
+        later = timezone.localdate() + timedelta(days=7)
+        with mock.patch('finance.utils.timezone.localdate',
+                        return_value=later):
+            data = payments_context({})['paid_kpi_data']
+        self.assertIsNone(data['last_seven_days_deposits'])
+        self.assertEqual(data['last_thirty_days_deposits'], 200)
+
+    def test_job_changes_mark_sections_stale(self):
+        """job writes should only mark the sections, which are coalesced"""
+        self.create_jobs(1)
+        rebuild_snapshots()
+        job = Job.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                job.task_status = 'cnb'
+                job.save(update_fields=['task_status'])
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(KpiSnapshot.objects.filter(stale=True).exists())
+
+        for i in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                Job.objects.create(job_name=f'New job {i}',
+                                   primary_client=self.client_user,
+                                   status='job')
+        self.assertEqual(
+            sorted(refresh_stale_sections()),
+            sorted([KpiSnapshot.JOBS, KpiSnapshot.COMPANY]))
+        self.assertEqual(refresh_stale_sections(), [])
+        jobs = get_kpi_snapshots()[KpiSnapshot.JOBS].data
+        self.assertEqual(
+            sum(row['jobs'] for row in jobs['job_by_clients']), 4)
+
+    def test_refresh_failure_does_not_fail_the_write(self):
+        """failed refresh should be logged once the write is committed"""
+        rebuild_snapshots()
+        with mock.patch('dashboard.snapshots.refresh_job_task_snapshots',
+                        side_effect=Exception('failed')):
+            with self.assertLogs('dashboard.snapshots', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Job.objects.create(job_name='New job',
+                                       primary_client=self.client_user,
+                                       status='job')
+        self.assertTrue(Job.objects.filter(job_name='New job').exists())
+
+    @override_settings(DASHBOARD_SECTION_THREADS=0)
+    def test_dashboard_renders_snapshots(self):
+        """dashboard sections should render the stored KPIs"""
+        self.create_jobs(2)
+        staff = get_user_model().objects.create_user('test_staff@mail.com',
+                                                     'abcd@123',
+                                                     is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('dashboard:dashboardHome'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response,
+                            reverse('dashboard:section', args=['kpis']))
+        response = self.client.get(
+            reverse('dashboard:section', args=['kpis']))
+        self.assertContains(response, 'KPIs updated')
+        response = self.client.get(
+            reverse('dashboard:section', args=['job_tasks']))
+        self.assertContains(response, 'Job 1')
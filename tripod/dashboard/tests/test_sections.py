@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import TimeoutError
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tripod.process_cache import clear_process_cache
+
+from dashboard.sections import Section, get_section_html
+from dashboard.tests.test_kpis import KpiTestBase
+
+
+def slow_context(params):
+    time.sleep(0.5)
+    return {'chart_version': 'slow'}
+
+
+class SectionTest(KpiTestBase):
+
+    @override_settings(DASHBOARD_SECTION_THREADS=0)
+    def test_section_is_cached(self):
+        """section should be rendered once and then served from the cache"""
+        self.create_jobs(1)
+        html = get_section_html('job_tasks', {})
+        self.assertIn('Job 0', html)
+
+        with mock.patch('dashboard.sections.render_to_string') as render:
+            self.assertEqual(get_section_html('job_tasks', {}), html)
+        render.assert_not_called()
+        # other pages are cached on their own
+        self.assertNotEqual(get_section_html('job_tasks', {'jobs_page': 2}),
+                            '')
+
+    @override_settings(DASHBOARD_SECTION_THREADS=1)
+    def test_slow_section_serves_last_copy(self):
+        """slow section should time out, or serve its last rendered copy"""
+        section = Section('sources', slow_context, cache_timeout=0,
+                          timeout=0.05)
+        with mock.patch.dict('dashboard.sections.SECTIONS',
+                             {'sources': section}):
+            with self.assertRaises(TimeoutError):
+                get_section_html('sources', {})
+            # waiting for the rendering to be completed in the background
+            time.sleep(0.6)
+            self.assertIn('?v=slow', get_section_html('sources', {}))
+
+    @override_settings(DASHBOARD_SECTION_THREADS=0)
+    def test_section_view(self):
+        """sections should be served for staff and unknown ones are 404"""
+        staff = get_user_model().objects.create_user('test_staff@mail.com',
+                                                     'abcd@123',
+                                                     is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(
+            reverse('dashboard:section', args=['payments']))
+        self.assertContains(response, 'Payment History')
+        response = self.client.get(
+            reverse('dashboard:section', args=['invoices']))
+        self.assertContains(response, reverse('dashboard:invoices'))
+        response = self.client.get(
+            reverse('dashboard:section', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
+
+
+class SectionDatabaseCacheTest(TestCase):
+    """sections cached in the configured cache, the database cache"""
+
+    def setUp(self):
+        clear_process_cache()
+        self.addCleanup(clear_process_cache)
+
+    @override_settings(DASHBOARD_SECTION_THREADS=0)
+    def test_section_read_from_process(self):
+        """cached section should be served without queries in the process"""
+        html = get_section_html('job_tasks', {})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_section_html('job_tasks', {}), html)
+        # other workers read it from the shared cache
+        clear_process_cache()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_section_html('job_tasks', {}), html)
+        with self.assertNumQueries(0):
+            get_section_html('job_tasks', {})
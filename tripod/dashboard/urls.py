@@ -6,6 +6,12 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('', views.dashboarHome, name='dashboardHome'),
+    path('section/<str:name>/', views.dashboardSection, name='section'),
+    path('chart/<str:name>/', views.dashboardChart, name='chart'),
+    path('chart-data/<str:name>/',
+         views.dashboardChartData,
+         name='chartData'),
+    path('invoices/', views.dashboardInvoices, name='invoices'),
     path('download_summary',
          views.download_summary_report,
          name='download_summary'),
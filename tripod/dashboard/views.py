@@ -1,14 +1,38 @@
 import csv
+from concurrent.futures import TimeoutError
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.core.paginator import Paginator
+from django.contrib import messages
+from django.http import (Http404, HttpResponse, HttpResponseNotModified,
+                         JsonResponse, StreamingHttpResponse)
 
 from tripod.utils import staff_check, force_password_change_check
 
-from dashboard.dash_utils import (user_kpis, company_kpis, job_kpis,
-                                  invoice_kpis, paid_data, payment_graph,
-                                  jobs_by_source_graph)
+from finance.models import Invoice
+
+from dashboard.dash_utils import (invoice_report_values, invoice_report_row,
+                                  invoice_table_ids, invoice_table_values,
+                                  filter_invoices, INVOICE_REPORT_COLUMNS)
+from dashboard.charts import (CHARTS, get_chart_series, get_chart_version,
+                              render_chart_png)
+from dashboard.chart_data import CHART_DATA
+from dashboard.forms import (DateRangeForm, SummaryReportForm,
+                             InvoiceTableForm)
+from dashboard.sections import SECTIONS, get_section_html
+
+# number of invoices in a page of the invoice table
+INVOICES_PER_PAGE = 25
+# {column of the invoice table: sort key of the column}
+INVOICE_TABLE_COLUMN_SORTS = {
+    'Job Name': 'job',
+    'Client Email': 'client',
+    'Invoice Date': 'issue_date',
+    'Net Amount': 'net_amount',
+    'Paid': 'paid',
+}
+# number of invoices read from the db at once for the summary report
+REPORT_CHUNK_SIZE = 2000
 
 
 @login_required(login_url='company:staffLogin')
@@ -17,56 +41,136 @@ from dashboard.dash_utils import (user_kpis, company_kpis, job_kpis,
                   login_url="company:changePassword")
 def dashboarHome(request):
     """
-    dashboard and management reports
+    dashboard and management reports, sections of the dashboard are loaded
+    by the page from dashboardSection
     """
-    # user management
-    users = get_user_model().objects.all()
-    clients = users.filter(is_client=True)
-    employees = users.filter(is_staff=True)
-    client_kpis_data = user_kpis(clients)
-    employee_kpis_data = user_kpis(employees)
+    return render(request, 'dashboard/dashhome.html')
 
-    # company kpis
-    company_kpis_data = company_kpis()
 
-    # job kpis
-    job_kpis_data = job_kpis()
+@login_required(login_url='company:staffLogin')
+@user_passes_test(staff_check)
+@user_passes_test(force_password_change_check,
+                  login_url="company:changePassword")
+def dashboardSection(request, name):
+    """
+    HTML of a dashboard section (refer dashboard.sections), 504 if the
+    section is not rendered in time
+    """
+    if name not in SECTIONS:
+        raise Http404('Section is not available')
+    try:
+        html = get_section_html(name, request.GET)
+    except TimeoutError:
+        return HttpResponse('Section is taking longer than expected',
+                            status=504)
+    return HttpResponse(html)
 
-    # paid data
-    paid_kpi_data = paid_data()
 
-    # payment plot
-    payment_plot = payment_graph()
+@login_required(login_url='company:staffLogin')
+@user_passes_test(staff_check)
+@user_passes_test(force_password_change_check,
+                  login_url="company:changePassword")
+def dashboardChart(request, name):
+    """
+    PNG image of the chart, which is cached by the browser while the
+    version (hash of the series) in the url is the current one
+    """
+    if name not in CHARTS:
+        raise Http404('Chart is not available')
+    series = get_chart_series(name)
+    version = get_chart_version(series)
+    etag = f'"{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(render_chart_png(name, series, version),
+                                content_type='image/png')
+    response['ETag'] = etag
+    if request.GET.get('v') == version:
+        response['Cache-Control'] = 'private, max-age=86400'
+    else:
+        response['Cache-Control'] = 'private, no-cache'
+    return response
 
-    # source-jobs plot
-    jobs_by_source = jobs_by_source_graph()
 
-    # invoice kpis
-    df = invoice_kpis()
-    invoice_kpis_data = df[df['Job Name'] != 'Job Deleted'].reset_index(
-        drop=True)
+@login_required(login_url='company:staffLogin')
+@user_passes_test(staff_check)
+@user_passes_test(force_password_change_check,
+                  login_url="company:changePassword")
+def dashboardChartData(request, name):
+    """
+    data of the chart as json, for the range of start_date and end_date
+    (whole history by default) bucketed by days, weeks or months
+    """
+    if name not in CHART_DATA:
+        raise Http404('Chart is not available')
+    form = DateRangeForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    return JsonResponse(CHART_DATA[name](form.cleaned_data['start_date'],
+                                         form.cleaned_data['end_date']))
+
+
+@login_required(login_url='company:staffLogin')
+@user_passes_test(staff_check)
+@user_passes_test(force_password_change_check,
+                  login_url="company:changePassword")
+def dashboardInvoices(request):
+    """
+    page of the invoice table, invoices can be filtered with start_date,
+    end_date (issue date), status (job task status) and client (email),
+    and sorted with sort (refer dash_utils.INVOICE_TABLE_SORTS)
+    """
+    form = InvoiceTableForm(request.GET)
+    if not form.is_valid():
+        return render(request,
+                      'dashboard/invoiceTable.html', {'form': form},
+                      status=400)
+    filters = {
+        key: value
+        for key, value in form.cleaned_data.items()
+        if key not in ('sort', 'page')
+    }
+    sort = form.cleaned_data['sort'] or '-issue_date'
+    invoice_ids = invoice_table_ids(
+        filter_invoices(Invoice.objects.all(), **filters), sort)
+    page = Paginator(invoice_ids, INVOICES_PER_PAGE).get_page(
+        form.cleaned_data['page'])
 
+    # query string of the filters, for the sorting and page links
+    query = request.GET.copy()
+    query.pop('sort', None)
+    query.pop('page', None)
     context = {
-        'client_kpis':
-        client_kpis_data,
-        'employee_kpis_data':
-        employee_kpis_data,
-        'company_kpis_data':
-        company_kpis_data,
-        'job_kpis_data':
-        job_kpis_data,
-        'invoice_kpis_data':
-        invoice_kpis_data.to_html(
-            classes="table table-centered table-nowrap table-hover mb-0"),
-        'paid_kpi_data':
-        paid_kpi_data,
-        'payment_plot':
-        payment_plot,
-        'jobs_by_source_plot':
-        jobs_by_source,
+        'form': form,
+        'headers': [(column, INVOICE_TABLE_COLUMN_SORTS.get(column))
+                    for column in INVOICE_REPORT_COLUMNS],
+        'sort': sort,
+        'page': page,
+        'rows': [
+            invoice_report_row(row)
+            for row in invoice_table_values(list(page.object_list))
+        ],
+        'query': query.urlencode(),
     }
+    return render(request, 'dashboard/invoiceTable.html', context)
 
-    return render(request, 'dashboard/dashhome.html', context)
+
+class Echo:
+    """pseudo buffer that returns the written value, for streaming csv"""
+
+    def write(self, value):
+        return value
+
+
+def summary_report_rows(invoices):
+    """yielding the csv lines of the summary report, chunk by chunk"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(['Index'] + INVOICE_REPORT_COLUMNS)
+    values = invoice_report_values(invoices).iterator(
+        chunk_size=REPORT_CHUNK_SIZE)
+    for index, row in enumerate(values):
+        yield writer.writerow([index] + invoice_report_row(row))
 
 
 @login_required(login_url='company:staffLogin')
@@ -74,26 +178,19 @@ def dashboarHome(request):
 @user_passes_test(force_password_change_check,
                   login_url="company:changePassword")
 def download_summary_report(request):
-    """Downloading the summary invoice report into csv"""
-    # Creating HttpRepsponce with csv header
-    response = HttpResponse(
+    """
+    Downloading the summary invoice report into csv, rows are streamed
+    while they are read from the db. invoices can be filtered with
+    start_date, end_date (issue date) and status (job task status)
+    """
+    form = SummaryReportForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, 'Invalid report filters')
+        return redirect('dashboard:dashboardHome')
+    invoices = filter_invoices(Invoice.objects.all(), **form.cleaned_data)
+
+    return StreamingHttpResponse(
+        summary_report_rows(invoices),
         content_type='text/csv',
         headers={'Content-Disposition': 'attachment; filename="report.csv"'},
     )
-
-    # creating csv file
-    writer = csv.writer(response)
-    writer.writerow([
-        "Index", "Job Name", "Job Status", "Client Email", "Package", "Event",
-        "Source", "Invoice Number", "Invoice Date", "Sub Total", "Discount",
-        "Net Amount", "Paid", "To be Paid", "Last Paid Date"
-    ])
-    for index, row in invoice_kpis().iterrows():
-        writer.writerow([
-            index, row['Job Name'], row['Job Status'], row['Client Email'],
-            row['Package'], row['Event'], row['Source'], row['Invoice Number'],
-            row['Invoice Date'], row['Sub Total'], row['Discount'],
-            row['Net Amount'], row['Paid'], row['To be Paid'],
-            row['Last Paid Date']
-        ])
-    return response
@@ -1,8 +1,9 @@
 from django.contrib import admin
 
-from finance.models import Invoice, PaymentHistory, Receipt
+from finance.models import Invoice, PaymentHistory, Receipt, DailyPayment
 
 
 admin.site.register(Invoice)
 admin.site.register(PaymentHistory)
 admin.site.register(Receipt)
+admin.site.register(DailyPayment)
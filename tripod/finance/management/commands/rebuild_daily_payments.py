@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from finance.models import DailyPayment
+from finance.utils import rebuild_daily_payments
+
+
+class Command(BaseCommand):
+    """
+    Rebuilding the daily payments rollup from the payment history, e.g.
+    after the payments are loaded or changed in bulk without the signals
+    """
+    help = 'Rebuild the daily payments rollup'
+
+    def handle(self, *args, **options):
+        rebuild_daily_payments()
+        self.stdout.write(
+            f'Daily payments rebuilt ({DailyPayment.objects.count()} days '
+            'and methods)')
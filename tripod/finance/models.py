@@ -14,7 +14,7 @@ def validate_percentage(value):
 
 
 class Invoice(models.Model):
-    issue_date = models.DateTimeField(auto_now=True)
+    issue_date = models.DateTimeField(auto_now=True, db_index=True)
     description = models.TextField(null=True, blank=True)
     price = models.DecimalField(max_digits=8,
                                 decimal_places=2,
@@ -83,6 +83,33 @@ class PaymentHistory(models.Model):
         ][0]
 
 
+class DailyPayment(models.Model):
+    """
+    Payments of a day summed up for each payment method, kept in sync with
+    PaymentHistory by the finance signals and rebuilt by the
+    rebuild_daily_payments management command
+
+    * date -> local date of the payments
+    * payment_method -> method of the payments
+    * payments -> number of the payments
+    * amount -> total of the payments
+    """
+    date = models.DateField()
+    payment_method = models.CharField(max_length=2,
+                                      choices=PaymentHistory.PAYMENT_METHODS)
+    payments = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=12,
+                                 decimal_places=2,
+                                 default=Decimal(0))
+
+    class Meta:
+        ordering = ('date', 'payment_method')
+        unique_together = ('date', 'payment_method')
+
+    def __str__(self):
+        return f"{self.date} - {self.payment_method} - {self.amount}"
+
+
 class Receipt(models.Model):
     # STATUSES
     STATUSES = [('paid', 'paid'), ('pend', 'pending'), ('ref', 'refund')]
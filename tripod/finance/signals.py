@@ -0,0 +1,51 @@
+"""
+Signals of the finance app, which keep the daily payments rollup in sync
+with the payment history.
+"""
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from finance.models import PaymentHistory
+from finance.utils import update_daily_payment
+
+
+def counted_payment(payment):
+    """(date, method, amount) that the payment is counted with in the rollup"""
+    if payment.payment_date is None:
+        return None
+    return (timezone.localdate(payment.payment_date), payment.payment_method,
+            payment.payment_amount)
+
+
+@receiver(post_init, sender=PaymentHistory)
+def payment_loaded(sender, instance, **kwargs):
+    """remembering the values that are counted for the payment"""
+    if instance.pk is None or 'payment_date' not in instance.__dict__:
+        instance._counted_payment = None
+    else:
+        instance._counted_payment = counted_payment(instance)
+
+
+@receiver(post_save, sender=PaymentHistory)
+def payment_saved(sender, instance, created, **kwargs):
+    """moving the payment from the counted day and method to the new one"""
+    counted = None if created else instance._counted_payment
+    current = counted_payment(instance)
+    if counted == current:
+        return
+    if counted is not None:
+        date, method, amount = counted
+        update_daily_payment(date, method, -1, -(amount or 0))
+    if current is not None:
+        date, method, amount = current
+        update_daily_payment(date, method, 1, amount)
+    instance._counted_payment = current
+
+
+@receiver(post_delete, sender=PaymentHistory)
+def payment_deleted(sender, instance, **kwargs):
+    """removing the deleted payment from the rollup"""
+    if instance._counted_payment is not None:
+        date, method, amount = instance._counted_payment
+        update_daily_payment(date, method, -1, -(amount or 0))
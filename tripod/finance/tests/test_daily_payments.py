@@ -0,0 +1,81 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from finance.models import Invoice, PaymentHistory, DailyPayment
+from finance.utils import rolling_deposits
+
+
+class DailyPaymentTest(TestCase):
+
+    def setUp(self):
+        self.invoice = Invoice.objects.create(price=1000,
+                                              discount=0,
+                                              total_price=1000)
+        self.now = timezone.now()
+
+    def add_payment(self, amount, days_before=0, method='c'):
+        return PaymentHistory.objects.create(
+            invoice=self.invoice,
+            payment_date=self.now - timedelta(days=days_before),
+            payment_amount=amount,
+            payment_method=method)
+
+    def rollup(self):
+        return {(row.date, row.payment_method): (row.payments, row.amount)
+                for row in DailyPayment.objects.all()}
+
+    def test_rollup_follows_payment_changes(self):
+        """rollup should be updated when payments are changed or deleted"""
+        today = timezone.localdate(self.now)
+        yesterday = today - timedelta(days=1)
+        payment = self.add_payment(100)
+        self.add_payment(50)
+        self.add_payment(25, method='cc')
+        self.assertEqual(self.rollup()[(today, 'c')], (2, 150))
+
+        payment.payment_amount = 70
+        payment.save()
+        self.assertEqual(self.rollup()[(today, 'c')], (2, 120))
+
+        payment.payment_date = self.now - timedelta(days=1)
+        payment.save()
+        self.assertEqual(self.rollup()[(today, 'c')], (1, 50))
+        self.assertEqual(self.rollup()[(yesterday, 'c')], (1, 70))
+
+        PaymentHistory.objects.get(pk=payment.pk).delete()
+        self.assertEqual(self.rollup()[(yesterday, 'c')], (0, 0))
+        self.assertEqual(self.rollup()[(today, 'cc')], (1, 25))
+
+    def test_rebuild_matches_signals(self):
+        """rebuilt rollup should be the same as the one kept by signals"""
+        for days in (0, 0, 3, 40):
+            self.add_payment(10 + days, days)
+        self.add_payment(5, method='bt')
+        expected = {
+            key: value
+            for key, value in self.rollup().items() if value[0]
+        }
+
+        DailyPayment.objects.all().delete()
+        call_command('rebuild_daily_payments', stdout=StringIO())
+        self.assertEqual(self.rollup(), expected)
+
+    def test_rolling_deposits(self):
+        """deposits should be summed up for the windows including today"""
+        today = timezone.localdate(self.now)
+        for days in (0, 6, 7, 29, 30, 89, 90):
+            self.add_payment(1, days)
+
+        deposits = rolling_deposits(today)
+        self.assertEqual(deposits['last_seven_days_deposits'], 2)
+        self.assertEqual(deposits['last_thirty_days_deposits'], 4)
+        self.assertEqual(deposits['last_ninety_days_deposits'], 6)
+        month_to_date = PaymentHistory.objects.filter(
+            payment_date__date__gte=today.replace(day=1)).count()
+        self.assertEqual(deposits['month_to_date_deposits'],
+                         Decimal(month_to_date))
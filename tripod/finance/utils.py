@@ -1,12 +1,36 @@
-from finance.models import Invoice
+from datetime import timedelta
 from decimal import Decimal
 
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from finance.models import Invoice, PaymentHistory, DailyPayment
+
+# days of the rolling deposit windows
+DEPOSIT_WINDOWS = {
+    'last_seven_days_deposits': 7,
+    'last_thirty_days_deposits': 30,
+    'last_ninety_days_deposits': 90
+}
+
 
 def register_invoice_data_for_job(job, package=False):
     """
     when the job is created or when the instance is saved,
     invoice data will be updated with the correct information
     """
+    set_invoice_data_for_job(job, package=package)
+    job.save()
+
+
+def set_invoice_data_for_job(job, package=False):
+    """
+    creating or updating the invoice of the job and linking it to the job
+    instance, the job itself is not saved so the caller can write it once
+    together with the rest of its changes
+    """
     if package:
         package_description = job.package.description
         package_price = job.package.price
@@ -29,7 +53,7 @@ def register_invoice_data_for_job(job, package=False):
         invoice.total_price = invoice.price - Decimal(discounted_amount)
         invoice.save()
     job.invoice = invoice
-    job.save()
+    return invoice
 
 
 def prepare_invoice_sharing(job):
@@ -79,3 +103,69 @@ def prepare_invoice_sharing(job):
     invoice.description = invoice_summary
     invoice.save()
     return invoice_summary
+
+
+def update_daily_payment(date, payment_method, payments, amount):
+    """
+    adding the payments and the amount to the rollup of the day, the values
+    are added in the db so concurrent payments are not lost
+    """
+    amount = Decimal(amount or 0)
+    if not payments and not amount:
+        return
+    updated = DailyPayment.objects.filter(
+        date=date, payment_method=payment_method).update(
+            payments=F('payments') + payments, amount=F('amount') + amount)
+    if not updated:
+        _, created = DailyPayment.objects.get_or_create(
+            date=date,
+            payment_method=payment_method,
+            defaults={
+                'payments': payments,
+                'amount': amount
+            })
+        if not created:
+            # created by a concurrent payment in the meantime
+            update_daily_payment(date, payment_method, payments, amount)
+
+
+def rebuild_daily_payments():
+    """rebuilding the rollup of all days from the payment history"""
+    rows = PaymentHistory.objects.annotate(
+        date=TruncDate('payment_date')).values(
+            'date', 'payment_method').annotate(
+                payments=Count('id'),
+                amount=Sum('payment_amount')).order_by('date',
+                                                       'payment_method')
+    with transaction.atomic():
+        DailyPayment.objects.all().delete()
+        DailyPayment.objects.bulk_create([
+            DailyPayment(date=row['date'],
+                         payment_method=row['payment_method'],
+                         payments=row['payments'],
+                         amount=row['amount'] or 0) for row in rows
+        ])
+
+
+def get_deposits(start_date, end_date):
+    """total of the payments between the dates, both included"""
+    return DailyPayment.objects.filter(
+        date__gte=start_date,
+        date__lte=end_date).aggregate(deposits=Sum('amount'))['deposits']
+
+
+def rolling_deposits(today=None):
+    """
+    deposits of the last seven, thirty and ninety days (today included) and
+    of the month to date, read from the daily rollup so the cost does not
+    depend on the length of the payment history
+    """
+    if today is None:
+        today = timezone.localdate()
+    data = {
+        key: get_deposits(today - timedelta(days=days - 1), today)
+        for key, days in DEPOSIT_WINDOWS.items()
+    }
+    data['month_to_date_deposits'] = get_deposits(today.replace(day=1),
+                                                  today)
+    return data
@@ -0,0 +1,150 @@
+"""
+Batch confirmation and declining of jobs. Selected jobs are processed in
+chunks, each chunk is locked and written with a single bulk update. Works and
+tasks of the confirmed jobs are built by the materialization (refer
+job.workflow_factory.materialization), either by the background worker or
+right away on a process pool (refer batch_jobs management command).
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from job.models import Job, Work
+from job.workflow_factory.materialization import (queue_materialization,
+                                                  materialize_jobs)
+from job.workflow_factory.plans import get_workflow_plan
+from tripod.reports import Report, Result
+
+CONFIRM = 'confirm'
+DECLINE = 'decline'
+ACTIONS = [CONFIRM, DECLINE]
+CHUNK_SIZE = 100
+
+
+class JobResult(Result):
+    """
+    Result of the batch action for a single job
+
+    * job_id -> id of the job
+    * job_name -> name of the job; None if the job is not available
+    * success -> True if the action was done for the job
+    * message -> explanation of the result
+    """
+    __slots__ = ('job_id', 'job_name')
+
+    def __init__(self, job_id, job_name, success, message):
+        super().__init__(success, message)
+        self.job_id = job_id
+        self.job_name = job_name
+
+
+class BatchReport(Report):
+    """
+    Report of the batch action (refer tripod.reports.Report)
+
+    * action -> confirm or decline
+    * results -> {job_id: JobResult} in the order of processing
+    """
+    result_class = JobResult
+
+    def __init__(self, action):
+        super().__init__()
+        self.action = action
+
+
+def chunks(items, size):
+    """splitting the list of items into chunks of size"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def confirm_jobs(job_ids, user, report):
+    """
+    confirming a chunk of jobs, jobs without works are queued for the
+    materialization. plan of each workflow is compiled once and shared by
+    all the jobs of the batch
+    """
+    has_works = Exists(Work.objects.filter(job=OuterRef('pk')))
+    with transaction.atomic():
+        jobs = Job.objects.select_for_update(of=('self', )).filter(
+            pk__in=job_ids).select_related('workflow').annotate(
+                has_works=has_works)
+        changed_at = timezone.now()
+        confirmed = []
+        for job in jobs:
+            if job.status == 'job':
+                report.add(job.id, job.job_name, False,
+                           'Job is already confirmed')
+                continue
+            if not job.has_works:
+                if job.workflow is None:
+                    report.add(job.id, job.job_name, False,
+                               'Workflow is needed to confirm the job')
+                    continue
+                try:
+                    get_workflow_plan(job.workflow)
+                except Exception as err:
+                    report.add(job.id, job.job_name, False, str(err))
+                    continue
+                queue_materialization(job)
+            job.status = 'job'
+            job.changed_by = user
+            job.changed_at = changed_at
+            confirmed.append(job)
+            report.add(job.id, job.job_name, True, 'Job is confirmed')
+        Job.objects.bulk_update(confirmed, [
+            'status', 'changed_by', 'changed_at', 'workflow_state',
+            'workflow_attempts', 'workflow_error', 'workflow_retry_at'
+        ])
+
+
+def decline_jobs(job_ids, user, report):
+    """declining a chunk of jobs with a single update"""
+    with transaction.atomic():
+        jobs = Job.objects.select_for_update().filter(pk__in=job_ids)
+        declined = []
+        for job_id, job_name, status in jobs.values_list(
+                'id', 'job_name', 'status'):
+            if status == 'dec':
+                report.add(job_id, job_name, False, 'Job is already declined')
+            else:
+                declined.append(job_id)
+                report.add(job_id, job_name, True, 'Job is declined')
+        Job.objects.filter(pk__in=declined).update(status='dec',
+                                                   changed_by=user,
+                                                   changed_at=timezone.now())
+
+
+def batch_update_jobs(job_ids,
+                      action,
+                      user=None,
+                      chunk_size=CHUNK_SIZE,
+                      processes=None,
+                      materialize=False):
+    """
+    confirming or declining the jobs in chunks, and returning the report.
+    if materialize is True, works and tasks of the confirmed jobs are built
+    right away (on a process pool of processes) instead of by the worker
+    """
+    if action not in ACTIONS:
+        raise ValueError(f'Action ({action}) is not available')
+    report = BatchReport(action)
+    job_ids = list(dict.fromkeys(int(job_id) for job_id in job_ids))
+    for chunk in chunks(job_ids, chunk_size):
+        if action == CONFIRM:
+            confirm_jobs(chunk, user, report)
+        else:
+            decline_jobs(chunk, user, report)
+    for job_id in job_ids:
+        if job_id not in report.results:
+            report.add(job_id, None, False, 'Job is not available')
+
+    if action == CONFIRM and materialize:
+        queued = list(
+            Job.objects.filter(pk__in=[r.job_id for r in report.succeeded()],
+                               workflow_state=Job.MATERIALIZING).values_list(
+                                   'id', flat=True))
+        for job_id, success, message in materialize_jobs(
+                queued, processes=processes):
+            report.update(job_id, success, message)
+    return report.finish()
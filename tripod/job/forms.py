@@ -1,12 +1,11 @@
 from django import forms
 
 from job.models import Job, Appointment
-from core.models import CustomUser
-from core.models import CustomUser
-from job.workflow_factory.workflow import WorkFlowBase
+from job.workflow_factory.materialization import queue_materialization
 
 from finance.utils import register_invoice_data_for_job
 
+from tripod.reference_data import ReferenceChoicesMixin
 from tripod.utils import add_basic_html_tags
 
 
@@ -18,13 +17,17 @@ class TimeInput(forms.TimeInput):
     input_type = 'time'
 
 
-class JobCreateForm(forms.ModelForm):
+class JobCreateForm(ReferenceChoicesMixin, forms.ModelForm):
     """job creating for testing purpose"""
 
     class Meta:
         model = Job
         fields = '__all__'
-        exclude = ['created_at', 'changed_at']
+        exclude = [
+            'created_at', 'changed_at', 'workflow_state', 'workflow_attempts',
+            'workflow_error', 'workflow_retry_at', 'total_tasks',
+            'completed_tasks'
+        ]
         widgets = {
             'start_date': DateInput(),
             'start_time': TimeInput(),
@@ -36,8 +39,6 @@ class JobCreateForm(forms.ModelForm):
         self.user = kwargs.pop('userObj')
         super().__init__(*args, **kwargs)
         add_basic_html_tags("Please add job - ", self.fields, True)
-        self.fields['photographer'].queryset = CustomUser.objects.filter(
-            is_staff=True).filter(is_photographer=True)
 
     def save(self, *args, **kwargs):
         self.instance.create_by = self.user
@@ -46,7 +47,7 @@ class JobCreateForm(forms.ModelForm):
         return jobObj
 
 
-class JobReqCreateForm(forms.ModelForm):
+class JobReqCreateForm(ReferenceChoicesMixin, forms.ModelForm):
     """Workflow object creation"""
 
     class Meta:
@@ -60,8 +61,6 @@ class JobReqCreateForm(forms.ModelForm):
         self.user = kwargs.pop('userObj')
         super().__init__(*args, **kwargs)
         add_basic_html_tags("Please add job - ", self.fields, True)
-        self.fields['photographer'].queryset = CustomUser.objects.filter(
-            is_staff=True).filter(is_photographer=True)
 
     def save(self, *args, **kwargs):
         self.instance.created_by = self.user
@@ -70,7 +69,7 @@ class JobReqCreateForm(forms.ModelForm):
         return jobObj
 
 
-class JobUpdateConfirmForm(forms.ModelForm):
+class JobUpdateConfirmForm(ReferenceChoicesMixin, forms.ModelForm):
     """Workflow object creation for confirmed job"""
 
     class Meta:
@@ -78,7 +77,9 @@ class JobUpdateConfirmForm(forms.ModelForm):
         fields = '__all__'
         exclude = [
             'status', 'completed', 'created_by', 'created_at', 'changed_by',
-            'changed_at', 'task_status'
+            'changed_at', 'task_status', 'workflow_state', 'workflow_attempts',
+            'workflow_error', 'workflow_retry_at', 'total_tasks',
+            'completed_tasks'
         ]
         widgets = {
             'start_date': DateInput(),
@@ -92,8 +93,6 @@ class JobUpdateConfirmForm(forms.ModelForm):
         self.user = kwargs.pop('userObj')
         super().__init__(*args, **kwargs)
         self.obj = Job.objects.get(pk=self.instance.pk)
-        self.fields['photographer'].queryset = CustomUser.objects.filter(
-            is_staff=True).filter(is_photographer=True)
 
     def save(self, *args, **kwargs):
         self.instance.created_by = self.obj.created_by
@@ -107,10 +106,12 @@ class JobUpdateConfirmForm(forms.ModelForm):
                 raise ValueError('Workflow is needed to confirm the job')
             else:
                 self.instance.status = 'job'
+                # works, tasks and invoice are created by the background
+                # worker (refer job.workflow_factory.materialization)
+                queue_materialization(self.instance)
                 jobObj = super(JobUpdateConfirmForm,
                                self).save(*args, **kwargs)
-                wfb = WorkFlowBase(self.user, jobObj)
-                wfb.create_work_and_tasks()
+                return jobObj
         else:
             jobObj = super(JobUpdateConfirmForm, self).save(*args, **kwargs)
         if jobObj.package:
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from job.batch import ACTIONS, CHUNK_SIZE, CONFIRM, batch_update_jobs
+from job.models import Job
+
+
+class Command(BaseCommand):
+    """
+    Confirming or declining jobs in bulk. Jobs can be selected by ids or by
+    their status, and works and tasks of the confirmed jobs are materialized
+    right away on a pool of processes unless --queue-only is passed
+    """
+    help = 'Confirm or decline jobs in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=ACTIONS)
+        parser.add_argument('--ids',
+                            nargs='+',
+                            type=int,
+                            default=[],
+                            help='ids of the jobs')
+        parser.add_argument('--status',
+                            choices=[status[0] for status in Job.STATUSES],
+                            help='selecting all the jobs with the status')
+        parser.add_argument('--user', help='email of the user who changes')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--processes',
+                            type=int,
+                            default=1,
+                            help='number of processes to materialize jobs')
+        parser.add_argument('--queue-only',
+                            action='store_true',
+                            help='leaving the materialization to the worker')
+
+    def handle(self, *args, **options):
+        job_ids = list(options['ids'])
+        if options['status']:
+            job_ids += list(
+                Job.objects.filter(status=options['status']).order_by(
+                    'id').values_list('id', flat=True))
+        if not job_ids:
+            raise CommandError('Please select jobs with --ids or --status')
+
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User {options['user']} is not available")
+
+        report = batch_update_jobs(
+            job_ids,
+            options['action'],
+            user=user,
+            chunk_size=options['chunk_size'],
+            processes=options['processes'],
+            materialize=(options['action'] == CONFIRM
+                         and not options['queue_only']))
+
+        for result in report.results.values():
+            status = 'OK' if result.success else 'FAILED'
+            self.stdout.write(
+                f'{result.job_id}\t{status}\t{result.job_name}\t'
+                f'{result.message}')
+        self.stdout.write(
+            f'{len(report.succeeded())} succeeded, {len(report.failed())} '
+            f'failed, {len(report.results)} jobs in {report.elapsed:.2f}s '
+            f'({report.throughput():.1f} jobs/s)')
@@ -0,0 +1,159 @@
+import json
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Company
+from core.outbox import BATCH_SIZE, deliver_pending
+from job.models import Job, Task, Work
+from settings.models import EmailTemplate, TemplateField
+from tripod.tasks_lib.mail_merge import mail_merge
+from tripod.tasks_lib.transports import (FileTransport, LocalSMTPTransport,
+                                         MemoryTransport)
+
+# backends that do not need the network
+BACKENDS = {
+    'memory': lambda path: MemoryTransport(),
+    'file': lambda path: FileTransport(path),
+    'standin': lambda path: LocalSMTPTransport(),
+}
+
+TEMPLATE_FIELDS = [
+    ('clientName', 'user.first_name'),
+    ('clientEmail', 'user.email'),
+    ('jobName', 'job.job_name'),
+    ('taskName', 'task.task_name'),
+    ('companyName', 'company.name'),
+]
+
+
+class Command(BaseCommand):
+    """
+    Benchmarking the email tasks, email tasks are processed with
+    Task.process_task (rendering of the template, saving the task and
+    storing the email in the outbox) and the outbox is delivered through
+    each of the transports. The same template is then sent to the tasks
+    with the mail merge for comparison. Benchmark data is created and rolled
+    back within a transaction, so nothing is left in the db
+    """
+    help = 'Benchmark processing and delivering the email tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--backends',
+                            nargs='+',
+                            choices=BACKENDS,
+                            default=list(BACKENDS))
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--json',
+                            action='store_true',
+                            help='printing the results as json')
+
+    def build_tasks(self, count):
+        """creating the email tasks, each in the first work of its job"""
+        user = get_user_model().objects.create_user('bench@tripod.local',
+                                                    'bench')
+        client = get_user_model().objects.create_user('client@tripod.local',
+                                                      'bench',
+                                                      first_name='Client')
+        Company.objects.create(name='Bench Studio', active=True)
+        for field, object_field in TEMPLATE_FIELDS:
+            TemplateField.objects.update_or_create(
+                field=field, defaults={'object_field': object_field})
+        template = EmailTemplate.objects.create(
+            template_name='Bench',
+            subject='{jobName} - {taskName}',
+            body=('Dear {clientName},\n\nThank you for choosing '
+                  '{companyName}, we will keep you posted about {jobName} '
+                  'on {clientEmail}.\n' + 'Lorem ipsum dolor sit amet. ' * 20),
+            thank_you='\n\nThank you')
+
+        jobs = Job.objects.bulk_create(
+            Job(job_name=f'Bench job {index}',
+                primary_client=client,
+                status='job',
+                total_tasks=1) for index in range(count))
+        works = Work.objects.bulk_create(
+            Work(work_name='Bench work',
+                 work_order=1,
+                 job=job,
+                 total_tasks=1) for job in jobs)
+        Task.objects.bulk_create(
+            Task(task_name='Bench email',
+                 task_order=1,
+                 work=work,
+                 description='Bench email',
+                 task_type=Task.EMAIL,
+                 email_template=template,
+                 user_task=False) for work in works)
+        return user, template, list(
+            Task.objects.filter(work__in=works).select_related('work__job'))
+
+    def measure(self, backend, count, batch_size):
+        with tempfile.TemporaryDirectory() as path, transaction.atomic():
+            transport = BACKENDS[backend](path)
+            user, template, tasks = self.build_tasks(count)
+
+            start = time.perf_counter()
+            for task in tasks:
+                task.process_task(user)
+            process_seconds = time.perf_counter() - start
+
+            sent = failed = 0
+            start = time.perf_counter()
+            while True:
+                batch_sent, batch_failed = deliver_pending(
+                    batch_size, transport)
+                if not batch_sent and not batch_failed:
+                    break
+                sent += batch_sent
+                failed += batch_failed
+            deliver_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            report = mail_merge(template,
+                                Task.objects.filter(
+                                    pk__in=[task.pk for task in tasks]),
+                                transport=transport,
+                                batch_size=batch_size)
+            merge_seconds = time.perf_counter() - start
+
+            transport.close()
+            MemoryTransport.outbox.clear()
+            transaction.set_rollback(True)
+        return {
+            'tasks': len(tasks),
+            'process_seconds': process_seconds,
+            'tasks_per_second': len(tasks) / process_seconds,
+            'sent': sent,
+            'failed': failed,
+            'deliver_seconds': deliver_seconds,
+            'emails_per_second': sent / deliver_seconds,
+            'merged': len(report.succeeded()),
+            'merge_seconds': merge_seconds,
+            'merged_per_second': len(report.succeeded()) / merge_seconds,
+        }
+
+    def handle(self, *args, **options):
+        results = {
+            backend: self.measure(backend, options['tasks'],
+                                  options['batch_size'])
+            for backend in options['backends']
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for backend, result in results.items():
+            self.stdout.write(
+                f"{backend}\t{result['tasks']} tasks processed in "
+                f"{result['process_seconds']:.2f}s "
+                f"({result['tasks_per_second']:.1f} tasks/s), "
+                f"{result['sent']} emails sent ({result['failed']} failed) in "
+                f"{result['deliver_seconds']:.2f}s "
+                f"({result['emails_per_second']:.1f} emails/s), "
+                f"{result['merged']} emails merged in "
+                f"{result['merge_seconds']:.2f}s "
+                f"({result['merged_per_second']:.1f} emails/s)")
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from job.models import Job
+from settings.models import EmailTemplate
+from tripod.tasks_lib.mail_merge import BATCH_SIZE, mail_merge
+
+
+class Command(BaseCommand):
+    """
+    Sending an email template to the clients of many jobs at once (refer
+    tripod.tasks_lib.mail_merge), e.g. a reminder to every job in a stage.
+    Jobs can be selected by ids, by their status or by their task status
+    """
+    help = 'Send an email template to the clients of the jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('template', type=int, help='id of the template')
+        parser.add_argument('--ids',
+                            nargs='+',
+                            type=int,
+                            default=[],
+                            help='ids of the jobs')
+        parser.add_argument('--status',
+                            choices=[status[0] for status in Job.STATUSES],
+                            help='selecting the jobs with the status')
+        parser.add_argument(
+            '--task-status',
+            choices=[status[0] for status in Job.TASKCHOICES],
+            help='selecting the jobs with the task status')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            template = EmailTemplate.objects.get(pk=options['template'])
+        except EmailTemplate.DoesNotExist:
+            raise CommandError(
+                f"Template {options['template']} is not available")
+
+        jobs = Job.objects.order_by('id')
+        if options['ids']:
+            jobs = jobs.filter(pk__in=options['ids'])
+        if options['status']:
+            jobs = jobs.filter(status=options['status'])
+        if options['task_status']:
+            jobs = jobs.filter(task_status=options['task_status'])
+        if not (options['ids'] or options['status'] or options['task_status']):
+            raise CommandError(
+                'Please select jobs with --ids, --status or --task-status')
+
+        report = mail_merge(template, jobs, batch_size=options['batch_size'])
+        for result in report.failed():
+            self.stdout.write(
+                f'{result.object_id}\tFAILED\t{result.email}\t'
+                f'{result.message}')
+        self.stdout.write(
+            f'{len(report.succeeded())} sent, {len(report.failed())} failed '
+            f'in {report.elapsed:.2f}s ({report.throughput():.1f} emails/s)')
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from job.workflow_factory.materialization import materialize_pending_jobs
+
+
+class Command(BaseCommand):
+    """
+    Worker process that builds works, tasks and invoices of the confirmed
+    jobs in the background. Runs until it is stopped, unless --once is passed
+    """
+    help = 'Materialize workflows of the confirmed jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once',
+                            action='store_true',
+                            help='process the waiting jobs once and exit')
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=50,
+                            help='number of jobs processed in one round')
+        parser.add_argument('--processes',
+                            type=int,
+                            default=1,
+                            help='number of processes to materialize jobs')
+        parser.add_argument('--sleep',
+                            type=float,
+                            default=2,
+                            help='seconds to wait when no job is waiting')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            materialized = materialize_pending_jobs(options['batch_size'],
+                                                    options['processes'])
+            if materialized:
+                self.stdout.write(f'{materialized} job(s) materialized')
+            if options['once']:
+                break
+            if not materialized:
+                time.sleep(options['sleep'])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from job.models import Job
+from job.utils import rebuild_task_counters
+
+
+class Command(BaseCommand):
+    """
+    Recounting the task counters of the works and jobs from their tasks,
+    for the existing data or when the counters are out of sync (e.g. after
+    tasks were changed with queryset updates)
+    """
+    help = 'Rebuild task counters of works and jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids',
+                            nargs='+',
+                            type=int,
+                            help='ids of the jobs, all jobs if not passed')
+
+    def handle(self, *args, **options):
+        jobs = Job.objects.all()
+        if options['ids']:
+            jobs = jobs.filter(pk__in=options['ids'])
+        works, jobs = rebuild_task_counters(jobs)
+        self.stdout.write(f'Task counters rebuilt for {works} work(s) and '
+                          f'{jobs} job(s)')
@@ -12,7 +12,50 @@ from finance.models import Invoice
 from finance.utils import prepare_invoice_sharing
 
 
-class Job(models.Model):
+class TaskProgress(models.Model):
+    """
+    Denormalized task counters of the works and jobs, which are kept up to
+    date with F expressions whenever a task is added, removed or its
+    completion is changed (refer job.signals), so the progress can be shown
+    and sorted without loading the tasks
+
+    * total_tasks -> number of tasks
+    * completed_tasks -> number of completed tasks
+    """
+    COUNTER_FIELDS = ('total_tasks', 'completed_tasks')
+
+    total_tasks = models.IntegerField(default=0)
+    completed_tasks = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """
+        counters are left out of the update of an existing object, since the
+        instance could be loaded before the counters were changed
+        """
+        if not self._state.adding and not args and kwargs.get(
+                'update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def refresh_task_counters(self):
+        """loading the latest counters from the db"""
+        self.refresh_from_db(fields=self.COUNTER_FIELDS)
+
+    def completed_percentage(self):
+        """returning the completed tasks percentage"""
+        if not self.total_tasks:
+            return 0
+        return int((self.completed_tasks / self.total_tasks) * 100)
+
+
+class Job(TaskProgress):
     """
     Job database object
         Which holds the information of the job that are either accepted
@@ -24,6 +67,19 @@ class Job(models.Model):
                    ('jbc', 'Job confirmed'), ('prs', 'Pre-shoot done'),
                    ('mns', 'Main-shoot done'), ('pos', 'Post-shoot done'),
                    ('jbd', 'Job Done')]
+    # job stage reached by completing the work of the work_order, and back
+    STAGES = {
+        order: choice[0]
+        for order, choice in enumerate(TASKCHOICES, start=1)
+    }
+    STAGE_NUMBERS = {stage: order for order, stage in STAGES.items()}
+    # states of building works and tasks in the background once confirmed
+    MATERIALIZING = 'mat'
+    WORKFLOW_READY = 'rdy'
+    WORKFLOW_FAILED = 'fld'
+    WORKFLOW_STATES = [(MATERIALIZING, 'Materializing'),
+                       (WORKFLOW_READY, 'Ready'),
+                       (WORKFLOW_FAILED, 'Failed')]
     job_name = models.CharField(max_length=200)
     job_request = models.TextField(null=True, blank=True)
     description = models.TextField(null=True, blank=True)
@@ -81,10 +137,24 @@ class Job(models.Model):
                                    null=True,
                                    blank=True)
     changed_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+    workflow_state = models.CharField(max_length=3,
+                                      choices=WORKFLOW_STATES,
+                                      null=True,
+                                      blank=True)
+    workflow_attempts = models.IntegerField(default=0)
+    workflow_error = models.TextField(null=True, blank=True)
+    workflow_retry_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.job_name
 
+    def workflow_ready(self):
+        """
+        checking works and tasks are available, jobs confirmed before
+        the background materialization do not have a workflow state
+        """
+        return self.workflow_state in (None, self.WORKFLOW_READY)
+
     def get_detail_task_status(self):
         """Returning detail status for db value"""
         if self.task_status is None:
@@ -125,22 +195,8 @@ class Job(models.Model):
         return quest_tasks
 
     def get_job_completion_in_numbers(self):
-        if self.task_status == 'jbr':
-            return 1
-        elif self.task_status == 'cnb':
-            return 2
-        elif self.task_status == 'jbc':
-            return 3
-        elif self.task_status == 'prs':
-            return 4
-        elif self.task_status == 'mns':
-            return 5
-        elif self.task_status == 'pos':
-            return 6
-        elif self.task_status == 'jbd':
-            return 7
-        else:
-            return None
+        """returning the work_order of the completed stage"""
+        return self.STAGE_NUMBERS.get(self.task_status)
 
     def invoiced_client(self):
         """Checking if the invoice is fully paid"""
@@ -183,7 +239,7 @@ class Appointment(models.Model):
         return self.description[:10]
 
 
-class Work(models.Model):
+class Work(TaskProgress):
     """
     Work database object
         which holds the information of the each step that is
@@ -230,33 +286,28 @@ class Work(models.Model):
         """
         returning the completed work percentage
         """
-        tasks = self.task_set.all()
-        return self.tasks_completed_percentage(tasks)
+        return self.completed_percentage()
 
     def work_completion_update(self):
         """
         if all tasks completed update work
         """
+        self.refresh_task_counters()
         if int(self.work_completed_percentage()) == 100:
             self.completed = True
             self.save()
-            if self.work_name == "Job request":
-                self.job.task_status = 'jbr'
-            elif self.work_name == 'Contract booking':
-                self.job.task_status = 'cnb'
-            elif self.work_name == "Job confirmation":
-                self.job.task_status = 'jbc'
-            elif self.work_name == "Pre shoot":
-                self.job.task_status = 'prs'
-            elif self.work_name == "Main shoot":
-                self.job.task_status = 'mns'
-            elif self.work_name == "Post shoot":
-                self.job.task_status = 'pos'
-            elif self.work_name == "Job Done":
-                self.job.task_status = 'jbd'
+            self.job.task_status = self.get_job_task_status(
+                self.job.task_status)
             self.job.save()
             return self.job
 
+    def get_job_task_status(self, default=None):
+        """
+        returning the job task_status that completing this work leads to,
+        default is returned for the works that are not part of the stages
+        """
+        return Job.STAGES.get(self.work_order, default)
+
     @staticmethod
     def tasks_completed_percentage(tasks):
         """
@@ -286,6 +337,10 @@ class Task(models.Model):
     SEND_USER = [('no', 'Pending'), ('su', 'Sent To User'),
                  ('uc', 'User Completed')]
 
+    # fields that can be changed by processing the task
+    PROCESSED_FIELDS = ('completed', 'user_completed', 'job_contract',
+                        'job_quest', 'changed_by', 'changed_at')
+
     task_name = models.CharField(max_length=200)
     task_order = models.IntegerField()
     work = models.ForeignKey('Work', on_delete=models.CASCADE)
@@ -360,29 +415,42 @@ class Task(models.Model):
     def send_email(self):
         """sending email with the template"""
         ec = EmailClient(self)
-        ec.send_email()
+        ec.send_email(key=ec.task_email_key('email'))
 
     def checking_current_work_process(self):
         """gettin current working process stage"""
         return self.work.job.get_job_completion_in_numbers()
 
-    def register_appointment(self, method):
-        """registering appointment"""
+    def build_appointment(self):
+        """
+        building the appointment object for the task without saving it,
+        so it can be saved individually or in bulk
+        """
         job = self.get_job()
         job_date = job.start_date if job.start_date else None
         job_end_day = job.end_date if job.end_date else None
         job_start_time = job.start_time if job.start_time else None
         job_end_time = job.end_time if job.end_time else None
-        if method == 'creating':
-            app = Appointment.objects.create(start_date=job_date,
-                                             end_date=job_end_day,
-                                             start_time=job_start_time,
-                                             end_time=job_end_time,
-                                             description=f"""
+        return Appointment(start_date=job_date,
+                           end_date=job_end_day,
+                           start_time=job_start_time,
+                           end_time=job_end_time,
+                           description=f"""
                     Making an appointment
                     {job_date} - from {job_start_time} to {job_end_time}
                     {self.description}
                 """)
+
+    def register_appointment(self, method):
+        """registering appointment"""
+        job = self.get_job()
+        job_date = job.start_date if job.start_date else None
+        job_end_day = job.end_date if job.end_date else None
+        job_start_time = job.start_time if job.start_time else None
+        job_end_time = job.end_time if job.end_time else None
+        if method == 'creating':
+            app = self.build_appointment()
+            app.save()
         else:
             app = self.appointment
             app.start_date = job_date
@@ -426,13 +494,16 @@ class Task(models.Model):
             return True
 
     def send_contract_and_invoice(self):
-        """sending contract and invoice"""
+        """
+        sending contract and invoice, returns the changed fields which are
+        saved by the task transition (refer job.transitions)
+        """
         if self.job_package_added():
             content = prepare_invoice_sharing(self.get_job())
             # preparing email to send
             ec = EmailClient(self)
             ec.add_content(content)
-            ec.send_email()
+            ec.send_email(key=ec.task_email_key('contract'))
             # adding contract job
             try:
                 jobContract = JobContract.objects.get(job=self.get_job())
@@ -446,17 +517,16 @@ class Task(models.Model):
                     status='no',
                 )
             self.job_contract = jobContract
-            self.user_completed = 'su'
-            self.save()
+            return ['job_contract']
         else:
             raise Exception(
                 'Please select the package before generating invoice')
 
     def send_questionnaire(self):
-        """sending questionnaire to fill"""
+        """sending questionnaire to fill, returns the changed fields"""
         if self.email_template:
             ec = EmailClient(self)
-            ec.send_email()
+            ec.send_email(key=ec.task_email_key('questionnaire'))
         # adding questionnaire job
         try:
             jobQuest = JobQuestionnaire.objects.get(job=self.get_job())
@@ -466,76 +536,30 @@ class Task(models.Model):
             jobQuest = JobQuestionnaire.objects.create(
                 quest_temp=self.quest_template, job=self.get_job())
         self.job_quest = jobQuest
-        self.user_completed = 'su'
-        self.save()
+        return ['job_quest']
 
     def send_appointment_email(self):
         """sending email with the appointment"""
         if not self.appointment:
-            raise Excpetion('Please add job event detail correctly')
+            raise Exception('Please add job event detail correctly')
         ec = EmailClient(self)
-        ec.book_appointment(self.appointment)
-        self.completed = True
-        self.save()
+        ec.book_appointment(self.appointment,
+                            key=ec.task_email_key('appointment'))
+        return []
 
     def process_task(self, user, send_email=True):
-        """processing task based on the task type"""
-        j_status = self.checking_current_work_process()
         """
-        Checking if the preceeding tasks were completed before
-        continuing with the next steps
+        processing task based on the task type, refer job.transitions for
+        the steps of each task type
         """
-        print(j_status, self.work.work_order)
-        # if it is the first step then making sure first step only can be completed
-        if j_status is None:
-            if self.work.work_order > 1:
-                raise Exception(
-                    'Cannot process before completing previous tasks')
-        # if it is next steps, then making sure that completed task and
-        # currently trying to complete current task are next to each other
-        else:
-            if self.work.work_order - j_status > 1:
-                raise Exception(
-                    'Cannot process before completing previous tasks')
-
-        # checking invoice should be completed
-        if self.check_invoice:
-            if not self.get_job().invoiced_client():
-                raise Exception('Invoice is not paid or updated completely')
-
-        if self.completed == True:
-            raise Exception("Task is already completed")
-
-        # checking user responds needed task
-        if not self.user_task:
-            if self.task_type == 'em' and send_email:
-                self.send_email()
-            self.completed = True
-            self.save()
-        elif self.user_task:
-            # contract task and user did not completed yet
-            if self.task_type == 'cn' and self.user_completed == 'no':
-                self.send_contract_and_invoice()
-            # questionnaire task and user did not completed yet
-            elif self.task_type == 'qn' and self.user_completed == 'no':
-                self.send_questionnaire()
-            # appointment task and user did not completed yet
-            elif self.task_type == 'ap' and self.user_completed == 'no':
-                self.user_completed = 'su'
-                self.save()
-            # appointment task and user completed
-            elif self.task_type == 'ap' and self.user_completed == 'uc':
-                self.send_appointment_email()
-            # all the other tasks user completed
-            elif self.user_completed == 'uc':
-                self.completed = True
-                self.save()
-            else:
-                raise Exception('this cannot be...')
-        else:
-            raise Exception('cannot be processed')
-
-        self.work.work_completion_update()
+        from job.transitions import process_task
+        task = process_task(self.pk, user, send_email=send_email)
+        # keeping this instance in sync with the processed one
+        for field in task.PROCESSED_FIELDS:
+            setattr(self, field, getattr(task, field))
+        self._counted_completed = task._counted_completed
+        self.work = task.work
+        return self
 
 
 class JobContract(models.Model):
@@ -0,0 +1,108 @@
+"""
+Signals of the job app, which keep the job side caches in sync with the
+changes of the settings that they are built from, and the task counters of
+the works and jobs in sync with their tasks.
+"""
+from django.db.models.signals import (post_init, post_save, pre_delete,
+                                      post_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from settings.models import (ContractTemplate, EmailTemplate,
+                             QuestionnaireTemplate, TemplateField, Workflow,
+                             WorkTemplate, WorkType)
+
+from job.models import Task
+from job.utils import update_task_counters
+from job.workflow_factory.plans import invalidate_workflow_plans
+from tripod.tasks_lib.compiled_templates import invalidate_compiled_templates
+
+TEMPLATE_MODELS = (EmailTemplate, ContractTemplate, QuestionnaireTemplate)
+
+
+@receiver([post_save, post_delete], sender=Workflow)
+def workflow_changed(sender, instance, **kwargs):
+    """dropping the compiled plan of the changed workflow"""
+    invalidate_workflow_plans(instance.id)
+
+
+@receiver([post_save, post_delete], sender=WorkTemplate)
+def work_template_changed(sender, instance, **kwargs):
+    """
+    dropping the compiled plan of the workflow and bumping the workflow
+    version, so the plans compiled by the other processes are replaced too
+    """
+    Workflow.objects.filter(pk=instance.workflow_id).update(
+        changed_at=timezone.now())
+    invalidate_workflow_plans(instance.workflow_id)
+
+
+@receiver([post_save, post_delete], sender=WorkType)
+def work_type_changed(sender, instance, **kwargs):
+    """work types are shared by all workflows, so all plans are dropped"""
+    Workflow.objects.update(changed_at=timezone.now())
+    invalidate_workflow_plans()
+
+
+@receiver([post_save, post_delete], sender=EmailTemplate)
+@receiver([post_save, post_delete], sender=ContractTemplate)
+@receiver([post_save, post_delete], sender=QuestionnaireTemplate)
+def template_changed(sender, instance, **kwargs):
+    """dropping the compiled template of the changed template"""
+    invalidate_compiled_templates(sender, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=TemplateField)
+def template_field_changed(sender, instance, **kwargs):
+    """
+    template fields are shared by all templates, so all compiled templates
+    are dropped and the template versions are bumped for the other processes
+    """
+    for model in TEMPLATE_MODELS:
+        model.objects.update(changed_at=timezone.now())
+    invalidate_compiled_templates()
+
+
+@receiver(post_init, sender=Task)
+def task_loaded(sender, instance, **kwargs):
+    """
+    remembering the completion that is counted for the task, nothing is
+    remembered if the completion is deferred (e.g. loaded with only())
+    """
+    if 'completed' in instance.get_deferred_fields():
+        instance._counted_completed = None
+    else:
+        instance._counted_completed = bool(instance.completed)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """
+    counting the added task or the change of its completion, counters are
+    left alone if the counted completion is not known
+    """
+    completed = bool(instance.completed)
+    if created:
+        update_task_counters(instance.work_id,
+                             total=1,
+                             completed=int(completed))
+    elif instance._counted_completed is not None and (
+            completed != instance._counted_completed):
+        update_task_counters(instance.work_id,
+                             completed=1 if completed else -1)
+    instance._counted_completed = completed
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleting(sender, instance, **kwargs):
+    """loading the deferred completion before the task is deleted"""
+    if instance._counted_completed is None:
+        instance._counted_completed = bool(instance.completed)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    """removing the deleted task from the counters"""
+    update_task_counters(instance.work_id,
+                         total=-1,
+                         completed=-int(instance._counted_completed))
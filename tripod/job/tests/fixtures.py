@@ -8,7 +8,8 @@ from company.forms import (EventForm, PackageForm, ProductForm,
                            PackageLinkProductAddForm)
 from settings.forms import (WorkflowForm, EmailTemplateForm, SourceForm,
                             WorkTemplateForm, WorkTypeForm,
-                            ContractTemplateForm, QuestionnaireTemplateForm)
+                            ContractTemplateForm, QuestionnaireTemplateForm,
+                            TemplateFieldForm)
 
 
 class JobFixtureSetup:
@@ -495,6 +496,34 @@ class EmailTemplateFixtureSetup:
         return self.data, self.template_objs
 
 
+class TemplateFieldFixtureSetup:
+
+    def __init__(self):
+        self.data = {}
+        self.template_field_objs = []
+
+    def get_data(self):
+        self.data['company'] = {
+            'field': 'company',
+            'object_field': 'company.name',
+            'description': 'name of the company'
+        }
+        self.data['customer'] = {
+            'field': 'customer',
+            'object_field': 'user.first_name',
+            'description': 'first name of the client'
+        }
+        return None
+
+    def create_and_get_objs(self):
+        self.get_data()
+        for key in self.data:
+            templateFieldForm = TemplateFieldForm(data=self.data[key])
+            template_field_obj = templateFieldForm.save()
+            self.template_field_objs.append(template_field_obj)
+        return self.data, self.template_field_objs
+
+
 class ContractTemplateFixtureSetup:
 
     def __init__(self, user):
@@ -5,23 +5,37 @@ creation once the job is initiated
 from datetime import date
 import random
 from decimal import Decimal
+from unittest import skipIf
 
-from django.test import TestCase
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 
-from job.models import Work, Task, Job
+from job.models import Work, Task, Job, Appointment
 from job.forms import JobUpdateConfirmForm
 from job.tests.fixtures import (
     JobFixtureSetup, EventFixtureSetup, ProductFixtureSetup,
     PackageFixtureSetup, WorkflowFixtureSetup, WorkTemplateFixturesSetup,
     EmailTemplateFixtureSetup, SourceFixtureSetup, WorkTypeFixtureSetup,
-    QuestionnaireTemplateFixtureSetup, ContractTemplateFixtureSetup)
+    QuestionnaireTemplateFixtureSetup, ContractTemplateFixtureSetup,
+    TemplateFieldFixtureSetup)
 from job.workflow_factory.workflow import WorkFlowBase
+from job.workflow_factory.plans import get_workflow_plan
+from job.workflow_factory.materialization import (materialize_jobs,
+                                                  materialize_pending_jobs,
+                                                  MAX_ATTEMPTS)
+from job.batch import CONFIRM, DECLINE, batch_update_jobs
+from job.utils import rebuild_task_counters
 
 from company.models import PackageLinkProduct
 
+from settings.models import WorkTemplate
+
 from finance.forms import PaymentHistoryForm, InvoiceUpdateForm
-from finance.utils import register_invoice_data_for_job
+from finance.utils import (register_invoice_data_for_job,
+                           set_invoice_data_for_job)
 
 
 class JobTest(TestCase):
@@ -50,6 +64,11 @@ class JobTest(TestCase):
         (self.emailTemp_data,
          self.emailTemp_objs) = self.emailTempFixture.create_and_get_objs()
 
+        # template fields of the contract template
+        self.templateFieldFixture = TemplateFieldFixtureSetup()
+        (self.templateField_data, self.templateField_objs
+         ) = self.templateFieldFixture.create_and_get_objs()
+
         # Contract template
         self.contractTempFixture = ContractTemplateFixtureSetup(self.user)
         (self.contTemp_data,
@@ -351,3 +370,435 @@ class JobTest(TestCase):
 
         self.assertEqual(Decimal(invoice_price - 1000),
                          job.invoice.to_be_paid())
+
+    def bulk_confirming_job(self, job, package=True):
+        """confirming the job using the bulk workflow creation"""
+        job.primary_client = self.client
+        job.package = self.package_objs[0] if package else None
+        job.status = 'job'
+        set_invoice_data_for_job(job, package=package)
+        wfb = WorkFlowBase(self.user, job)
+        wfb.bulk_create_work_and_tasks()
+
+        return job
+
+    def get_job_structure(self, job):
+        """returning works and tasks of the job without db specific values"""
+        works = Work.objects.filter(job=job).order_by('id')
+        structure = []
+        for work in works:
+            tasks = [(task.task_name, task.task_order, task.description,
+                      task.completed, task.task_type, task.check_invoice,
+                      task.email_template_id, task.contract_template_id,
+                      task.quest_template_id, task.user_task,
+                      task.user_completed) for task in work.task_set.all()]
+            structure.append(
+                (work.work_name, work.work_order, work.completed, tasks))
+        return structure
+
+    def test_bulk_confirming_job_creates_same_works_and_tasks(self):
+        """
+        bulk workflow creation should end up with exactly the same works
+        and tasks as the one by one creation
+        """
+        job = self.wedding_job_confirm()
+        bulk_job = Job.objects.create(job_name='Wedding bulk',
+                                      primary_client=self.client,
+                                      workflow=self.workflow_objs[0],
+                                      status='req')
+        bulk_job = self.bulk_confirming_job(bulk_job)
+
+        self.assertEqual(self.get_job_structure(job),
+                         self.get_job_structure(bulk_job))
+        self.assertEqual(
+            Job.objects.get(pk=job.id).task_status,
+            Job.objects.get(pk=bulk_job.id).task_status)
+
+    def test_bulk_confirming_job_creates_appointments(self):
+        """appointments should be registered for appointment tasks"""
+        wedding_job = Job.objects.filter(job_name="Wedding").last()
+        appointments = Appointment.objects.count()
+        self.bulk_confirming_job(wedding_job)
+        app_tasks = Task.objects.filter(work__job=wedding_job,
+                                        task_type='ap')
+
+        self.assertEqual(Appointment.objects.count(),
+                         appointments + len(app_tasks))
+
+    def test_bulk_confirming_job_saves_job_and_invoice(self):
+        """job and its invoice should be saved with the bulk creation"""
+        wedding_job = Job.objects.filter(job_name="Wedding").last()
+        job = self.bulk_confirming_job(wedding_job)
+        package_amount = self.get_package_amount_for_job(job)
+        job = Job.objects.get(pk=job.id)
+
+        self.assertEqual(job.status, 'job')
+        self.assertEqual(job.invoice.price, package_amount)
+
+    def test_bulk_confirming_job_with_invalid_template_creates_nothing(self):
+        """an invalid work template should not leave works half created"""
+        wedding_job = Job.objects.filter(job_name="Wedding").last()
+        work_template = WorkTemplate.objects.get(pk=self.workTemp_objs[-1].id)
+        work_template.class_object = 'UnknownTask'
+        work_template.save()
+
+        with self.assertRaises(Exception):
+            self.bulk_confirming_job(wedding_job)
+        self.assertEqual(Work.objects.filter(job=wedding_job).count(), 0)
+
+    def test_workflow_plan_has_works_for_all_work_types(self):
+        """plan should have a work for each work type, in work order"""
+        plan = get_workflow_plan(self.workflow_objs[0])
+        work_orders = [work.work_order for work in plan.works]
+
+        self.assertEqual(work_orders, sorted(work_orders))
+        self.assertEqual(len(plan.works), len(self.workType_objs))
+        self.assertEqual(sum([len(work.tasks) for work in plan.works]), 6)
+
+    def test_workflow_plan_is_immutable(self):
+        """plan objects should not be changed once compiled"""
+        plan = get_workflow_plan(self.workflow_objs[0])
+
+        with self.assertRaises(AttributeError):
+            plan.works[0].tasks[0].name = 'changed'
+
+    def test_workflow_plan_updated_after_work_template_changed(self):
+        """saving work template should drop the compiled plan"""
+        get_workflow_plan(self.workflow_objs[0])
+        work_template = WorkTemplate.objects.get(pk=self.workTemp_objs[0].id)
+        work_template.name = 'Job request received'
+        work_template.save()
+        plan = get_workflow_plan(self.workflow_objs[0])
+
+        self.assertEqual(plan.works[0].tasks[0].name, 'Job request received')
+
+    def test_confirming_job_with_compiled_plan_queries_no_settings(self):
+        """once the plan is compiled, settings tables should not be queried"""
+        self.bulk_confirming_job(Job.objects.filter(job_name="Wedding").last())
+        job = Job.objects.create(job_name='Wedding again',
+                                 primary_client=self.client,
+                                 workflow=self.workflow_objs[0],
+                                 status='req')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.bulk_confirming_job(job)
+        settings_queries = [
+            query['sql'] for query in ctx.captured_queries
+            if '"settings_' in query['sql']
+        ]
+
+        self.assertEqual(settings_queries, [])
+        self.assertEqual(Work.objects.filter(job=job).count(), 7)
+
+    def form_confirming_job(self):
+        """confirming the wedding job using JobUpdateConfirmForm"""
+        wedding_job = Job.objects.filter(job_name="Wedding").last()
+        form = JobUpdateConfirmForm(data={
+            'job_name': wedding_job.job_name,
+            'primary_client': self.client.id,
+            'workflow': self.workflow_objs[0].id,
+            'package': self.package_objs[0].id,
+        },
+                                    instance=wedding_job,
+                                    userObj=self.user,
+                                    operation='confirming Job')
+        self.assertTrue(form.is_valid())
+        return form.save()
+
+    def test_confirming_job_queues_materialization(self):
+        """confirmed job should wait for the worker to build works"""
+        job = self.form_confirming_job()
+        job = Job.objects.get(pk=job.id)
+
+        self.assertEqual(job.status, 'job')
+        self.assertEqual(job.workflow_state, Job.MATERIALIZING)
+        self.assertFalse(job.workflow_ready())
+        self.assertEqual(Work.objects.filter(job=job).count(), 0)
+
+    def test_materializing_confirmed_job(self):
+        """worker should build works, tasks and invoice of the job"""
+        job = self.form_confirming_job()
+        materialized = materialize_pending_jobs()
+        job = Job.objects.get(pk=job.id)
+
+        self.assertEqual(materialized, 1)
+        self.assertEqual(job.workflow_state, Job.WORKFLOW_READY)
+        self.assertEqual(Work.objects.filter(job=job).count(), 7)
+        self.assertEqual(Task.objects.filter(work__job=job).count(), 6)
+        self.assertEqual(job.invoice.price, job.package.price)
+
+    def test_failed_materialization_is_retried_without_leftovers(self):
+        """failed materialization should be retried and leave nothing"""
+        work_template = WorkTemplate.objects.get(pk=self.workTemp_objs[-1].id)
+        work_template.class_object = 'UnknownTask'
+        work_template.save()
+        job = self.form_confirming_job()
+        materialized = materialize_pending_jobs()
+        job = Job.objects.get(pk=job.id)
+
+        self.assertEqual(materialized, 0)
+        self.assertEqual(job.workflow_state, Job.MATERIALIZING)
+        self.assertEqual(job.workflow_attempts, 1)
+        self.assertIsNotNone(job.workflow_retry_at)
+        self.assertIsNone(job.invoice)
+        self.assertEqual(Work.objects.filter(job=job).count(), 0)
+
+    def test_materialization_failed_after_max_attempts(self):
+        """job should be marked as failed once all attempts are used"""
+        work_template = WorkTemplate.objects.get(pk=self.workTemp_objs[-1].id)
+        work_template.class_object = 'UnknownTask'
+        work_template.save()
+        job = self.form_confirming_job()
+        for attempt in range(MAX_ATTEMPTS):
+            Job.objects.filter(pk=job.id).update(workflow_retry_at=None)
+            materialize_pending_jobs()
+        job = Job.objects.get(pk=job.id)
+
+        self.assertEqual(job.workflow_state, Job.WORKFLOW_FAILED)
+        self.assertEqual(job.workflow_attempts, MAX_ATTEMPTS)
+
+    def test_batch_confirming_jobs_queues_materialization(self):
+        """batch confirmed jobs should wait for the worker to build works"""
+        job_ids = [job.id for job in self.job_objs]
+        report = batch_update_jobs(job_ids, CONFIRM, user=self.user)
+        jobs = Job.objects.filter(pk__in=job_ids)
+
+        self.assertEqual(len(report.succeeded()), len(job_ids))
+        self.assertTrue(all(job.status == 'job' for job in jobs))
+        self.assertTrue(
+            all(job.workflow_state == Job.MATERIALIZING for job in jobs))
+        self.assertEqual(Work.objects.filter(job__in=jobs).count(), 0)
+
+    def test_batch_confirming_jobs_with_materialization(self):
+        """works and tasks should be created when materialize is passed"""
+        wedding_job = Job.objects.filter(job_name="Wedding").last()
+        report = batch_update_jobs([wedding_job.id],
+                                   CONFIRM,
+                                   user=self.user,
+                                   materialize=True)
+        job = Job.objects.get(pk=wedding_job.id)
+
+        self.assertEqual(len(report.succeeded()), 1)
+        self.assertEqual(job.workflow_state, Job.WORKFLOW_READY)
+        self.assertEqual(Work.objects.filter(job=job).count(), 7)
+
+    def test_batch_declining_jobs(self):
+        """batch declined jobs should be declined without works"""
+        job_ids = [job.id for job in self.job_objs]
+        report = batch_update_jobs(job_ids, DECLINE, user=self.user)
+
+        self.assertEqual(len(report.succeeded()), len(job_ids))
+        self.assertEqual(
+            Job.objects.filter(pk__in=job_ids, status='dec').count(),
+            len(job_ids))
+
+    def test_batch_reports_unavailable_jobs(self):
+        """jobs that are missing or without workflow should be failed"""
+        wedding_job = Job.objects.filter(job_name="Wedding").last()
+        Job.objects.filter(pk=wedding_job.id).update(workflow=None)
+        report = batch_update_jobs([wedding_job.id, 0], CONFIRM)
+
+        self.assertEqual(len(report.failed()), 2)
+        self.assertEqual(Job.objects.get(pk=wedding_job.id).status,
+                         wedding_job.status)
+
+    def test_batch_view_rejects_invalid_job_ids(self):
+        """job ids that are not numbers should not be processed"""
+        self.user.is_superuser = True
+        self.user.save()
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(reverse('job:batchJobAction'), {
+            'jobs': ['abc', '1;2'],
+            'action': CONFIRM
+        })
+
+        self.assertRedirects(response,
+                             reverse('job:jobReqManagementPage'),
+                             fetch_redirect_response=False)
+        self.assertFalse(Job.objects.filter(status='job').exists())
+
+    def assert_task_counters(self, job):
+        """counters of the job and its works should match the tasks"""
+        job = Job.objects.get(pk=job.id)
+        tasks = Task.objects.filter(work__job=job)
+        self.assertEqual(job.total_tasks, tasks.count())
+        self.assertEqual(job.completed_tasks,
+                         tasks.filter(completed=True).count())
+        for work in job.work_set.all():
+            self.assertEqual(work.total_tasks, work.task_set.count())
+            self.assertEqual(work.completed_tasks,
+                             work.task_set.filter(completed=True).count())
+
+    def test_task_counters_after_confirming_job(self):
+        """task counters should be counted by both workflow creations"""
+        job = self.wedding_job_confirm()
+        bulk_job = Job.objects.create(job_name='Wedding bulk',
+                                      primary_client=self.client,
+                                      workflow=self.workflow_objs[0],
+                                      status='req')
+        bulk_job = self.bulk_confirming_job(bulk_job)
+
+        self.assert_task_counters(job)
+        self.assert_task_counters(bulk_job)
+        self.assertEqual(
+            Job.objects.get(pk=job.id).completed_percentage(),
+            Job.objects.get(pk=bulk_job.id).completed_percentage())
+
+    def test_task_counters_after_completing_and_deleting_task(self):
+        """task counters should follow the completion and deletion"""
+        job = self.wedding_job_confirm()
+        task = Task.objects.filter(work__job=job,
+                                   completed=False).first()
+        task.completed = True
+        task.save()
+        self.assert_task_counters(job)
+
+        # stale job instance should not overwrite the counters
+        job.note = 'abcd'
+        job.save()
+        self.assert_task_counters(job)
+
+        task.delete()
+        self.assert_task_counters(job)
+
+    def test_task_counters_with_deferred_completion(self):
+        """tasks loaded without their completion should not be counted"""
+        job = self.wedding_job_confirm()
+        task = Task.objects.filter(work__job=job, completed=True).first()
+        deferred = Task.objects.only('id', 'work', 'task_name').get(
+            pk=task.id)
+        deferred.task_name = 'Renamed'
+        deferred.save()
+        self.assert_task_counters(job)
+
+        Task.objects.defer('completed').get(pk=task.id).delete()
+        self.assert_task_counters(job)
+
+    def test_work_percentage_needs_no_queries(self):
+        """work progress should be rendered from the counters"""
+        job = self.wedding_job_confirm()
+        works = list(Work.objects.filter(job=job))
+        with CaptureQueriesContext(connection) as queries:
+            [work.work_completed_percentage() for work in works]
+
+        self.assertEqual(len(queries), 0)
+
+    def test_rebuilding_task_counters(self):
+        """rebuild should fix the counters that are out of sync"""
+        job = self.wedding_job_confirm()
+        Task.objects.filter(work__job=job).update(completed=True)
+        Work.objects.filter(job=job).update(total_tasks=0)
+        rebuild_task_counters()
+
+        self.assert_task_counters(job)
+        self.assertEqual(Job.objects.get(pk=job.id).completed_percentage(),
+                         100)
+
+    def test_processing_task_completes_work_and_job_stage(self):
+        """completing the last task of the work should move the job stage"""
+        job = self.wedding_job_confirm()
+        jr_work = job.work_set.get(work_order=1)
+        task = jr_work.task_set.filter(completed=False).first()
+        with CaptureQueriesContext(connection) as queries:
+            task.process_task(self.user, send_email=False)
+        job = Job.objects.get(pk=job.id)
+        jr_work = Work.objects.get(pk=jr_work.id)
+
+        self.assertTrue(task.completed)
+        self.assertTrue(jr_work.completed)
+        self.assertEqual(job.task_status, Job.STAGES[1])
+        self.assertEqual(job.completed_tasks,
+                         Task.objects.filter(work__job=job,
+                                             completed=True).count())
+        # select, task update, two counter updates, work and job updates
+        statements = [
+            query for query in queries.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))
+        ]
+        self.assertLessEqual(len(statements), 6)
+
+    def test_process_task_view_selects_task_once(self):
+        """task should be fetched only by the locked select of process_task"""
+        job = self.wedding_job_confirm()
+        task = job.work_set.get(work_order=1).task_set.filter(
+            completed=False).first()
+        self.user.is_staff = True
+        self.user.save()
+        client = Client()
+        client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                reverse('job:processEmailTaskWithoutSending', args=[task.id]))
+        self.assertRedirects(response,
+                             reverse('job:jobPage', args=[job.id]),
+                             fetch_redirect_response=False)
+        self.assertTrue(Task.objects.get(pk=task.id).completed)
+        task_selects = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and
+            'FROM "job_task"' in query['sql']
+        ]
+        self.assertEqual(len(task_selects), 1)
+
+    def test_processing_task_of_later_work_is_rejected(self):
+        """task cannot be processed before the previous works"""
+        job = self.wedding_job_confirm()
+        task = Task.objects.filter(work__job=job,
+                                   work__work_order=2).first()
+
+        with self.assertRaises(Exception):
+            task.process_task(self.user, send_email=False)
+        self.assertFalse(Task.objects.get(pk=task.id).completed)
+
+    def test_task_transitions_of_user_tasks(self):
+        """user tasks should be sent first and completed by the user"""
+        job = self.wedding_job_confirm()
+        task = Task.objects.filter(work__job=job, work__work_order=1).first()
+        Job.objects.filter(pk=job.id).update(task_status=Job.STAGES[3])
+        Task.objects.filter(pk=task.id).update(user_task=True,
+                                                task_type=Task.APPOINTMENT,
+                                                user_completed='no',
+                                                completed=False)
+        task = Task.objects.get(pk=task.id)
+        task.process_task(self.user)
+        self.assertEqual(task.user_completed, 'su')
+        self.assertFalse(task.completed)
+
+        # user has not completed yet
+        with self.assertRaises(Exception):
+            task.process_task(self.user)
+
+
+@skipIf(connection.vendor == 'sqlite' and connection.is_in_memory_db(),
+        'spawned processes cannot share an in-memory database')
+class MaterializationPoolTest(TransactionTestCase):
+    """materialization of the jobs on a pool of spawned processes"""
+    setUp = JobTest.setUp
+
+    def test_batch_confirming_jobs_on_process_pool(self):
+        """works and tasks should be created by the pool processes"""
+        job_ids = [job.id for job in self.job_objs if job.workflow_id]
+        report = batch_update_jobs(job_ids,
+                                   CONFIRM,
+                                   user=self.user,
+                                   processes=2,
+                                   materialize=True)
+        self.assertGreater(len(job_ids), 1)
+        self.assertTrue(report.succeeded())
+        # sqlite refuses concurrent writers, such jobs are retried as the
+        # worker does
+        pending = [result.job_id for result in report.failed()]
+        for _ in job_ids:
+            pending = [
+                job_id for job_id, success, message in materialize_jobs(
+                    pending, processes=2) if not success
+            ]
+        jobs = Job.objects.filter(pk__in=job_ids)
+
+        self.assertEqual(pending, [])
+        self.assertTrue(
+            all(job.workflow_state == Job.WORKFLOW_READY for job in jobs))
+        self.assertTrue(
+            all(Work.objects.filter(job=job).exists() for job in jobs))
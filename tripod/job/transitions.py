@@ -0,0 +1,133 @@
+"""
+Representation of the task lifecycle as a table of transitions. Processing
+a task looks up its transition by (user_task, task_type, user_completed),
+runs the action of the transition and writes only the changed columns.
+
+Task, work and job are loaded in a single locked query, so concurrent
+clicks on the same task are processed one after the other and the second
+one sees the task as processed already.
+"""
+from django.db import transaction
+
+from job.models import Task
+
+# matches any task type or user_completed value
+ANY = None
+
+
+class Transition:
+    """
+    Step of the task lifecycle
+
+    * action -> name of the Task method that is called, it returns the
+    changed fields; None if nothing is needed
+    * user_completed -> new user_completed value; None to keep it
+    * completes -> True if the task is completed with the step
+    """
+    __slots__ = ('action', 'user_completed', 'completes')
+
+    def __init__(self, action=None, user_completed=None, completes=False):
+        self.action = action
+        self.user_completed = user_completed
+        self.completes = completes
+
+
+# (user_task, task_type, user_completed): Transition
+TRANSITIONS = {
+    (False, Task.EMAIL, ANY): Transition('send_email', completes=True),
+    (False, ANY, ANY): Transition(completes=True),
+    (True, Task.CONTRACT, 'no'): Transition('send_contract_and_invoice',
+                                            user_completed='su'),
+    (True, Task.QUESTIONNAIRE, 'no'): Transition('send_questionnaire',
+                                                 user_completed='su'),
+    (True, Task.APPOINTMENT, 'no'): Transition(user_completed='su'),
+    (True, Task.APPOINTMENT, 'uc'): Transition('send_appointment_email',
+                                               completes=True),
+    (True, ANY, 'uc'): Transition(completes=True),
+}
+
+
+def get_transition(task):
+    """returning the transition of the task, the most specific one first"""
+    user_task = bool(task.user_task)
+    for key in ((user_task, task.task_type, task.user_completed),
+                (user_task, task.task_type, ANY),
+                (user_task, ANY, task.user_completed),
+                (user_task, ANY, ANY)):
+        if key in TRANSITIONS:
+            return TRANSITIONS[key]
+    raise Exception('this cannot be...')
+
+
+def validate_transition(task, work, job):
+    """
+    checking the task can be processed, preceding works should be
+    completed before continuing with the next steps
+    """
+    stage = job.get_job_completion_in_numbers()
+    # if it is the first step then making sure first step only can be completed
+    if stage is None:
+        if work.work_order > 1:
+            raise Exception('Cannot process before completing previous tasks')
+    # completed stage and the work of the task should be next to each other
+    elif work.work_order - stage > 1:
+        raise Exception('Cannot process before completing previous tasks')
+
+    # checking invoice should be completed
+    if task.check_invoice and not job.invoiced_client():
+        raise Exception('Invoice is not paid or updated completely')
+
+    if task.completed:
+        raise Exception("Task is already completed")
+
+
+def complete_work(work, job):
+    """
+    completing the work once all of its tasks are completed, and moving the
+    job to the stage of the work. counters of the work are already updated
+    in the db by the task signals, so only the loaded copy is updated here
+    """
+    work.completed_tasks += 1
+    if work.completed_tasks < work.total_tasks:
+        return
+    if not work.completed:
+        work.completed = True
+        work.save(update_fields=['completed', 'changed_at'])
+
+    stage = work.get_job_task_status()
+    current = job.get_job_completion_in_numbers() or 0
+    if stage is not None and work.work_order > current:
+        job.task_status = stage
+        job.save(update_fields=['task_status', 'changed_at'])
+
+
+def process_task(task_id, user, send_email=True):
+    """
+    processing the task with its transition and returning the task, the
+    email of the email task is skipped if send_email is False
+    """
+    with transaction.atomic():
+        task = Task.objects.select_related('work__job').select_for_update(
+        ).get(pk=task_id)
+        work = task.work
+        job = work.job
+        validate_transition(task, work, job)
+
+        transition = get_transition(task)
+        fields = ['changed_by', 'changed_at']
+        if transition.action == 'send_email' and not send_email:
+            pass
+        elif transition.action is not None:
+            fields += getattr(task, transition.action)() or []
+        if transition.user_completed is not None:
+            task.user_completed = transition.user_completed
+            fields.append('user_completed')
+        if transition.completes:
+            task.completed = True
+            fields.append('completed')
+        task.changed_by = user
+        task.save(update_fields=fields)
+
+        if transition.completes:
+            complete_work(work, job)
+    return task
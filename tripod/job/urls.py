@@ -16,6 +16,9 @@ urlpatterns = [
     path('jobReqManagement/reqToJob/<int:pk>/',
          views.jobChangeReqToJob,
          name='jobChangeReqToJobPage'),
+    path('jobReqManagement/batch/',
+         views.batchJobAction,
+         name='batchJobAction'),
     path('jobReqManagement/deleteJob/<int:pk>/',
          views.deleteJob,
          name='delRequestJob'),
@@ -29,6 +32,9 @@ urlpatterns = [
     path('jobManagement/jobUpdate/<int:pk>/',
          views.jobUpdateJob,
          name='jobUpdateJob'),
+    path('jobManagement/job/<int:pk>/retryMaterialization',
+         views.retryMaterialization,
+         name='retryMaterialization'),
     path('jobManagement/taskProcess/<int:pk>',
          views.processTask,
          name='processTask'),
@@ -1,4 +1,8 @@
-from job.models import Work
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from job.models import Job, Work, Task
 
 
 def get_job_tasks(job):
@@ -13,12 +17,66 @@ def get_job_tasks(job):
 
 
 def update_work_completion_for_job(job):
-    works = job.work_set.all()
+    """
+    completing the works that all the tasks are completed, and updating
+    the job task_status, using the task counters of the works
+    """
+    works = job.work_set.filter(total_tasks__gt=0,
+                                completed_tasks=F('total_tasks')).order_by('id')
     for work in works:
-        work.work_completion_update()
+        job.task_status = work.get_job_task_status(job.task_status)
+    works.filter(Q(completed=False) | Q(completed__isnull=True)).update(
+        completed=True)
     job.save()
 
 
+def update_task_counters(work_id, total=0, completed=0):
+    """
+    changing the task counters of the work and its job by the given
+    amounts, with F expressions so concurrent changes are not lost
+    """
+    counters = {}
+    if total:
+        counters['total_tasks'] = F('total_tasks') + total
+    if completed:
+        counters['completed_tasks'] = F('completed_tasks') + completed
+    if not counters:
+        return
+    with transaction.atomic():
+        Work.objects.filter(pk=work_id).update(**counters)
+        Job.objects.filter(work__id=work_id).update(**counters)
+
+
+def count_tasks(lookup, completed=False):
+    """subquery of the number of (completed) tasks for the lookup"""
+    tasks = Task.objects.filter(**lookup)
+    if completed:
+        tasks = tasks.filter(completed=True)
+    return Coalesce(
+        Subquery(
+            tasks.order_by().values(*lookup.keys()).annotate(
+                count=Count('pk')).values('count')), 0)
+
+
+def rebuild_task_counters(jobs=None):
+    """
+    recounting the task counters of the works and jobs from the tasks,
+    returns (number of works, number of jobs) updated
+    """
+    if jobs is None:
+        jobs = Job.objects.all()
+    with transaction.atomic():
+        works = Work.objects.filter(job__in=jobs).update(
+            total_tasks=count_tasks({'work': OuterRef('pk')}),
+            completed_tasks=count_tasks({'work': OuterRef('pk')},
+                                        completed=True))
+        jobs = Job.objects.filter(pk__in=jobs.values('pk')).update(
+            total_tasks=count_tasks({'work__job': OuterRef('pk')}),
+            completed_tasks=count_tasks({'work__job': OuterRef('pk')},
+                                        completed=True))
+    return works, jobs
+
+
 def tasks_completed_percentage(tasks):
     """
    return tasks completed percenage by
@@ -37,8 +95,7 @@ def get_job_completed_percentage(job):
     """
    return the completed job percentage
    """
-    tasks = get_job_tasks(job)
-    return tasks_completed_percentage(tasks)
+    return job.completed_percentage()
 
 
 def work_completed_percentage(work):
@@ -5,12 +5,16 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
+from django.db.models import Q, F, ExpressionWrapper, FloatField
+from django.db.models.functions import NullIf
 from django.http import FileResponse
 
 # from job.workflow_factory.workflow import WorkFlowBase
 from job.models import Job, Work, Task
 from job.forms import JobReqCreateForm, JobUpdateConfirmForm, AppointmentForm
+from job.workflow_factory.materialization import queue_materialization
+from job.batch import ACTIONS, batch_update_jobs
+from job.transitions import process_task
 
 from company.models import PackageLinkProduct
 
@@ -20,9 +24,6 @@ from finance.forms import (InvoiceUpdateForm, PaymentHistoryForm, ReceiptForm)
 from tripod.utils import superuser_check, staff_check, get_company, force_password_change_check
 # from tripod.tasks_lib.email import EmailClient
 
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-
 
 @login_required(login_url='company:staffLogin')
 @user_passes_test(force_password_change_check,
@@ -118,8 +119,9 @@ def jobChangeReqToJob(request, pk):
         if form.is_valid():
             try:
                 obj = form.save()
-                messages.success(request,
-                                 f'Job is confirmed and updated {obj}')
+                messages.success(
+                    request, f'Job is confirmed and updated {obj}, '
+                    'works and tasks are being prepared')
                 return redirect('job:jobPage', job.id)
             except ValueError as err:
                 messages.error(request, err)
@@ -132,6 +134,31 @@ def jobChangeReqToJob(request, pk):
     return render(request, 'jobManagement/jobConfirmPage.html', context)
 
 
+@login_required(login_url="company:staffLogin")
+@user_passes_test(superuser_check, login_url="permission_error")
+def batchJobAction(request):
+    """
+    confirming or declining the selected jobs, works and tasks of the
+    confirmed jobs are created by the background worker
+    """
+    if request.method != 'POST':
+        return redirect('job:jobReqManagementPage')
+    job_ids = [
+        job_id for job_id in request.POST.getlist('jobs') if job_id.isdigit()
+    ]
+    action = request.POST.get('action')
+    if not job_ids or action not in ACTIONS:
+        messages.error(request, 'Please select jobs and the action')
+        return redirect('job:jobReqManagementPage')
+
+    report = batch_update_jobs(job_ids, action, user=request.user)
+    messages.success(
+        request, f'{len(report.succeeded())} of {len(report.results)} jobs '
+        f'processed in {report.elapsed:.2f}s')
+    context = {'report': report, 'results': report.results.values()}
+    return render(request, 'jobManagement/jobBatchResult.html', context)
+
+
 @login_required(login_url="company:staffLogin")
 @user_passes_test(superuser_check, login_url="permission_error")
 def deleteJob(request, pk):
@@ -161,6 +188,11 @@ def jobManagementPage(request):
             primary_client__first_name=query) | Q(
                 primary_client__last_name=query)
         jobs = jobs.filter(lookup)
+    if request.GET.get('sort') == 'progress':
+        jobs = jobs.annotate(progress=ExpressionWrapper(
+            F('completed_tasks') * 100.0 / NullIf(F('total_tasks'), 0),
+            output_field=FloatField())).order_by(
+                F('progress').desc(nulls_last=True))
     context = {'jobs': jobs}
 
     return render(request, 'jobManagement/jobManagement.html', context)
@@ -223,6 +255,11 @@ def jobPage(request, pk):
     job page
     """
     job = Job.objects.get(pk=pk)
+    # works and tasks are still being built by the background worker
+    if not job.workflow_ready():
+        context = {'job': job}
+        return render(request, 'jobManagement/jobMaterializing.html',
+                      context)
     invoice = job.invoice
     payment_history = invoice.paymenthistory_set.all()
     works = Work.objects.filter(job=job).order_by('work_order')
@@ -236,25 +273,39 @@ def jobPage(request, pk):
     return render(request, 'jobManagement/job.html', context)
 
 
+@login_required(login_url='company:staffLogin')
+@user_passes_test(staff_check, login_url='permission_error')
+@user_passes_test(force_password_change_check,
+                  login_url="company:changePassword")
+def retryMaterialization(request, pk):
+    """queueing the failed job again to build works and tasks"""
+    job = Job.objects.get(pk=pk)
+    if job.workflow_state == Job.WORKFLOW_FAILED:
+        queue_materialization(job)
+        job.changed_by = request.user
+        job.save()
+        messages.success(request, f'Job {job} is queued again')
+    return redirect('job:jobPage', job.id)
+
+
 @login_required(login_url='company:staffLogin')
 @user_passes_test(staff_check, login_url='permission_error')
 @user_passes_test(force_password_change_check,
                   login_url="company:changePassword")
 def processTask(request, pk):
     """processing and completing the task from admin or business side"""
-    task = Task.objects.get(pk=pk)
-    work = task.work
-    job = work.job
-
-    # making sure that task is process correctly
+    # making sure that task is process correctly, task is fetched (and
+    # locked) once while it is processed
     try:
-        task.process_task(request.user)
+        task = process_task(pk, request.user)
         messages.success(request, f'Task {task} is successfully processed')
-        return redirect('job:jobPage', job.id)
+        return redirect('job:jobPage', task.work.job_id)
     except Exception as e:
         messages.error(request,
                        f'Exception {e} occured while processing the task')
-        return redirect('job:jobPage', job.id)
+        job_id = Task.objects.filter(pk=pk).values_list('work__job_id',
+                                                        flat=True).get()
+        return redirect('job:jobPage', job_id)
 
 
 @login_required(login_url='company:staffLogin')
@@ -266,19 +317,18 @@ def processEmailTaskWithoutSendingEmail(request, pk):
     processing and completing the email task from admin or business side
     without sending the email
     """
-    task = Task.objects.get(pk=pk)
-    work = task.work
-    job = work.job
-
-    # making sure that task is process correctly
+    # making sure that task is process correctly, task is fetched (and
+    # locked) once while it is processed
     try:
-        task.process_task(request.user, send_email=False)
+        task = process_task(pk, request.user, send_email=False)
         messages.success(request, f'Task {task} is successfully processed')
-        return redirect('job:jobPage', job.id)
+        return redirect('job:jobPage', task.work.job_id)
     except Exception as e:
         messages.error(request,
                        f'Exception {e} occured while processing the task')
-        return redirect('job:jobPage', job.id)
+        job_id = Task.objects.filter(pk=pk).values_list('work__job_id',
+                                                        flat=True).get()
+        return redirect('job:jobPage', job_id)
 
 
 @login_required(login_url='company:staffLogin')
@@ -490,6 +540,9 @@ def downloadInvoice(request, pk):
     client = job.primary_client
     invoice = job.invoice
     now = datetime.now().strftime("%d-%m-%Y")
+    # reportlab is only loaded when an invoice is downloaded
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
     # creating a file-like buffer to receive PDF data
     buffer = io.BytesIO()
     # creating the PDF object, using the buffer as its file
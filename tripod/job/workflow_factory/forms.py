@@ -38,7 +38,10 @@ class WorkForm(forms.ModelForm):
     class Meta:
         model = Work
         fields = '__all__'
-        exclude = ['created_by', 'created_at', 'changed_by', 'changed_at']
+        exclude = [
+            'created_by', 'created_at', 'changed_by', 'changed_at',
+            'total_tasks', 'completed_tasks'
+        ]
 
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('userObj')
@@ -0,0 +1,160 @@
+"""
+Representation of the background materialization of the workflow. When a job
+is confirmed it is only marked as materializing, and the worker (refer
+materialize_workflows management command) builds works, tasks and the invoice
+of the job afterwards.
+
+Each job is materialized in a single transaction, so a failure never leaves
+a half-built set of works and tasks. Failed jobs are retried with an
+increasing delay until MAX_ATTEMPTS is reached.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from settings.models import Workflow
+
+from job.models import Job
+from job.workflow_factory.materialization_process import (
+    init_materialization_process, materialize_job_in_process)
+from job.workflow_factory.plans import get_workflow_plan
+from job.workflow_factory.workflow import WorkFlowBase
+
+from finance.utils import set_invoice_data_for_job
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+
+
+def queue_materialization(job):
+    """marking the job to be materialized by the worker"""
+    job.workflow_state = Job.MATERIALIZING
+    job.workflow_attempts = 0
+    job.workflow_error = None
+    job.workflow_retry_at = None
+    return job
+
+
+def get_retry_at(attempts):
+    """returning the next retry time, delay is doubled with each attempt"""
+    return timezone.now() + RETRY_DELAY * (2**(attempts - 1))
+
+
+def materialize_job(job_id):
+    """
+    building works, tasks and invoice of the job that is waiting to be
+    materialized, returns the job or None if it is not waiting anymore (or
+    it is being materialized by another worker)
+    """
+    job = None
+    try:
+        with transaction.atomic():
+            job = Job.objects.select_for_update(skip_locked=True).filter(
+                pk=job_id, workflow_state=Job.MATERIALIZING).first()
+            if job is None:
+                return None
+            attempts = job.workflow_attempts
+            job.workflow_state = Job.WORKFLOW_READY
+            job.workflow_error = None
+            job.workflow_retry_at = None
+            # works could be already there if the job was queued again
+            if job.work_set.exists():
+                job.save()
+                return job
+            set_invoice_data_for_job(job, package=bool(job.package))
+            wfb = WorkFlowBase(job.changed_by, job)
+            wfb.bulk_create_work_and_tasks()
+            return job
+    except Exception as err:
+        if job is None:
+            raise
+        attempts += 1
+        state = (Job.WORKFLOW_FAILED
+                 if attempts >= MAX_ATTEMPTS else Job.MATERIALIZING)
+        Job.objects.filter(pk=job_id).update(
+            workflow_state=state,
+            workflow_attempts=attempts,
+            workflow_error=str(err),
+            workflow_retry_at=get_retry_at(attempts))
+        return None
+
+
+def get_jobs_to_materialize(limit=None):
+    """returning ids of the jobs that are waiting to be materialized"""
+    lookup = Q(workflow_retry_at__isnull=True) | Q(
+        workflow_retry_at__lte=timezone.now())
+    job_ids = Job.objects.filter(workflow_state=Job.MATERIALIZING).filter(
+        lookup).order_by('changed_at').values_list('id', flat=True)
+    if limit is not None:
+        job_ids = job_ids[:limit]
+    return list(job_ids)
+
+
+def materialize_job_result(job_id):
+    """materializing the job and returning (job_id, success, message)"""
+    if materialize_job(job_id) is not None:
+        return job_id, True, 'Works and tasks are created'
+    job = Job.objects.filter(pk=job_id).values('workflow_state',
+                                               'workflow_error').first()
+    if job is None or job['workflow_state'] != Job.MATERIALIZING:
+        return job_id, False, 'Job is not waiting to be materialized'
+    return job_id, False, job['workflow_error']
+
+
+def compile_workflow_plans(workflow_ids):
+    """compiling the plans of the workflows, so they are cached"""
+    for workflow in Workflow.objects.filter(pk__in=workflow_ids):
+        try:
+            get_workflow_plan(workflow)
+        except Exception:
+            # failure is recorded on each job when it is materialized
+            pass
+
+
+def materialize_jobs(job_ids, processes=None):
+    """
+    materializing the jobs and returning list of (job_id, success, message).
+    plans of the workflows are compiled once before the jobs are processed,
+    so they are shared by the jobs. jobs are independent of each other, so
+    they are processed on a pool of processes if more than one process is
+    requested. processes are spawned (refer materialization_process), so
+    they do not depend on the default start method of the platform, and
+    each of them compiles the plans once in its initializer
+    """
+    job_ids = list(job_ids)
+    workflow_ids = list(
+        Job.objects.filter(pk__in=job_ids,
+                           workflow__isnull=False).values_list(
+                               'workflow_id', flat=True).distinct())
+
+    if not processes or processes < 2 or len(job_ids) < 2:
+        compile_workflow_plans(workflow_ids)
+        return [materialize_job_result(job_id) for job_id in job_ids]
+
+    databases = {
+        alias: connections[alias].settings_dict['NAME']
+        for alias in connections
+    }
+    with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_materialization_process,
+            initargs=(workflow_ids, databases)) as executor:
+        chunksize = max(1, len(job_ids) // (processes * 4))
+        return list(
+            executor.map(materialize_job_in_process,
+                         job_ids,
+                         chunksize=chunksize))
+
+
+def materialize_pending_jobs(limit=None, processes=None):
+    """
+    materializing the jobs that are waiting, returns the number of jobs
+    that are materialized successfully
+    """
+    results = materialize_jobs(get_jobs_to_materialize(limit), processes)
+    return len([result for result in results if result[1]])
@@ -0,0 +1,31 @@
+"""
+Entry points of the processes that materialize the jobs (refer
+materialization.materialize_jobs). Pool processes are spawned, so they import
+this module before django is set up; it must not import the models at the
+top level, they are imported once the initializer has set up django.
+"""
+import django
+
+
+def init_materialization_process(workflow_ids=(), databases=None):
+    """
+    setting up django in the pool process, which has its own database
+    connections since it is spawned instead of forked. databases of the
+    parent process are used (e.g. the test database), and the plans of the
+    workflows are compiled once for all the jobs of the process
+
+    * workflow_ids -> workflows of the jobs to be materialized
+    * databases -> {alias: database name} of the parent process
+    """
+    django.setup()
+    from django.db import connections
+    from job.workflow_factory.materialization import compile_workflow_plans
+    for alias, name in (databases or {}).items():
+        connections[alias].settings_dict['NAME'] = name
+    compile_workflow_plans(workflow_ids)
+
+
+def materialize_job_in_process(job_id):
+    """materializing the job and returning (job_id, success, message)"""
+    from job.workflow_factory.materialization import materialize_job_result
+    return materialize_job_result(job_id)
@@ -0,0 +1,142 @@
+"""
+Representation of the compiled workflow plans. A plan holds everything that
+is needed to create works and tasks for a workflow (ordered work types, task
+classes, descriptions and template references), so once it is compiled job
+confirmation does not need to query the settings tables again.
+
+Plans are cached per process and keyed by the workflow version (changed_at).
+They are dropped by the signals in job.signals whenever a Workflow,
+WorkTemplate or WorkType is saved or deleted.
+"""
+from settings.models import WorkTemplate, WorkType
+
+from job.workflow_factory.tasks import TASK_CLASSES, TASK_DESCRIPTIONS
+
+# compiled plans by workflow id
+_plans = {}
+
+
+class PlanBase:
+    """Basic representation of an immutable plan object"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+
+class TaskPlan(PlanBase):
+    """
+    Plan of a single task, compiled from a work template
+
+    * name -> name of the task
+    * task_class -> task class (from TASK_CLASSES) that creates the task
+    * description -> description of the task along with the task type info
+    * step_number/ auto_complete/ check_invoice -> taken from work template
+    * email_template_id/ contract_template_id/ quest_template_id -> template
+    references of the work template
+    """
+    __slots__ = ('name', 'task_class', 'description', 'step_number',
+                 'auto_complete', 'check_invoice', 'email_template_id',
+                 'contract_template_id', 'quest_template_id')
+
+    def __init__(self, work_template):
+        try:
+            task_class = TASK_CLASSES[work_template.class_object]
+        except KeyError:
+            raise Exception(f'Task class ({work_template.class_object}) '
+                            'is not available')
+        description = (f"{work_template.description}\n"
+                       f"{TASK_DESCRIPTIONS[work_template.class_object]}")
+        values = {
+            'name': work_template.name,
+            'task_class': task_class,
+            'description': description,
+            'step_number': work_template.step_number,
+            'auto_complete': work_template.auto_complete,
+            'check_invoice': work_template.check_invoice,
+            'email_template_id': work_template.email_template_id,
+            'contract_template_id': work_template.contract_template_id,
+            'quest_template_id': work_template.quest_template_id,
+        }
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+
+class WorkPlan(PlanBase):
+    """
+    Plan of a single work, which has the same work_type and work_order
+    attributes as WorkType so it can be passed to the work classes
+
+    * work_type -> name of the work type
+    * work_order -> order of the work among the works
+    * tasks -> tuple of TaskPlan
+    """
+    __slots__ = ('work_type', 'work_order', 'tasks')
+
+    def __init__(self, work_type, tasks):
+        object.__setattr__(self, 'work_type', work_type.work_type)
+        object.__setattr__(self, 'work_order', work_type.work_order)
+        object.__setattr__(self, 'tasks', tuple(tasks))
+
+
+class WorkflowPlan(PlanBase):
+    """
+    Plan of the whole workflow
+
+    * workflow_id -> id of the workflow
+    * version -> changed_at of the workflow when the plan is compiled
+    * works -> tuple of WorkPlan ordered by work order
+    """
+    __slots__ = ('workflow_id', 'version', 'works')
+
+    def __init__(self, workflow, works):
+        object.__setattr__(self, 'workflow_id', workflow.id)
+        object.__setattr__(self, 'version', workflow.changed_at)
+        object.__setattr__(self, 'works', tuple(works))
+
+
+def compile_workflow_plan(workflow):
+    """
+    compiling the workflow into a plan, every work type gets a work plan and
+    work templates of the workflow are grouped under their work types
+    """
+    task_plans = {}
+    for work_template in WorkTemplate.objects.filter(workflow=workflow):
+        task_plans.setdefault(work_template.work_type_id,
+                              []).append(TaskPlan(work_template))
+
+    works = [
+        WorkPlan(work_type, task_plans.get(work_type.id, []))
+        for work_type in WorkType.objects.all()
+    ]
+    return WorkflowPlan(workflow, works)
+
+
+def is_newer_version(version, plan_version):
+    """checking whether the workflow version is newer than the plan"""
+    if version is None or plan_version is None:
+        return version != plan_version
+    return version > plan_version
+
+
+def get_workflow_plan(workflow):
+    """
+    returning the cached plan for the workflow, plan is compiled again if
+    it is not available or compiled for an older version of the workflow
+    """
+    plan = _plans.get(workflow.id)
+    if plan is None or is_newer_version(workflow.changed_at, plan.version):
+        plan = compile_workflow_plan(workflow)
+        _plans[workflow.id] = plan
+    return plan
+
+
+def invalidate_workflow_plans(workflow_id=None):
+    """dropping cached plan of the workflow, or all of them if not passed"""
+    if workflow_id is None:
+        _plans.clear()
+    else:
+        _plans.pop(workflow_id, None)
@@ -5,6 +5,7 @@ objects in database.
 """
 from abc import ABC, abstractmethod
 
+from job.models import Task
 from job.workflow_factory.forms import TaskForm
 
 
@@ -32,14 +33,19 @@ class ToDoTask(TaskBase):
 
     * __data -> dictionary of data that passed to TaskFrom for creating db obj
     * task -> task db object; init as None type
+    * appointment -> appointment db object built for bulk creation;
+    init as None type
     * name -> name of the task
     * user -> user object for update created_by
     * work -> work db class that responsible for the tasks
     """
+    template_fields = ('email_template', 'contract_template',
+                       'quest_template')
 
     def __init__(self, name, user, work):
         self.__data = {}
         self.task = None
+        self.appointment = None
         self.name = name
         self.user = user
         self.work = work
@@ -75,6 +81,19 @@ class ToDoTask(TaskBase):
         else:
             print(form.errors)
 
+    def build_db_object(self):
+        """
+        building task db object with data that passed using set_data
+        function without saving it, so it can be bulk created along with
+        the rest of the workflow. templates are passed as ids in the data
+        """
+        data = dict(self.__data)
+        for field in self.template_fields:
+            if field in data:
+                data[f'{field}_id'] = data.pop(field)
+        self.task = Task(**data)
+        return self.task
+
 
 class EmailTask(ToDoTask):
     """
@@ -89,7 +108,7 @@ class EmailTask(ToDoTask):
         """setting the data dictionary with task details"""
         self.__data = super(EmailTask, self).set_data(description, obj)
         self.__data['task_type'] = 'em'
-        self.__data['email_template'] = obj.email_template
+        self.__data['email_template'] = obj.email_template_id
         return self.__data
 
 
@@ -106,7 +125,7 @@ class ContractTask(ToDoTask):
         """setting the data dictionary with task details"""
         self.__data = super(ContractTask, self).set_data(description, obj)
         self.__data['task_type'] = 'cn'
-        self.__data['contract_template'] = obj.contract_template
+        self.__data['contract_template'] = obj.contract_template_id
         self.__data['user_task'] = True
         self.__data['user_completed'] = 'no'
         return self.__data
@@ -125,7 +144,7 @@ class QuestTask(ToDoTask):
         """setting the data dictionary with task details"""
         self.__data = super(QuestTask, self).set_data(description, obj)
         self.__data['task_type'] = 'qn'
-        self.__data['quest_template'] = obj.quest_template
+        self.__data['quest_template'] = obj.quest_template_id
         self.__data['user_task'] = True
         self.__data['user_completed'] = 'no'
         return self.__data
@@ -145,7 +164,7 @@ class AppointmentTask(ToDoTask):
         """setting the data dictionary with task details"""
         self.__data = super(AppointmentTask, self).set_data(description, obj)
         self.__data['task_type'] = 'ap'
-        self.__data['email_template'] = obj.email_template
+        self.__data['email_template'] = obj.email_template_id
         self.__data['user_task'] = True
         self.__data['user_completed'] = 'no'
         return self.__data
@@ -154,3 +173,27 @@ class AppointmentTask(ToDoTask):
         super(AppointmentTask, self).create_db_object()
         task = self.task
         task.register_appointment(method='creating')
+
+    def build_db_object(self):
+        super(AppointmentTask, self).build_db_object()
+        self.appointment = self.task.build_appointment()
+        return self.task
+
+
+# task classes that can be referred by the class_object of work template
+TASK_CLASSES = {
+    'ToDoTask': ToDoTask,
+    'EmailTask': EmailTask,
+    'ContractTask': ContractTask,
+    'QuestTask': QuestTask,
+    'AppointmentTask': AppointmentTask,
+}
+
+# task type info that is added to the description of the task
+TASK_DESCRIPTIONS = {
+    'ToDoTask': 'simple Task',
+    'EmailTask': 'an email will be sent upon completion',
+    'ContractTask': 'contract and invoice will be shared with client',
+    'QuestTask': 'Questionnaire will be shared with client',
+    'AppointmentTask': 'booking information will be shared with client'
+}
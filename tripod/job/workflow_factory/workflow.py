@@ -4,8 +4,12 @@ based on the workflow that defined for the job.
 """
 from datetime import timedelta
 
-from settings.models import WorkTemplate, WorkType
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
 
+from job.models import Job, Work, Task, Appointment
+from job.workflow_factory.plans import get_workflow_plan
 from job.workflow_factory.works import SimpleWork
 from job.utils import update_work_completion_for_job
 
@@ -22,9 +26,9 @@ class WorkFlowBase:
     * job -> job that created, and work and tasks needed to be created
     * workflow -> job's workflow
     * job_data -> job's created_at
-    * wt_objs -> get data from WorkTemplate (a model that holds
-    the basic structural information of the works that comes under
-    specif workflow) that is relavent to the workflow
+    * plan -> compiled plan of the workflow (refer plans.WorkflowPlan), which
+    holds the works and tasks structure that is defined in WorkTemplate
+    and WorkType; init as None and loaded from the plan cache
     """
 
     def __init__(self, user, job):
@@ -33,8 +37,15 @@ class WorkFlowBase:
         self.job_status = True if self.job.status == 'job' else False
         self.workflow = job.workflow
         self.job_date = job.created_at
-        self.work_types = WorkType.objects.all()
-        self.wt_objs = WorkTemplate.objects.filter(workflow=self.workflow)
+        self.plan = None
+
+    def get_plan(self):
+        """getting the compiled plan of the workflow"""
+        if self.workflow is None:
+            raise Exception("workflow is not available")
+        if self.plan is None:
+            self.plan = get_workflow_plan(self.workflow)
+        return self.plan
 
     def create_work_and_tasks(self):
         """
@@ -42,18 +53,98 @@ class WorkFlowBase:
         and passing the information to the work creation classes, so works and
         tasks will be automatically created
         """
-        if self.workflow is None:
-            raise Exception("workflow is not available")
-        for work_type in self.work_types:
+        for work_plan in self.get_plan().works:
             # creating work database objects
             work_instance = SimpleWork(user=self.user,
                                        job=self.job,
-                                       work_type=work_type)
+                                       work_type=work_plan)
             work_instance.create_db_object()
-            wt_objs = self.wt_objs.filter(work_type=work_type)
-            # mapping task creation to each object of work template
-            work_instance.tasks = list(map(work_instance.task_factory,
-                                           wt_objs))
+            # mapping task creation to each task of the work plan
+            work_instance.tasks = list(
+                map(work_instance.task_factory, work_plan.tasks))
 
         update_work_completion_for_job(self.job)
         self.job.save()
+
+    def build_work_and_tasks(self):
+        """
+        building the whole set of works and tasks for the workflow without
+        touching the database, using the compiled plan of the workflow
+        """
+        work_instances = []
+        for work_plan in self.get_plan().works:
+            work_instance = SimpleWork(user=self.user,
+                                       job=self.job,
+                                       work_type=work_plan)
+            work_instance.build_db_object()
+            work_instance.tasks = list(
+                map(work_instance.task_builder, work_plan.tasks))
+            work_instances.append(work_instance)
+        return work_instances
+
+    @staticmethod
+    def validate_work_and_tasks(work_instances):
+        """
+        validating the built works and tasks once, before any of them is
+        saved, relations are skipped since they are not saved yet
+        """
+        errors = []
+        for work_instance in work_instances:
+            try:
+                work_instance.work.clean_fields(exclude=['job'])
+            except ValidationError as err:
+                errors.append(f"{work_instance.work.work_name}: {err}")
+            for task in work_instance.tasks:
+                try:
+                    task.task.clean_fields(exclude=[
+                        'work', 'appointment', 'job_contract', 'job_quest',
+                        'email_template', 'contract_template',
+                        'quest_template'
+                    ])
+                except ValidationError as err:
+                    errors.append(f"{task.task.task_name}: {err}")
+        if errors:
+            raise ValidationError(errors)
+
+    def bulk_create_work_and_tasks(self):
+        """
+        creating the same works and tasks as create_work_and_tasks but with
+        bulk inserts in a single transaction. Work and job completion is
+        worked out from the built objects, so the job is saved only once
+        """
+        work_instances = self.build_work_and_tasks()
+        self.validate_work_and_tasks(work_instances)
+
+        works = []
+        tasks = []
+        appointments = []
+        for work_instance in work_instances:
+            work = work_instance.work
+            work_tasks = [task.task for task in work_instance.tasks]
+            # bulk_create skips the signals, so counters are set here
+            work.total_tasks = len(work_tasks)
+            work.completed_tasks = len([t for t in work_tasks if t.completed])
+            if int(work.completed_percentage()) == 100:
+                work.completed = True
+                self.job.task_status = work.get_job_task_status(
+                    self.job.task_status)
+            works.append(work)
+            tasks += work_tasks
+            appointments += [
+                task.appointment for task in work_instance.tasks
+                if task.appointment is not None
+            ]
+
+        total_tasks = sum(work.total_tasks for work in works)
+        completed_tasks = sum(work.completed_tasks for work in works)
+        with transaction.atomic():
+            self.job.save()
+            Job.objects.filter(pk=self.job.pk).update(
+                total_tasks=F('total_tasks') + total_tasks,
+                completed_tasks=F('completed_tasks') + completed_tasks)
+            self.job.total_tasks += total_tasks
+            self.job.completed_tasks += completed_tasks
+            Work.objects.bulk_create(works)
+            Task.objects.bulk_create(tasks)
+            Appointment.objects.bulk_create(appointments)
+        return works
@@ -5,8 +5,7 @@ criteria that passed, and they does their job to create db objects.
 """
 from abc import ABC, abstractmethod
 
-from job.workflow_factory.tasks import (ToDoTask, EmailTask, ContractTask,
-                                        QuestTask, AppointmentTask)
+from job.models import Work
 from job.workflow_factory.forms import WorkForm
 
 
@@ -38,6 +37,7 @@ class SimpleWork(WorkBase):
     * name -> name of the work
     * user -> user who create
     * job -> job that will be responsible for the work
+    * work_type -> work plan (or work type) that has work_type and work_order
     * tasks -> list of tasks which under specific work
     * work -> created work db object; init as None
     """
@@ -49,13 +49,6 @@ class SimpleWork(WorkBase):
         self.work_type = work_type
         self.tasks = []
         self.work = None
-        self.task_types = {
-            'ToDoTask': 'simple Task',
-            'EmailTask': 'an email will be sent upon completion',
-            'ContractTask': 'contract and invoice will be shared with client',
-            'QuestTask': 'Questionnaire will be shared with client',
-            'AppointmentTask': 'booking information will be shared with client'
-        }
 
     def set_data(self):
         """
@@ -89,16 +82,35 @@ class SimpleWork(WorkBase):
         else:
             print(form.errors)
 
-    def task_factory(self, obj):
+    def build_db_object(self):
+        """
+        building work db object with the data passed using set_data
+        function without saving it, so it can be bulk created
+        """
+        self.set_data()
+        self.work = Work(**self.__data)
+        return self.work
+
+    def get_task_instance(self, task_plan):
+        """creating task class instance with the data of the task plan"""
+        task = task_plan.task_class(task_plan.name, self.user, self.work)
+        task.set_data(task_plan.description, task_plan)
+        return task
+
+    def task_factory(self, task_plan):
         """creating task factory"""
-        #  print(obj)
-        name = obj.name
-        description = f"{obj.description}\n{self.task_types[str(obj.class_object)]}"
-        class_obj = eval(obj.class_object)
-        task = class_obj(name, self.user, self.work)
-        task.set_data(description, obj)
+        task = self.get_task_instance(task_plan)
         task = task.create_db_object()
 
+    def task_builder(self, task_plan):
+        """
+        building task class instance along with the unsaved task db object,
+        which is used to bulk create tasks
+        """
+        task = self.get_task_instance(task_plan)
+        task.build_db_object()
+        return task
+
     # def add_simpleTask(self, obj):
     #     """
     #     automcatically created ToDoTask instance, get added to the database
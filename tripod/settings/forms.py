@@ -1,5 +1,6 @@
 from django import forms
 
+from tripod.reference_data import ReferenceChoicesMixin
 from tripod.utils import add_basic_html_tags
 from settings.models import (Workflow, EmailTemplate, Source, TemplateField,
                              WorkTemplate, ContractTemplate,
@@ -35,7 +36,7 @@ class WorkflowForm(forms.ModelForm):
         return workFlowObj
 
 
-class EmailTemplateForm(forms.ModelForm):
+class EmailTemplateForm(ReferenceChoicesMixin, forms.ModelForm):
     """Workflow object creation"""
 
     class Meta:
@@ -145,7 +146,7 @@ class WorkTypeForm(forms.ModelForm):
         fields = '__all__'
 
 
-class WorkTemplateForm(forms.ModelForm):
+class WorkTemplateForm(ReferenceChoicesMixin, forms.ModelForm):
     """Workflow object creation"""
 
     class Meta:
@@ -1,6 +1,10 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from tripod.tasks_lib.template_prepration import (get_placeholders,
+                                                  get_resolver)
+
 
 class Workflow(models.Model):
     """
@@ -28,7 +32,34 @@ class Workflow(models.Model):
         return self.workflow_name
 
 
-class EmailTemplate(models.Model):
+class TemplatePlaceholders:
+    """
+    Validation of the placeholders of the templates, placeholders of the
+    subject and body should be available in TemplateField so an invalid
+    template is rejected when it is saved instead of when it is sent
+    """
+    PLACEHOLDER_FIELDS = ('subject', 'body')
+
+    def validate_placeholders(self):
+        fields = set(TemplateField.objects.values_list('field', flat=True))
+        errors = {}
+        for name in self.PLACEHOLDER_FIELDS:
+            invalid = sorted(get_placeholders(getattr(self, name)) - fields)
+            if invalid:
+                errors[name] = f"Passes field ({', '.join(invalid)}) not valid"
+        if errors:
+            raise ValidationError(errors)
+
+    def clean(self):
+        super().clean()
+        self.validate_placeholders()
+
+    def save(self, *args, **kwargs):
+        self.validate_placeholders()
+        super().save(*args, **kwargs)
+
+
+class EmailTemplate(TemplatePlaceholders, models.Model):
     workflow = models.ForeignKey(Workflow,
                                  on_delete=models.SET_NULL,
                                  null=True,
@@ -54,7 +85,7 @@ class EmailTemplate(models.Model):
         return self.template_name
 
 
-class ContractTemplate(models.Model):
+class ContractTemplate(TemplatePlaceholders, models.Model):
     template_name = models.CharField(max_length=200)
     subject = models.CharField(max_length=200)
     body = models.TextField()
@@ -77,7 +108,7 @@ class ContractTemplate(models.Model):
         return self.template_name
 
 
-class QuestionnaireTemplate(models.Model):
+class QuestionnaireTemplate(TemplatePlaceholders, models.Model):
     template_name = models.CharField(max_length=200)
     subject = models.CharField(max_length=200)
     body = models.TextField()
@@ -121,6 +152,21 @@ class TemplateField(models.Model):
     def __str__(self):
         return self.field
 
+    def validate_object_field(self):
+        """object field should be an allowed path of attributes"""
+        try:
+            get_resolver(self.object_field)
+        except Exception as error:
+            raise ValidationError({'object_field': str(error)})
+
+    def clean(self):
+        super().clean()
+        self.validate_object_field()
+
+    def save(self, *args, **kwargs):
+        self.validate_object_field()
+        super().save(*args, **kwargs)
+
 
 class WorkType(models.Model):
     work_type = models.CharField(max_length=20)
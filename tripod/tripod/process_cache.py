@@ -0,0 +1,95 @@
+"""
+Cache of the process in front of the shared cache (refer CACHES setting).
+
+The shared cache is the database cache by default, so each of its hits is
+a query. Values read from it are kept in the process for PROCESS_CACHE_TTL
+seconds, so a value read again and again (e.g. rendered sections and charts
+or the choices of the forms) only goes to the shared cache once per TTL. A
+value changed by another worker is then seen once the TTL is passed.
+
+At most PROCESS_CACHE_MAX_ENTRIES values are kept, the least recently used
+ones are dropped first. Misses of the shared cache are never kept.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# {key: (value, expires_at)}, least recently used first
+_values = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_ttl(ttl=None):
+    if ttl is None:
+        return getattr(settings, 'PROCESS_CACHE_TTL', 10)
+    return ttl
+
+
+def remember(key, value, ttl=None):
+    """keeping the value in the process only, for ttl seconds"""
+    ttl = get_ttl(ttl)
+    if ttl <= 0:
+        forget(key)
+        return
+    with _lock:
+        _values[key] = (value, time.monotonic() + ttl)
+        _values.move_to_end(key)
+        while len(_values) > getattr(settings, 'PROCESS_CACHE_MAX_ENTRIES',
+                                     256):
+            _values.popitem(last=False)
+
+
+def forget(key):
+    """dropping the value of the process, the shared cache is kept"""
+    with _lock:
+        _values.pop(key, None)
+
+
+def get_cached(key, ttl=None):
+    """
+    returning the value of the process if it is not expired, else the
+    value of the shared cache, which is kept in the process for ttl seconds.
+    returns None if the key is not in the shared cache
+    """
+    with _lock:
+        cached = _values.get(key)
+        if cached is not None and time.monotonic() < cached[1]:
+            _values.move_to_end(key)
+            return cached[0]
+
+    value = cache.get(key)
+    if value is None:
+        forget(key)
+    else:
+        remember(key, value, ttl)
+    return value
+
+
+def set_cached(key, value, timeout, ttl=None):
+    """
+    setting the value in the shared cache for timeout seconds (None never
+    expires) and keeping it in the process, never longer than the timeout
+    """
+    cache.set(key, value, timeout)
+    ttl = get_ttl(ttl)
+    if timeout is not None:
+        ttl = min(ttl, timeout)
+    remember(key, value, ttl)
+
+
+def clear_process_cache():
+    """dropping all the values of the process"""
+    with _lock:
+        _values.clear()
+
+
+@receiver(setting_changed)
+def cache_setting_changed(setting, **kwargs):
+    """values of the process belong to the previous shared cache"""
+    if setting == 'CACHES':
+        clear_process_cache()
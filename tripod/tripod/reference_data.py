@@ -0,0 +1,126 @@
+"""
+Cache of the reference data, which are the small and rarely changing tables
+that the choice fields of the forms are built from (events, packages,
+workflows, sources, work types and photographers).
+
+Choices are kept in the django cache under the version of the reference
+data, the version is bumped by the signals in core.signals whenever the
+data is changed so all the workers build the choices again. Choices also
+expire after REFERENCE_DATA_TIMEOUT seconds, e.g. if the cache is not
+shared by the workers.
+
+Versions and choices are kept in the process too (refer
+tripod.process_cache), so rendering the forms runs no queries of the
+database cache. The version is read from the shared cache again once the
+PROCESS_CACHE_TTL seconds are passed, so a change made by another worker is
+seen within the TTL. Choices of a version never change, so they are kept as
+long as in the shared cache.
+
+Forms with ReferenceChoicesMixin build the choices of those fields from
+the cache. Submitted values are still loaded from the db, so a choice that
+is deleted meanwhile is never accepted from a stale list.
+"""
+import uuid
+
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+
+from company.models import Event, Package
+from core.models import CustomUser
+from settings.models import Source, Workflow, WorkType
+from tripod.process_cache import get_cached, remember, set_cached
+
+# querysets of the reference data by name
+REFERENCE_DATA = {
+    'events': lambda: Event.objects.all(),
+    'packages': lambda: Package.objects.all(),
+    'workflows': lambda: Workflow.objects.all(),
+    'sources': lambda: Source.objects.all(),
+    'work_types': lambda: WorkType.objects.all(),
+    'photographers': lambda: CustomUser.objects.filter(is_staff=True,
+                                                       is_photographer=True),
+}
+
+# reference data of the form fields by field name
+REFERENCE_FIELDS = {
+    'event': 'events',
+    'package': 'packages',
+    'workflow': 'workflows',
+    'source': 'sources',
+    'work_type': 'work_types',
+    'photographer': 'photographers',
+}
+
+
+def get_version_key(name):
+    return f'reference-version-{name}'
+
+
+def bump_reference_version(name):
+    """changing the version of the reference data, so choices are rebuilt"""
+    set_cached(get_version_key(name), uuid.uuid4().hex, None)
+
+
+def get_reference_version(name):
+    """returning the current version of the reference data"""
+    key = get_version_key(name)
+    version = get_cached(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+        remember(key, version)
+    return version
+
+
+def get_reference_choices(name):
+    """returning [(pk, label)] of the reference data, from the cache"""
+    key = f'reference-{name}-{get_reference_version(name)}'
+    timeout = getattr(settings, 'REFERENCE_DATA_TIMEOUT', 300)
+    choices = get_cached(key, timeout)
+    if choices is None:
+        choices = [(obj.pk, str(obj)) for obj in REFERENCE_DATA[name]()]
+        set_cached(key, choices, timeout, timeout)
+    return choices
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """
+    Model choice field of the reference data, choices are taken from the
+    cache and the selected object is loaded from the queryset as usual
+
+    * reference -> name of the reference data
+    """
+
+    def __init__(self, reference, **kwargs):
+        self.reference = reference
+        super().__init__(REFERENCE_DATA[reference](), **kwargs)
+
+    def _get_choices(self):
+        choices = get_reference_choices(self.reference)
+        if self.empty_label is None:
+            return list(choices)
+        return [('', self.empty_label)] + choices
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+
+class ReferenceChoicesMixin:
+    """
+    ModelForm mixin replacing the model choice fields of the reference data
+    (refer REFERENCE_FIELDS) with ReferenceChoiceField
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, reference in REFERENCE_FIELDS.items():
+            field = self.fields.get(name)
+            if isinstance(field, forms.ModelChoiceField) and not isinstance(
+                    field, ReferenceChoiceField):
+                self.fields[name] = ReferenceChoiceField(
+                    reference,
+                    required=field.required,
+                    label=field.label,
+                    help_text=field.help_text,
+                    empty_label=field.empty_label,
+                    widget=field.widget)
@@ -0,0 +1,63 @@
+"""
+Representation of the reports of the batch operations (e.g. batch actions of
+the jobs and the mail merge), which hold the result of each object and the
+time taken to process the whole batch.
+"""
+import time
+
+
+class Result:
+    """
+    Result of a single object of the batch
+
+    * success -> True if the object was processed
+    * message -> explanation of the result
+    """
+    __slots__ = ('success', 'message')
+
+    def __init__(self, success, message=''):
+        self.success = success
+        self.message = message
+
+
+class Report:
+    """
+    Report of the batch, results are created with result_class (a Result
+    taking the id of the object first, set by the subclasses) and kept by
+    the id of their object
+
+    * results -> {object id: result} in the order of processing
+    * elapsed -> seconds taken for the batch; set by finish()
+    """
+    result_class = None
+
+    def __init__(self):
+        self.results = {}
+        self.elapsed = None
+        self._started = time.perf_counter()
+
+    def add(self, object_id, *args, **kwargs):
+        self.results[object_id] = self.result_class(object_id, *args,
+                                                    **kwargs)
+
+    def update(self, object_id, success, message):
+        """updating the result of the object after further processing"""
+        result = self.results[object_id]
+        result.success = success
+        result.message = message
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self._started
+        return self
+
+    def succeeded(self):
+        return [r for r in self.results.values() if r.success]
+
+    def failed(self):
+        return [r for r in self.results.values() if not r.success]
+
+    def throughput(self):
+        """returning number of objects processed per second"""
+        if not self.elapsed:
+            return 0
+        return len(self.results) / self.elapsed
@@ -22,6 +22,17 @@ email_password = os.environ.get("EMAIL_PASSWORD")
 temp_password = os.environ.get("TEMP_PASS")
 db_password = os.environ.get("DB_PASS")
 
+# SMTP server of the emails, connections are pooled per process
+EMAIL_HOST = 'smtp.gmail.com'
+EMAIL_PORT = 465
+EMAIL_USE_SSL = True
+EMAIL_POOL_SIZE = 4
+EMAIL_POOL_IDLE_TIMEOUT = 60
+# transport of the emails (refer tripod.tasks_lib.transports), e.g.
+# FileTransport or MemoryTransport to load-test without the mail server
+EMAIL_TRANSPORT = 'tripod.tasks_lib.transports.SMTPTransport'
+EMAIL_TRANSPORT_OPTIONS = {}
+
 # connecting with bootstrap classes
 MESSAGE_TAGS = {
     messages.DEBUG: 'alert-secondary',
@@ -119,6 +130,22 @@ DATABASES = {
     }
 }
 
+# Cache shared by all the worker processes. Versions of the cached data
+# (active company, reference data of the forms, dashboard sections) are kept
+# here, so a change made by one worker is seen by the others; a per process
+# cache (e.g. locmem) must not be used when more than one worker is run.
+# Database cache needs its table, `python manage.py createcachetable`, and
+# CACHE_BACKEND / CACHE_LOCATION can point to memcached or redis instead
+CACHES = {
+    'default': {
+        'BACKEND':
+        os.environ.get('CACHE_BACKEND',
+                       'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION':
+        os.environ.get('CACHE_LOCATION', 'tripod_cache'),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
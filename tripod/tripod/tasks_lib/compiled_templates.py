@@ -0,0 +1,55 @@
+"""
+Cache of the compiled email, contract and questionnaire templates (refer
+CompiledTemplate), so the templates are not searched for placeholders and
+the template fields are not queried again for every email.
+
+Compiled templates are cached per process and keyed by the template version
+(changed_at). They are dropped by the signals in job.signals whenever a
+template or a TemplateField is saved or deleted.
+"""
+from settings.models import TemplateField
+
+from tripod.tasks_lib.template_prepration import CompiledTemplate
+
+# compiled templates by (model label, template id)
+_templates = {}
+
+
+def get_object_fields():
+    """returning {'field': 'object_field'} of all the template fields"""
+    return dict(TemplateField.objects.values_list('field', 'object_field'))
+
+
+def is_newer_version(version, compiled_version):
+    """checking whether the template version is newer than the compiled"""
+    if version is None or compiled_version is None:
+        return version != compiled_version
+    return version > compiled_version
+
+
+def get_compiled_template(template):
+    """
+    returning the cached compiled template, template is compiled again if
+    it is not available or compiled for an older version of the template
+    """
+    key = (template._meta.label, template.pk)
+    compiled = _templates.get(key)
+    if compiled is None or is_newer_version(template.changed_at,
+                                            compiled.version):
+        compiled = CompiledTemplate(template, get_object_fields())
+        if template.pk is not None:
+            _templates[key] = compiled
+    return compiled
+
+
+def invalidate_compiled_templates(model=None, template_id=None):
+    """
+    dropping the compiled template, all templates of the model if the id is
+    not passed, or all of them if the model is not passed
+    """
+    if model is None:
+        _templates.clear()
+        return
+    for key in list(_templates):
+        if key[0] == model._meta.label and template_id in (None, key[1]):
+            del _templates[key]
@@ -1,12 +1,12 @@
-import smtplib
 from email.message import EmailMessage
 
+from tripod.tasks_lib.compiled_templates import get_compiled_template
 from tripod.tasks_lib.template_prepration import (TemplateContent,
                                                   TemplateDatabaseObjects)
+from core.outbox import enqueue_message
 
 from tripod.utils import get_company
-from tripod.settings import email_address, email_password
-from settings.models import TemplateField
+from tripod.settings import email_address
 
 
 class EmailClient:
@@ -17,7 +17,6 @@ class EmailClient:
     * email_template -> predefined email template
     * user -> user db object
     * company -> company db object
-    * template_objects -> collection of template field objects
     -- > init by calling functions
     * template_content -> Creation of TemplateContent()
     * database_objects -> Creating TemplateDatabaseObjects()
@@ -28,25 +27,28 @@ class EmailClient:
         self.additional_content = None
         self.attachment = None
 
-    def get_content(self):
-        """prepareing the content for email"""
-        if self.task.task_type == 'em':
-            self.template_content = TemplateContent(self.task.email_template)
-        elif self.task.task_type == 'cn':
-            self.template_content = TemplateContent(
-                self.task.contract_template)
-        elif self.task.task_type == 'ap':
-            self.template_content = TemplateContent(self.task.email_template)
+    def get_template(self):
+        """returning the template of the task based on the task type"""
+        if self.task.task_type == 'cn':
+            return self.task.contract_template
         elif self.task.task_type == 'qn':
-            self.template_content = TemplateContent(self.task.quest_template)
+            return self.task.quest_template
+        return self.task.email_template
+
+    def get_content(self):
+        """
+        prepareing the content for email with the compiled template, which
+        is returned as RenderedTemplate (refer template_prepration)
+        """
+        self.template_content = TemplateContent(
+            get_compiled_template(self.get_template()))
         self.email_template = self.task.email_template
         self.contract_template = self.task.contract_template
         self.company = get_company()
         self.job = self.task.get_job()
         self.user = self.job.primary_client
-        self.template_objects = TemplateField.objects.all()
         self.database_objects = TemplateDatabaseObjects(
-            self.company, self.task, self.template_objects)
+            self.company, self.task)
         return self.template_content.prepare_content(self.database_objects)
 
     def new_content(self, body, subject, to_email, attachment=None):
@@ -58,8 +60,21 @@ class EmailClient:
         """adding additional content"""
         self.additional_content = content
 
-    def send_email(self, is_task=True):
-        """sending the email with correct content"""
+    def task_email_key(self, kind):
+        """
+        idempotency key of the email of the task, the same for the same
+        state of the task so the email is not sent twice for it
+        """
+        changed_at = self.task.changed_at
+        stamp = changed_at.timestamp() if changed_at else ''
+        return f'task-{self.task.pk}-{kind}-{stamp}'
+
+    def send_email(self, is_task=True, key=None):
+        """
+        sending the email with correct content, the email is stored in the
+        outbox and delivered after the transaction is committed (refer
+        core.outbox). emails with the same key are sent only once
+        """
         # creating TemplateConent based on the type
         if is_task:
             self.template_content = self.get_content()
@@ -84,9 +99,7 @@ class EmailClient:
             else:
                 raise Exception("Empty email cannot be sent")
 
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.login(email_address, email_password)
-            smtp.send_message(msg)
+        enqueue_message(msg, key=key)
 
             # getting content prepared
             #  self.template_content = self.get_content()
@@ -103,8 +116,8 @@ class EmailClient:
             #  print("/n")
             #  print(self.template_content.thank_you)
 
-    def book_appointment(self, appointment):
+    def book_appointment(self, appointment, key=None):
         """sending an email with an appointment recorded"""
-        self.send_email()
+        self.send_email(key=key)
         print('booking calender...')
         print('------> app' + appointment.description)
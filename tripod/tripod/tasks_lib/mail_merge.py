@@ -0,0 +1,126 @@
+"""
+Mail merge of a template to many jobs or tasks. Clients, jobs and the
+company are loaded in bulk and the compiled template is used (refer
+compiled_templates), so rendering the messages does not touch the database.
+Messages are sent in batches through the transport (refer transports), each
+batch over a single connection.
+
+A failed recipient does not stop the merge, it is recorded in the report
+and its message is stored in the outbox (refer core.outbox), so it is
+retried by the outbox worker.
+"""
+import uuid
+from email.message import EmailMessage
+
+from core.outbox import enqueue_message
+from job.models import Job, Task
+from tripod.reports import Report, Result
+from tripod.settings import email_address
+from tripod.tasks_lib.compiled_templates import get_compiled_template
+from tripod.tasks_lib.transports import get_transport
+from tripod.utils import get_company
+
+# number of messages sent over a connection at once
+BATCH_SIZE = 100
+
+
+class RecipientResult(Result):
+    """
+    Result of the mail merge for a single job or task
+
+    * object_id -> id of the job or task
+    * email -> email of the client
+    * success -> True if the message was sent
+    * message -> error of the failed message; empty if sent
+    """
+    __slots__ = ('object_id', 'email')
+
+    def __init__(self, object_id, email, success, message=''):
+        super().__init__(success, message)
+        self.object_id = object_id
+        self.email = email
+
+
+class MergeReport(Report):
+    """
+    Report of the mail merge (refer tripod.reports.Report)
+
+    * results -> {object_id: RecipientResult} in the order of sending
+    """
+    result_class = RecipientResult
+
+
+def merge_objects(objects):
+    """
+    returning (object, task, job) of the jobs or tasks, loaded with their
+    clients in a single query
+    """
+    if objects.model is Task:
+        for task in objects.select_related('work__job__primary_client',
+                                           'appointment'):
+            yield task, task, task.work.job
+    elif objects.model is Job:
+        for job in objects.select_related('primary_client'):
+            yield job, None, job
+    else:
+        raise Exception('Mail merge is only available for jobs and tasks')
+
+
+def build_message(compiled, company, task, job):
+    """rendering the message of the job or task"""
+    content = compiled.render(
+        compiled.get_values(company=company,
+                            task=task,
+                            job=job,
+                            user=job.primary_client,
+                            appointment=task.appointment
+                            if task is not None else None))
+    msg = EmailMessage()
+    msg['Subject'] = content.subject
+    if email_address:
+        msg['From'] = email_address
+    msg['To'] = job.primary_client.email
+    msg.set_content(content.body + content.thank_you)
+    return msg
+
+
+def send_batch(batch, transport, report, key):
+    """sending the batch of (object, message), failed ones are enqueued"""
+    failures = transport.send_messages([msg for _, msg in batch])
+    for index, (obj, msg) in enumerate(batch):
+        error = failures.get(index)
+        if error is None:
+            report.add(obj.pk, msg['To'], True)
+        else:
+            report.add(obj.pk, msg['To'], False,
+                       f'{type(error).__name__}: {error}')
+            enqueue_message(msg, key=f'{key}-{obj.pk}')
+
+
+def mail_merge(template, objects, transport=None, batch_size=BATCH_SIZE):
+    """
+    sending the template to the clients of the jobs or tasks queryset,
+    returns MergeReport. the transport of EMAIL_TRANSPORT setting is used
+    unless it is passed
+    """
+    transport = transport or get_transport()
+    report = MergeReport()
+    compiled = get_compiled_template(template)
+    company = get_company()
+    # failed messages are enqueued once per merge and recipient
+    key = f'merge-{template.pk}-{uuid.uuid4().hex}'
+
+    batch = []
+    for obj, task, job in merge_objects(objects):
+        try:
+            batch.append((obj, build_message(compiled, company, task, job)))
+        except Exception as error:
+            report.add(obj.pk, job.primary_client.email, False,
+                       f'{type(error).__name__}: {error}')
+            continue
+        if len(batch) >= batch_size:
+            send_batch(batch, transport, report, key)
+            batch = []
+    if batch:
+        send_batch(batch, transport, report, key)
+    return report.finish()
@@ -0,0 +1,203 @@
+"""
+Representation of a pool of SMTP connections. Connections are logged in once
+and reused for the following messages of the process, instead of a new
+connection and login for every message.
+
+Idle connections are checked with NOOP before they are reused and closed
+once they are idle for too long, and a message is sent again over a new
+connection if the server has dropped the connection in the meantime.
+"""
+import os
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from tripod.settings import email_address, email_password
+
+# errors of a dropped or broken connection, the message can be sent again
+# over a new connection
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError,
+                     TimeoutError)
+
+# errors of a refused message, the connection can be used for the others
+REFUSED_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                  smtplib.SMTPDataError)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class SMTPConnectionPool:
+    """
+    Pool of logged in SMTP connections
+
+    * host, port -> SMTP server
+    * username, password -> login of the connections, no login if None
+    * use_ssl -> SMTP_SSL if True, plain SMTP otherwise
+    * max_size -> maximum number of connections, also in use ones
+    * idle_timeout -> seconds that an idle connection is kept
+    * check_after -> seconds of idle time after which the connection is
+    checked with NOOP before it is reused
+    * timeout -> seconds of the socket operations and of waiting for a
+    free connection
+    """
+
+    def __init__(self,
+                 host,
+                 port,
+                 username=None,
+                 password=None,
+                 use_ssl=True,
+                 max_size=4,
+                 idle_timeout=60,
+                 check_after=10,
+                 timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.timeout = timeout
+        # (connection, last used time) of the idle connections
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.opened = 0
+
+    def connect(self):
+        """opening a new logged in connection"""
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        connection = smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.username is not None:
+                connection.login(self.username, self.password)
+        except Exception:
+            self.discard(connection)
+            raise
+        self.opened += 1
+        return connection
+
+    def discard(self, connection):
+        """closing the connection, ignoring the errors of a broken one"""
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def is_usable(self, connection, last_used):
+        """checking the idle connection can be reused"""
+        idle = time.monotonic() - last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle > self.check_after:
+            try:
+                return connection.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def acquire(self):
+        """returning an idle connection or a new one"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise Exception('No SMTP connection is available at the moment')
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, last_used = self._idle.pop()
+                if self.is_usable(connection, last_used):
+                    return connection
+                self.discard(connection)
+            return self.connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, broken=False):
+        """returning the connection to the pool, broken ones are closed"""
+        try:
+            if broken:
+                self.discard(connection)
+            else:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """connection of the pool, returned to the pool after the block"""
+        connection = self.acquire()
+        try:
+            yield connection
+        except REFUSED_ERRORS:
+            # smtplib resets the session, so the connection is still usable
+            self.release(connection)
+            raise
+        except BaseException:
+            # state of the session is not known, e.g. in the middle of DATA
+            self.release(connection, broken=True)
+            raise
+        else:
+            self.release(connection)
+
+    def send_message(self, msg, retries=1):
+        """
+        sending the message, again over a new connection if the connection
+        is dropped by the server
+        """
+        for attempt in range(retries + 1):
+            try:
+                with self.connection() as connection:
+                    return connection.send_message(msg)
+            except CONNECTION_ERRORS:
+                if attempt == retries:
+                    raise
+
+    def close(self):
+        """closing all the idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self.discard(connection)
+
+
+def get_smtp_pool():
+    """
+    returning the SMTP pool of the process, configured by EMAIL_HOST,
+    EMAIL_PORT, EMAIL_USE_SSL, EMAIL_POOL_SIZE and EMAIL_POOL_IDLE_TIMEOUT
+    settings. pools are not shared with the forked processes
+    """
+    key = os.getpid()
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = SMTPConnectionPool(
+                    settings.EMAIL_HOST,
+                    settings.EMAIL_PORT,
+                    username=email_address,
+                    password=email_password,
+                    use_ssl=settings.EMAIL_USE_SSL,
+                    max_size=settings.EMAIL_POOL_SIZE,
+                    idle_timeout=settings.EMAIL_POOL_IDLE_TIMEOUT)
+                _pools.clear()
+                _pools[key] = pool
+    return pool
+
+
+def reset_smtp_pool():
+    """closing and dropping the pool, e.g. when the settings are changed"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,113 @@
+"""
+Local stand-in of an SMTP server, which accepts the messages without
+delivering them. It is used to benchmark and load-test the email path
+without hitting a real mail server.
+
+A handshake delay can be set to take the cost of the TLS handshake and the
+login of a remote server into account, which a local plain connection does
+not have.
+"""
+import socketserver
+import threading
+import time
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """speaking enough SMTP for smtplib to send messages"""
+
+    def reply(self, *lines):
+        # lines of a reply are written at once, as a real server does
+        self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode())
+
+    def handle(self):
+        server = self.server
+        time.sleep(server.handshake_delay)
+        self.reply('220 localhost SMTP stand-in')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250-localhost', '250-AUTH PLAIN LOGIN',
+                           '250 SIZE 10485760')
+            elif verb == 'AUTH':
+                time.sleep(server.handshake_delay)
+                self.reply('235 Authentication successful')
+            elif verb == 'RCPT' and 'refused@' in command.lower():
+                self.reply('550 Mailbox unavailable')
+            elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data == b'.\r\n':
+                        break
+                    lines.append(data)
+                server.add_message(b''.join(lines))
+                self.reply('250 OK queued')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """
+    SMTP stand-in server, listening on a free local port unless a port is
+    given. recipients like refused@... are refused
+
+    * handshake_delay -> seconds added to the connection and the login
+    * messages -> raw messages that are received, if keep_messages is True
+    * received -> number of messages that are received
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self,
+                 host='127.0.0.1',
+                 port=0,
+                 handshake_delay=0,
+                 keep_messages=False):
+        super().__init__((host, port), SMTPStandInHandler)
+        self.handshake_delay = handshake_delay
+        self.keep_messages = keep_messages
+        self.messages = []
+        self.received = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def host(self):
+        return self.server_address[0]
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def add_message(self, message):
+        with self._lock:
+            self.received += 1
+            if self.keep_messages:
+                self.messages.append(message)
+
+    def start(self):
+        """serving in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -1,113 +1,211 @@
 """
 TemplateDatabaseObjects is a class that init relavent database objects, such
 like user and company, so the template fields and access the database values
-using the class function.
+using the class function. Values are taken with the compiled resolvers of
+the object fields (refer Resolver).
+
+CompiledTemplate is the template with its placeholders validated and turned
+into format strings once, so it can be rendered for many objects without
+searching the template again (refer compiled_templates for the cache).
 """
 
 import re
+from collections import namedtuple
+from operator import attrgetter
+
+# placeholders of the templates -> '{example}'
+PATTERN = re.compile(r"{([A-Za-z]+)}")
+
+# database objects that the object fields can start from
+ROOTS = ('company', 'job', 'user', 'task', 'appointment')
+# attributes of the object fields, private ones are not allowed
+ATTRIBUTE = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+BLOCKED = {'password'}
+
+# compiled resolvers by object field
+_resolvers = {}
+
+# content of the rendered template
+RenderedTemplate = namedtuple('RenderedTemplate',
+                              ['subject', 'body', 'thank_you'])
+
+
+def get_placeholders(text):
+    """returning the set of placeholders in the text"""
+    return set(PATTERN.findall(text or ''))
+
+
+def compile_text(text):
+    """
+    turning the text into a format string, braces that are not part of a
+    placeholder are escaped so they are kept as they are
+    """
+    parts = PATTERN.split(text or '')
+    return ''.join(
+        '{' + part + '}' if index % 2 else part.replace('{', '{{').replace(
+            '}', '}}') for index, part in enumerate(parts))
+
+
+class Resolver:
+    """
+    Compiled object field of the TemplateField, which takes the value from
+    the database objects with an attribute getter instead of eval. Object
+    field is a path of attributes from one of the ROOTS, like
+    'job.primary_client.email', private attributes are not allowed
+    * object_field -> path of the value
+    * root -> name of the database object that the path starts from
+    * getter -> getter of the rest of the path; None for the object itself
+    """
+    __slots__ = ('object_field', 'root', 'getter')
+
+    def __init__(self, object_field):
+        root, *attributes = object_field.split('.')
+        if root not in ROOTS or not all(
+                ATTRIBUTE.match(attribute) and attribute not in BLOCKED
+                for attribute in attributes):
+            raise Exception(f'Object field ({object_field}) not valid')
+        self.object_field = object_field
+        self.root = root
+        self.getter = attrgetter('.'.join(attributes)) if attributes else None
+
+    def __call__(self, objects):
+        """returning the value from {'root': database object}"""
+        value = objects[self.root]
+        if self.getter is None:
+            return value
+        return self.getter(value)
+
+
+def get_resolver(object_field):
+    """returning the resolver of the object field, compiled once"""
+    resolver = _resolvers.get(object_field)
+    if resolver is None:
+        resolver = _resolvers[object_field] = Resolver(object_field)
+    return resolver
 
 
 class TemplateDatabaseObjects:
 
-    def __init__(self, company, task, template_objects):
+    def __init__(self, company, task):
         """
         This class represents the initiation/ copy of the database objects
         that needed for them Template class to preare the content
         * user object
         * company object
-        * template_objects -> collection of template field objects
-        * db_template_fields -> [field in TemplateField]
-        * replace_dict -> {'field': 'object_field'} from TemplateField
+        * replace_dict -> {'field': value} of the placeholders
         """
         self.company = company
         self.task = task
         self.appointment = task.appointment if task.appointment else None
         self.job = self.task.get_job()
         self.user = self.job.primary_client
-        self.db_template_fields = []
         self.replace_dict = {}
-        self.template_objects = template_objects
 
-    def set_db_template_fields(self):
+    def get_roots(self):
+        """returning {'root': database object} for the resolvers"""
+        return {
+            'company': self.company,
+            'job': self.job,
+            'user': self.user,
+            'task': self.task,
+            'appointment': self.appointment,
+        }
+
+    def set_db_data(self, compiled):
         """
-        This will get the exact model name and column in the format of model.column
-        for the template name in template objects query
+        values of the placeholders of the compiled template are taken with
+        the resolvers of their object fields and added to the replace_dict,
+        without querying the template fields
         """
-        values = self.template_objects.values()
-        # print(values)
-        result = [value['field'] for value in values]
-        # print(result)
-        self.db_template_fields = result
+        self.replace_dict = compiled.get_values(**self.get_roots())
         return None
 
-    def set_db_data_for_field(self, field):
+
+class CompiledTemplate:
+    """
+    Immutable template compiled once to be rendered many times, placeholders
+    of the subject and body are validated against the template fields and
+    the texts are turned into format strings
+    * template_id -> id of the template
+    * version -> changed_at of the template when it is compiled
+    * subject/ body -> format strings of the subject and body
+    * thank_you -> thank you text of the template
+    * object_fields -> {'field': 'object_field'} of the placeholders
+    * resolvers -> {'field': Resolver of the object_field}
+    """
+    __slots__ = ('template_id', 'version', 'subject', 'body', 'thank_you',
+                 'object_fields', 'resolvers')
+
+    def __init__(self, template, object_fields):
+        """object_fields -> {'field': 'object_field'} of the TemplateField"""
+        placeholders = (get_placeholders(template.subject)
+                        | get_placeholders(template.body))
+        for field in sorted(placeholders):
+            if field not in object_fields:
+                raise Exception(f'Passes field ({field}) not valid')
+        fields = {field: object_fields[field] for field in placeholders}
+        values = {
+            'template_id': template.pk,
+            'version': template.changed_at,
+            'subject': compile_text(template.subject),
+            'body': compile_text(template.body),
+            'thank_you': getattr(template, 'thank_you', None) or '',
+            'object_fields': fields,
+            'resolvers': {
+                field: get_resolver(object_field)
+                for field, object_field in fields.items()
+            },
+        }
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    @property
+    def fields(self):
+        return self.object_fields.keys()
+
+    def get_values(self, **objects):
         """
-        Once the exact model.column has been taken, using eval method the database value will
-        be taken and added to te replace_dict
+        returning {'field': value} for the database objects of the ROOTS,
+        e.g. company, job, user, task and appointment
         """
-        temp_obj = self.template_objects.get(field=field)
-        self.replace_dict[temp_obj.field] = eval("self." +
-                                                 temp_obj.object_field)
-        return None
+        return {
+            field: resolver(objects)
+            for field, resolver in self.resolvers.items()
+        }
+
+    def render(self, values):
+        """returning RenderedTemplate with the values of the placeholders"""
+        try:
+            return RenderedTemplate(self.subject.format_map(values),
+                                    self.body.format_map(values),
+                                    self.thank_you)
+        except KeyError:
+            raise Exception('Replace Dictionary missing keys')
 
 
 class TemplateContent:
     """
-    This class represents the creation of the content using the copy
-    of the already existing template, by taking template_fields in the content
-    and replacing with appropriate db values (using TemplateDatabaseObjects)
-    * template -> template object (email or contract)
-    * subject/ thank_you/ signature -> True of False
-    * pattern -> regex pattern to find '{text}'
-    * template_fields -> collection of template field in the content
+    This class represents the creation of the content using the compiled
+    template, by taking the values of the template fields in the content
+    from the database objects (using TemplateDatabaseObjects). The template
+    object itself is never changed
+    * compiled -> CompiledTemplate of the template (email, contract or
+    questionnaire)
     """
 
-    def __init__(self, template):
-        self._pattern = r"{([A-Za-z]+)}"
-        self.template = template
-        self.template_fields = []
-
-    def get_template_fields(self):
-        """
-        From the template body (can be email body or contract body) using regex pattern
-        words with this patter -> "{example}" will be taken and added to template_fields
-        """
-        # adding template fields from body
-        self.template_fields = re.findall(self._pattern, self.template.body)
-
-        # adding template fields from subject
-        subject = re.findall(self._pattern, self.template.subject)
-        self.template_fields = self.template_fields + subject
-
-        self.template_fields = list(set(self.template_fields))
+    def __init__(self, compiled):
+        self.compiled = compiled
 
     def prepare_content(self, database_objects):
         """
-        Replacing dictionary will be created by taking model.column combination field and word
-        from template body with "{}" the pattern
+        returning RenderedTemplate, values of the placeholders are taken
+        from the database objects
         """
-        database_objects.set_db_template_fields()
-        db_template_fields = database_objects.db_template_fields
-        self.get_template_fields()
-
-        for field in self.template_fields:
-            if field not in db_template_fields:
-                raise Exception(f'Passes field ({field}) not valid')
-            database_objects.set_db_data_for_field(field)
-
-        self.template = self.replace_data(database_objects.replace_dict)
-        return self.template
-
-    def replace_data(self, replace_dict):
-        """passing replace_dict replace template fields with db values"""
-        try:
-            self.template.body = self.template.body.format(**replace_dict)
-            self.template.subject = self.template.subject.format(
-                **replace_dict)
-            # if self.thank_you:
-            #     pass
-            # if self.signature:
-            #     pass
-        except KeyError:
-            raise Excpetion('Replace Dictionary missing keys')
-        return self.template
+        database_objects.set_db_data(self.compiled)
+        return self.compiled.render(database_objects.replace_dict)
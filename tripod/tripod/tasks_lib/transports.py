@@ -0,0 +1,165 @@
+"""
+Representation of the email transports, which hand the email messages over
+to where they are delivered. The transport is selected with the
+EMAIL_TRANSPORT setting (dotted path of the class) and configured with
+EMAIL_TRANSPORT_OPTIONS, so emails can be load-tested without a real mail
+server.
+
+* SMTPTransport -> mail server of the EMAIL_HOST settings (default)
+* LocalSMTPTransport -> SMTP stand-in running in the process
+* FileTransport -> messages written into a spool directory
+* MemoryTransport -> messages kept in memory
+"""
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from tripod.tasks_lib.smtp_pool import (REFUSED_ERRORS, SMTPConnectionPool,
+                                       get_smtp_pool)
+from tripod.tasks_lib.smtp_standin import SMTPStandIn
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+class BaseTransport(ABC):
+    """transport of the email messages"""
+
+    @abstractmethod
+    def send_message(self, msg):
+        """sending the message, raises if it is not sent"""
+        pass
+
+    def send_messages(self, messages):
+        """
+        sending the messages, a failed message does not stop the others.
+        returns {index: error} of the failed messages
+        """
+        failures = {}
+        for index, msg in enumerate(messages):
+            try:
+                self.send_message(msg)
+            except Exception as error:
+                failures[index] = error
+        return failures
+
+    def close(self):
+        pass
+
+
+class SMTPTransport(BaseTransport):
+    """
+    Mail server over a pool of logged in connections (refer smtp_pool), the
+    pool of the process is used unless options of the pool are passed
+    """
+
+    def __init__(self, **options):
+        self._pool = SMTPConnectionPool(**options) if options else None
+
+    @property
+    def pool(self):
+        return self._pool or get_smtp_pool()
+
+    def send_message(self, msg):
+        self.pool.send_message(msg)
+
+    def send_messages(self, messages):
+        """
+        sending the messages over the same connection, refused messages
+        keep the connection and a broken connection is replaced for the
+        rest of the messages
+        """
+        failures = {}
+        index = 0
+        while index < len(messages):
+            try:
+                with self.pool.connection() as connection:
+                    while index < len(messages):
+                        try:
+                            connection.send_message(messages[index])
+                        except REFUSED_ERRORS as error:
+                            failures[index] = error
+                        index += 1
+            except Exception as error:
+                failures[index] = error
+                index += 1
+        return failures
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+
+
+class LocalSMTPTransport(SMTPTransport):
+    """
+    SMTP stand-in (refer smtp_standin) started in the process, messages go
+    through the SMTP protocol without leaving the machine
+
+    * handshake_delay -> seconds added to connecting and login
+    """
+
+    def __init__(self, handshake_delay=0, **options):
+        self.server = SMTPStandIn(handshake_delay=handshake_delay).start()
+        super().__init__(host=self.server.host,
+                         port=self.server.port,
+                         use_ssl=False,
+                         **options)
+
+    def close(self):
+        super().close()
+        self.server.stop()
+
+
+class FileTransport(BaseTransport):
+    """
+    Messages written into the directory as .eml files
+
+    * path -> spool directory, EMAIL_FILE_PATH setting by default
+    """
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'EMAIL_FILE_PATH',
+                                    os.path.join(settings.BASE_DIR, 'spool'))
+        os.makedirs(self.path, exist_ok=True)
+
+    def send_message(self, msg):
+        name = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}.eml'
+        with open(os.path.join(self.path, name), 'wb') as spool_file:
+            spool_file.write(msg.as_bytes())
+
+
+class MemoryTransport(BaseTransport):
+    """messages kept in the outbox list of the class, e.g. for tests"""
+    outbox = []
+
+    def send_message(self, msg):
+        MemoryTransport.outbox.append(msg)
+
+
+def get_transport():
+    """returning the transport of the process, refer EMAIL_TRANSPORT"""
+    key = os.getpid()
+    transport = _transports.get(key)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(key)
+            if transport is None:
+                transport_class = import_string(settings.EMAIL_TRANSPORT)
+                transport = transport_class(
+                    **getattr(settings, 'EMAIL_TRANSPORT_OPTIONS', {}))
+                _transports.clear()
+                _transports[key] = transport
+    return transport
+
+
+def reset_transport():
+    """closing and dropping the transport, e.g. when settings are changed"""
+    with _transports_lock:
+        for transport in _transports.values():
+            transport.close()
+        _transports.clear()
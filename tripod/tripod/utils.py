@@ -1,5 +1,17 @@
 import string
 import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# cache key of the version of the active company, which is shared by the
+# worker processes and bumped whenever a company is changed
+COMPANY_VERSION_KEY = 'active-company-version'
+
+# (company, version, checked until, loaded until) of the process
+_company = None
 
 
 def add_basic_html_tags(main_component, fields, description=False):
@@ -30,8 +42,45 @@ def random_char():
     return ''.join(random.choices(letters, k=20))
 
 
+def bump_company_version():
+    """dropping the company of the process and bumping the shared version"""
+    global _company
+    _company = None
+    cache.set(COMPANY_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_company_version():
+    """returning the shared version of the active company"""
+    version = cache.get(COMPANY_VERSION_KEY)
+    if version is None:
+        cache.add(COMPANY_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(COMPANY_VERSION_KEY)
+    return version
+
+
 def get_company():
-    """getting the correct company"""
+    """
+    getting the correct company, cached in the process. once the
+    COMPANY_CACHE_TTL seconds are passed the shared version is checked in
+    the cache (refer CACHES setting) and the company is loaded again if it
+    is changed, so a change made by any of the worker processes is seen
+    within the TTL. company is loaded again after COMPANY_CACHE_MAX_AGE
+    seconds in any case
+    """
+    global _company
     from core.models import Company
+    now = time.monotonic()
+    cached = _company
+    if cached is not None and now < cached[2]:
+        return cached[0]
+
+    ttl = getattr(settings, 'COMPANY_CACHE_TTL', 10)
+    version = get_company_version()
+    if cached is not None and version == cached[1] and now < cached[3]:
+        _company = (cached[0], version, now + ttl, cached[3])
+        return cached[0]
+
     company = Company.objects.filter(active=True).first()
+    _company = (company, version, now + ttl,
+                now + getattr(settings, 'COMPANY_CACHE_MAX_AGE', 600))
     return company